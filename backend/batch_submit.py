@@ -0,0 +1,67 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WORD = re.compile(r"\w{2,}", re.UNICODE)
+FINAL_STATES = ("done", "failed")
+
+
+def _words(text: str) -> set:
+    return {w for w in _WORD.findall((text or "").lower()) if not w.isdigit()}
+
+
+def _score(path: str, hw: dict) -> int:
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0].lower()
+    # номер задания в имени файла — самое надёжное совпадение
+    if str(hw.get("id")) in re.findall(r"\d+", name):
+        return 100
+    return len(_words(name) & (_words(hw.get("theme")) | _words(hw.get("name_spec"))))
+
+
+def match_files(paths: Iterable[str], homeworks: List[dict]) -> List[Tuple[str, Optional[dict]]]:
+    # [(путь, ДЗ или None)]; жадно по убыванию совпадения, каждое ДЗ достаётся одному файлу
+    paths = list(paths)
+    pairs = sorted(((_score(p, hw), i, j) for i, p in enumerate(paths) for j, hw in enumerate(homeworks)),
+                   reverse=True)
+    taken_p, taken_hw, out = set(), set(), {}
+    for score, i, j in pairs:
+        if score <= 0:
+            break
+        if i in taken_p or j in taken_hw:
+            continue
+        taken_p.add(i)
+        taken_hw.add(j)
+        out[i] = homeworks[j]
+    return [(p, out.get(i)) for i, p in enumerate(paths)]
+
+
+# пакет — набор записей outbox; итог показывается, когда каждая дошла до done/failed или убрана
+class Batch:
+    def __init__(self, item_ids: Iterable[int]):
+        self.results: Dict[int, Optional[dict]] = {i: None for i in item_ids}
+
+    def update(self, item_id: int, item: Optional[dict]) -> bool:
+        # True — запись из этого пакета и её состояние окончательное
+        if item_id not in self.results:
+            return False
+        if item is None:
+            item = {"id": item_id, "state": "removed", "error": ""}
+        if item["state"] not in FINAL_STATES + ("removed",):
+            return False
+        self.results[item_id] = item
+        return True
+
+    @property
+    def done_count(self) -> int:
+        return sum(1 for r in self.results.values() if r is not None)
+
+    @property
+    def finished(self) -> bool:
+        return all(r is not None for r in self.results.values())
+
+    def summary(self) -> dict:
+        out = {"done": [], "failed": [], "removed": []}
+        for r in self.results.values():
+            if r is not None:
+                out[r["state"]].append(r)
+        return out
@@ -0,0 +1,263 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import requests
+import urllib3
+
+from backend.http_client import get_client as _http
+from utils import db
+
+SEGMENTS = 4
+MIN_SEGMENT = 2 * 1024 * 1024  # меньше этого на сегмент не режем — лишние соединения дороже
+CHUNK_MIN = 64 * 1024
+CHUNK_MAX = 4 * 1024 * 1024
+RETRIES = 5
+SAVE_EVERY = 1.0  # сек между сохранениями состояния в БД
+TIMEOUT = (15, 60)
+BATCH_WORKERS = 4
+BATCH_SEGMENTS = 2  # BATCH_WORKERS * BATCH_SEGMENTS не больше пула соединений на хост
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+def _total_from_content_range(cr: str) -> Optional[int]:
+    m = re.match(r"bytes\s+\d+-\d+/(\d+)", cr or "")
+    return int(m.group(1)) if m else None
+
+
+def _split(size: int, segments: int) -> List[list]:
+    n = max(1, min(segments, size // MIN_SEGMENT))
+    step = -(-size // n)
+    return [[a, min(a + step, size) - 1, a] for a in range(0, size, step)]
+
+
+# скачивание по Range-сегментам в заранее выделенный .part; прогресс сегментов живёт в SQLite,
+# поэтому оборванная загрузка продолжается с места обрыва
+class Download:
+    def __init__(self, url: str, save_dir: str, *, headers: dict = None,
+                 name_for: Callable[[dict], str] = None, segments: int = SEGMENTS,
+                 on_progress: Callable[[int, int, float], None] = None, cancel: threading.Event = None,
+                 skip_existing: bool = False):
+        self.url = url
+        self.save_dir = save_dir
+        self.headers = dict(headers or {})
+        self.headers["Accept-Encoding"] = "identity"
+        self.name_for = name_for or (lambda h: os.path.basename(url.rstrip("/")) or "download")
+        self.segments = segments
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.skip_existing = skip_existing
+        self.skipped = False
+        self.path = ""
+        self.size = 0
+        self.etag = ""
+        self._segs: List[list] = []
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self._streamed = 0
+        self._saved_at = 0.0
+        self._t0 = 0.0
+        self._done0 = 0
+
+    def _check_cancel(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise DownloadCancelled("Загрузка отменена")
+        if self._abort.is_set():
+            raise DownloadCancelled("Загрузка прервана ошибкой соседнего сегмента")
+
+    def _done_bytes(self) -> int:
+        if not self._segs:
+            return self._streamed
+        return sum(pos - a for a, _, pos in self._segs)
+
+    def _save(self):
+        with self._lock:
+            db.download_put(self.path, self.url, self.size, self.etag, self._segs)
+
+    def _report(self, save: bool = None):
+        # save: None — не чаще SAVE_EVERY, True — сейчас, False — не сохранять
+        now = time.monotonic()
+        with self._lock:
+            done = self._done_bytes()
+            if save is None and self._segs:
+                save = now - self._saved_at >= SAVE_EVERY
+        if save:
+            self._saved_at = now
+            self._save()
+        if self.on_progress is not None:
+            rate = (done - self._done0) / max(now - self._t0, 1e-6)
+            self.on_progress(done, self.size, rate)
+
+    def _read_into(self, r: requests.Response, f, seg: Optional[list]) -> None:
+        chunk = CHUNK_MIN
+        while True:
+            self._check_cancel()
+            t = time.monotonic()
+            data = r.raw.read(chunk)
+            if not data:
+                return
+            f.write(data)
+            if seg is not None:
+                with self._lock:
+                    seg[2] += len(data)
+            else:
+                self._streamed += len(data)
+                self.size = max(self.size, self._streamed)
+            # размер куска подстраивается под скорость: быстрые чтения — крупнее, медленные — мельче
+            dt = time.monotonic() - t
+            if dt < 0.05 and chunk < CHUNK_MAX:
+                chunk *= 2
+            elif dt > 0.5 and chunk > CHUNK_MIN:
+                chunk //= 2
+            self._report()
+
+    def _fetch_segment(self, seg: list) -> None:
+        for attempt in range(RETRIES):
+            self._check_cancel()
+            if seg[2] > seg[1]:
+                return
+            headers = dict(self.headers, Range=f"bytes={seg[2]}-{seg[1]}")
+            if self.etag:
+                headers["If-Range"] = self.etag
+            try:
+                # повторы сегмента — здесь, с докачкой с места обрыва
+                with _http().get(self.url, headers=headers, stream=True, timeout=TIMEOUT, retries=0) as r:
+                    if r.status_code != 206:
+                        raise RuntimeError(f"Сервер не отдал диапазон: HTTP {r.status_code}")
+                    with open(self.path + ".part", "r+b") as f:
+                        f.seek(seg[2])
+                        self._read_into(r, f, seg)
+                if seg[2] > seg[1]:
+                    return
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+                if attempt == RETRIES - 1:
+                    raise
+                print("download segment retry:", seg, e)
+                time.sleep(min(2 ** attempt, 10))
+        if seg[2] <= seg[1]:
+            raise RuntimeError("Сегмент скачан не полностью")
+
+    def _resume_state(self) -> bool:
+        st = db.download_get(self.path)
+        part = self.path + ".part"
+        if not st or st["url"] != self.url or st["size"] != self.size or st["etag"] != self.etag:
+            return False
+        if not os.path.exists(part) or os.path.getsize(part) != self.size:
+            return False
+        self._segs = st["segments"]
+        return True
+
+    def _already_have(self, size: Optional[int]) -> bool:
+        if not self.skip_existing or not size or not os.path.isfile(self.path):
+            return False
+        if os.path.getsize(self.path) != size or db.download_get(self.path) is not None:
+            return False
+        self.skipped = True
+        self.size = self._streamed = size
+        self._report(save=False)
+        return True
+
+    def _single_stream(self, r: requests.Response) -> str:
+        # сервер не умеет Range — качаем одним потоком, докачка невозможна
+        db.download_clear(self.path)
+        self.size = int(r.headers.get("Content-Length") or 0)
+        with open(self.path + ".part", "wb") as f:
+            self._read_into(r, f, None)
+        os.replace(self.path + ".part", self.path)
+        return self.path
+
+    def run(self) -> str:
+        os.makedirs(self.save_dir, exist_ok=True)
+        self._t0 = time.monotonic()
+        headers = dict(self.headers, Range="bytes=0-0")
+        with _http().get(self.url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+            r.raise_for_status()
+            self.path = os.path.join(self.save_dir, self.name_for(r.headers))
+            total = _total_from_content_range(r.headers.get("Content-Range", ""))
+            if self._already_have(total if r.status_code == 206 else int(r.headers.get("Content-Length") or 0)):
+                return self.path
+            if r.status_code != 206 or total is None:
+                return self._single_stream(r)
+        self.size = total
+        self.etag = r.headers.get("ETag", "")
+
+        if not self._resume_state():
+            with open(self.path + ".part", "wb") as f:
+                f.truncate(self.size)
+            self._segs = _split(self.size, self.segments)
+        self._done0 = self._done_bytes()
+        self._report(save=True)
+
+        todo = [s for s in self._segs if s[2] <= s[1]]
+        if todo:
+            with ThreadPoolExecutor(max_workers=len(todo), thread_name_prefix="download") as ex:
+                futures = [ex.submit(self._fetch_segment, s) for s in todo]
+                try:
+                    for fut in futures:
+                        fut.result()
+                except BaseException:
+                    self._abort.set()
+                    raise
+                finally:
+                    self._save()
+
+        os.replace(self.path + ".part", self.path)
+        db.download_clear(self.path)
+        self._report(save=False)
+        return self.path
+
+
+def download_file(url: str, save_dir: str, **kwargs) -> str:
+    return Download(url, save_dir, **kwargs).run()
+
+
+# пакетное скачивание: N файлов одновременно через общий пул соединений, суммарный прогресс
+def download_many(jobs: List[dict], *, workers: int = BATCH_WORKERS, segments: int = BATCH_SEGMENTS,
+                  on_progress: Callable[[int, int, float], None] = None,
+                  on_item: Callable[[str, object], None] = None, cancel: threading.Event = None) -> dict:
+    # jobs: [{"url": ..., "save_dir": ..., "headers": ..., "name_for": ...}]; одинаковые url качаются один раз
+    unique = {}
+    for job in jobs:
+        unique.setdefault(job["url"], job)
+    lock = threading.Lock()
+    progress = {url: (0, 0) for url in unique}
+    summary = {"saved": {}, "skipped": {}, "failed": {}}
+    t0 = time.monotonic()
+
+    def _progress(url, done, total, _rate):
+        with lock:
+            progress[url] = (done, total)
+            d = sum(p[0] for p in progress.values())
+            t = sum(p[1] for p in progress.values())
+        if on_progress is not None:
+            on_progress(d, t, d / max(time.monotonic() - t0, 1e-6))
+
+    def _one(job):
+        url = job["url"]
+        dl = Download(url, job["save_dir"], headers=job.get("headers"), name_for=job.get("name_for"),
+                      segments=segments, cancel=cancel, skip_existing=True,
+                      on_progress=lambda d, t, r: _progress(url, d, t, r))
+        try:
+            path = dl.run()
+        except Exception as e:
+            with lock:
+                summary["failed"][url] = e
+            result = e
+        else:
+            with lock:
+                summary["skipped" if dl.skipped else "saved"][url] = path
+            result = path
+        if on_item is not None:
+            on_item(url, result)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="download-batch") as ex:
+        list(ex.map(_one, unique.values()))
+    if cancel is not None and cancel.is_set():
+        raise DownloadCancelled("Загрузка отменена")
+    return summary
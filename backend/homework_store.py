@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+FRESH_FOR = 120  # сек: в этом окне переключение вкладок не ходит в сеть
+
+
+def hw_key(hw: dict) -> Tuple:
+    # одно ДЗ может прийти с разными отправками, поэтому ключ — пара id задания и id отправки
+    return hw.get("id"), (hw.get("homework_stud") or {}).get("id")
+
+
+class HomeworkDiff(NamedTuple):
+    inserted: List[Tuple]
+    updated: List[Tuple]
+    removed: List[Tuple]
+
+    def __bool__(self):
+        return bool(self.inserted or self.updated or self.removed)
+
+
+# ДЗ по статусам: записи по ключу, порядок сервера и время последнего обновления
+class HomeworkStore:
+    def __init__(self, fresh_for: float = FRESH_FOR):
+        self.fresh_for = fresh_for
+        self._records: Dict[int, Dict[Tuple, dict]] = {}
+        self._order: Dict[int, List[Tuple]] = {}
+        self._meta: Dict[int, dict] = {}
+        self._fetched_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def update(self, status: int, items: List[dict], meta: Optional[dict] = None) -> HomeworkDiff:
+        new = {hw_key(hw): hw for hw in items or []}
+        with self._lock:
+            old = self._records.get(status, {})
+            inserted = [k for k in new if k not in old]
+            updated = [k for k in new if k in old and old[k] != new[k]]
+            removed = [k for k in old if k not in new]
+            self._records[status] = new
+            self._order[status] = list(new)
+            self._meta[status] = meta or {}
+            self._fetched_at[status] = time.time()
+        return HomeworkDiff(inserted, updated, removed)
+
+    def invalidate(self, status: int = None) -> None:
+        with self._lock:
+            for st in ([status] if status is not None else list(self._fetched_at)):
+                self._fetched_at.pop(st, None)
+
+    def is_fresh(self, status: int) -> bool:
+        return time.time() - self._fetched_at.get(status, 0) < self.fresh_for
+
+    def has(self, status: int) -> bool:
+        return status in self._records
+
+    def items(self, status: int) -> List[dict]:
+        with self._lock:
+            records = self._records.get(status, {})
+            return [records[k] for k in self._order.get(status, [])]
+
+    def meta(self, status: int) -> dict:
+        return self._meta.get(status, {})
+
+    def get(self, status: int, key: Tuple) -> Optional[dict]:
+        return self._records.get(status, {}).get(key)
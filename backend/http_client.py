@@ -0,0 +1,223 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+}
+
+# повторяем только то, что безопасно выполнить дважды; POST (аплоад, create) — никогда
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+RETRIES = 2
+BACKOFF_BASE = 0.5       # сек, дальше удваивается
+BACKOFF_MAX = 8.0
+RETRY_AFTER_MAX = 30.0   # сервер просит ждать дольше — не ждём, отдаём ответ как есть
+BREAKER_THRESHOLD = 3    # подряд неудач до размыкания
+BREAKER_COOLDOWN = 20.0  # сек до пробного запроса
+
+
+class HostDown(requests.ConnectionError):
+    # цепь для хоста разомкнута: запрос не отправлялся
+    pass
+
+
+class RetryPolicy:
+    def __init__(self, *, retries: int = RETRIES, backoff: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX,
+                 retry_after_max: float = RETRY_AFTER_MAX, methods=RETRY_METHODS, statuses=RETRY_STATUSES):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.methods = frozenset(m.upper() for m in methods)
+        self.statuses = frozenset(statuses)
+
+    def attempts(self, method: str, retries: Optional[int] = None) -> int:
+        if retries is None:
+            retries = self.retries if method.upper() in self.methods else 0
+        return max(retries, 0) + 1
+
+    def delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        # пауза перед повтором; None — Retry-After дольше допустимого, повторять не стоит
+        after = retry_after(headers)
+        if after is not None:
+            return after if after <= self.retry_after_max else None
+        d = min(self.backoff * 2 ** attempt, self.backoff_max)
+        return random.uniform(d / 2, d)  # джиттер: клиенты не бьют в сервер одновременно
+
+
+def retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+# автомат на хост: closed -> (threshold неудач подряд) open -> (cooldown) half-open, один пробный запрос
+# -> closed при успехе или снова open; пока open, запросы отказывают сразу, без таймаутов
+class CircuitBreaker:
+    def __init__(self, *, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._hosts: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host: str) -> dict:
+        return self._hosts.setdefault(host, {"state": "closed", "fails": 0, "opened_at": 0.0})
+
+    def allow(self, host: str) -> bool:
+        with self._lock:
+            st = self._get(host)
+            if st["state"] == "closed":
+                return True
+            # пробный запрос, не вернувший ни успеха, ни неудачи, через cooldown заменяется новым
+            if time.monotonic() - st["opened_at"] >= self.cooldown:
+                st["state"] = "half-open"
+                st["opened_at"] = time.monotonic()
+                return True
+            return False
+
+    def success(self, host: str) -> None:
+        with self._lock:
+            self._hosts[host] = {"state": "closed", "fails": 0, "opened_at": 0.0}
+
+    def failure(self, host: str) -> None:
+        with self._lock:
+            st = self._get(host)
+            st["fails"] += 1
+            if st["state"] == "half-open" or st["fails"] >= self.threshold:
+                st["state"] = "open"
+                st["opened_at"] = time.monotonic()
+
+    def state(self, host: str) -> str:
+        with self._lock:
+            return self._get(host)["state"]
+
+    def retry_in(self, host: str) -> float:
+        with self._lock:
+            st = self._get(host)
+            if st["state"] == "closed":
+                return 0.0
+            return max(self.cooldown - (time.monotonic() - st["opened_at"]), 0.0)
+
+    def reset(self, host: str = None) -> None:
+        with self._lock:
+            if host is None:
+                self._hosts.clear()
+            else:
+                self._hosts.pop(host, None)
+
+
+_BREAKER = CircuitBreaker()
+
+
+def breaker() -> CircuitBreaker:
+    # общий для синхронного и асинхронного клиентов: упавший хост один на всё приложение
+    return _BREAKER
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+def is_host_failure(status: int) -> bool:
+    return status in (502, 503, 504) or status >= 520
+
+
+# общая сессия: пул keep-alive соединений на каждый хост, таймауты и заголовки по умолчанию
+class HttpClient:
+    def __init__(self, *, pool_connections: int = 10, pool_maxsize: int = 16,
+                 timeout: float = DEFAULT_TIMEOUT, headers: Optional[Dict[str, str]] = None,
+                 retry: Optional[RetryPolicy] = None, circuit: Optional[CircuitBreaker] = None):
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.circuit = circuit or breaker()
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, *, retries: Optional[int] = None, **kwargs) -> requests.Response:
+        # retries=None — по политике (идемпотентные методы), 0 — без повторов
+        kwargs.setdefault("timeout", self.timeout)
+        host = host_of(url)
+        attempts = self.retry.attempts(method, retries)
+        for attempt in range(attempts):
+            if not self.circuit.allow(host):
+                raise HostDown(f"{host} недоступен, следующая попытка через {self.circuit.retry_in(host):.0f} с")
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.circuit.failure(host)
+                if attempt + 1 >= attempts:
+                    raise
+                delay = self.retry.delay(attempt)
+            else:
+                retry = r.status_code in self.retry.statuses and attempt + 1 < attempts
+                delay = self.retry.delay(attempt, r.headers) if retry else None
+                if delay is None:
+                    # 5xx считается автомату один раз на запрос: один сломанный эндпоинт не размыкает весь хост
+                    if is_host_failure(r.status_code):
+                        self.circuit.failure(host)
+                    else:
+                        self.circuit.success(host)
+                    return r
+                r.close()
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def options(self, url: str, **kwargs) -> requests.Response:
+        return self.request("OPTIONS", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_CLIENT: Optional[HttpClient] = None
+_LOCK = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    global _CLIENT
+    if _CLIENT is None:
+        with _LOCK:
+            if _CLIENT is None:
+                _CLIENT = HttpClient()
+    return _CLIENT
+
+
+def configure(**kwargs) -> HttpClient:
+    global _CLIENT
+    with _LOCK:
+        old, _CLIENT = _CLIENT, HttpClient(**kwargs)
+    if old is not None:
+        old.close()
+    return _CLIENT
@@ -0,0 +1,105 @@
+import os
+import threading
+import uuid
+from typing import Callable, Dict, Iterable, Optional
+
+CHUNK_SIZE = 256 * 1024
+MIN_THROUGHPUT = 64 * 1024  # байт/с: хуже этого соединение считаем зависшим
+STALL_TIMEOUT = 30
+
+
+class UploadCancelled(Exception):
+    pass
+
+
+def upload_timeout(size: int, base: float = STALL_TIMEOUT) -> tuple:
+    # (connect/send, read): на отправку действует таймаут каждой операции сокета,
+    # а ответа после большого файла ждём пропорционально его размеру
+    return base, max(base, size / MIN_THROUGHPUT)
+
+
+def _part_head(boundary: str, file_field: str, filename: str, content_type: str,
+               fields: Optional[Dict[str, str]]) -> bytes:
+    head = b""
+    for name, value in (fields or {}).items():
+        head += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                 f'{value}\r\n').encode()
+    fn = filename.replace('"', "%22")
+    head += (f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+             f'filename="{fn}"\r\nContent-Type: {content_type}\r\n\r\n').encode()
+    return head
+
+
+# multipart/form-data, который читает файл кусками по мере отправки: память не зависит от размера файла
+class MultipartStream:
+    def __init__(self, file_field: str, file_path: str, fields: Optional[Dict[str, str]] = None, *,
+                 filename: str = None, content_type: str = "application/octet-stream",
+                 chunk_size: int = CHUNK_SIZE, on_progress: Callable[[int, int], None] = None,
+                 cancel: threading.Event = None):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.boundary = uuid.uuid4().hex
+        self.file_size = os.path.getsize(file_path)
+        self._head = _part_head(self.boundary, file_field, filename or os.path.basename(file_path),
+                                content_type, fields)
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.size = len(self)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self._head) + self.file_size + len(self._tail)
+
+    def _check_cancel(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise UploadCancelled("Отправка отменена")
+
+    def _report(self, sent: int):
+        if self.on_progress is not None:
+            self.on_progress(sent, len(self))
+
+    def __iter__(self):
+        self._check_cancel()
+        sent = len(self._head)
+        yield self._head
+        self._report(sent)
+        with open(self.file_path, "rb") as f:
+            while True:
+                self._check_cancel()
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+                sent += len(chunk)
+                self._report(sent)
+        yield self._tail
+        self._report(len(self))
+
+
+# то же для источника неизвестной длины (ZIP на лету): без __len__ requests шлёт Transfer-Encoding: chunked;
+# прогресс сообщает сам источник, size — оценка для таймаута
+class ChunkedMultipartStream:
+    def __init__(self, file_field: str, chunks: Iterable[bytes], filename: str,
+                 fields: Optional[Dict[str, str]] = None, *, content_type: str = "application/octet-stream",
+                 size_hint: int = 0, cancel: threading.Event = None):
+        self.chunks = chunks
+        self.cancel = cancel
+        self.boundary = uuid.uuid4().hex
+        self._head = _part_head(self.boundary, file_field, filename, content_type, fields)
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.size = len(self._head) + size_hint + len(self._tail)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __iter__(self):
+        if self.cancel is not None and self.cancel.is_set():
+            raise UploadCancelled("Отправка отменена")
+        yield self._head
+        yield from self.chunks
+        yield self._tail
@@ -1,14 +1,22 @@
 import os
 import re
+import json
+import time
+import threading
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from typing import Tuple, Dict, Any, List, Optional
 from urllib.parse import urlparse
 from utils.config import FS_BEARER
+from utils import db
 from utils import config
-from utils.db import get_fs_bearer, set_fs_bearer as db_set_fs_bearer, \
-                    get_fs_directory, set_fs_directory as db_set_fs_directory, \
-                    get_fs_host, set_fs_host as db_set_fs_host
 import requests
+import urllib3
+from backend.http_client import get_client as _http
+from backend.downloader import download_file, download_many, BATCH_WORKERS
+from backend.multipart import ChunkedMultipartStream, MultipartStream, upload_timeout
+from backend.zipstream import ZipFolderStream
+from backend import upload_dedupe
 
 BASE_URL = "https://mapi.itstep.org/v1/mystat"
 API_BASE = "https://mapi.itstep.org"
@@ -26,6 +34,100 @@ FS_HOSTS = [
 ]
 FS_HOST_CANDIDATES = ["fsx3.itstep.org","fsx2.itstep.org","fsx1.itstep.org","fsx4.itstep.org","fsx5.itstep.org"]
 
+# сколько секунд ответ считается свежим; после — отдаём из кэша и обновляем в фоне
+CACHE_TTL = {
+    "auth/me":               24 * 3600,
+    "statistic/attendance":  30 * 60,
+    "statistic/progress":    60 * 60,
+    "progress/leader-table": 5 * 60,
+    "progress/activity":     5 * 60,
+    "schedule/get-month":    6 * 3600,
+    "homework/list":         2 * 60,
+    "reviews/list":          10 * 60,
+}
+
+
+RECONNECT_EVERY = 15  # сек между проверками связи в офлайне
+
+
+class ApiError(RuntimeError):
+    # ответ сервера с кодом ошибки; status нужен, чтобы отличать «повторить позже» от «не примут никогда»
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiUnavailable(RuntimeError):
+    pass
+
+
+# состояние связи с MyStat: офлайн включается при сетевой ошибке/5xx, данные тогда берутся из кэша любого возраста
+_NET = {"online": True, "offline_since": 0.0, "stale_since": 0.0}
+_NET_LOCK = threading.Lock()
+_NET_LISTENERS = []
+_RECONNECTING = threading.Event()
+
+
+def add_net_listener(fn) -> None:
+    _NET_LISTENERS.append(fn)
+
+
+def remove_net_listener(fn) -> None:
+    if fn in _NET_LISTENERS:
+        _NET_LISTENERS.remove(fn)
+
+
+def net_status() -> dict:
+    with _NET_LOCK:
+        return dict(_NET)
+
+
+def _notify_net() -> None:
+    st = net_status()
+    for fn in list(_NET_LISTENERS):
+        try:
+            fn(st)
+        except Exception as e:
+            print("net listener error:", e)
+
+
+def _mark_offline(stale_at: float = None) -> None:
+    with _NET_LOCK:
+        went_offline = _NET["online"]
+        if went_offline:
+            _NET.update(online=False, offline_since=time.time(), stale_since=0.0)
+        changed = went_offline
+        if stale_at and (not _NET["stale_since"] or stale_at < _NET["stale_since"]):
+            _NET["stale_since"] = stale_at
+            changed = True
+    if changed:
+        _notify_net()
+    if went_offline and not _RECONNECTING.is_set():
+        _RECONNECTING.set()
+        threading.Thread(target=_reconnect_loop, name="mystat-reconnect", daemon=True).start()
+
+
+def _mark_online() -> None:
+    with _NET_LOCK:
+        if _NET["online"]:
+            return
+        _NET.update(online=True, offline_since=0.0, stale_since=0.0)
+    _notify_net()
+
+
+def _reconnect_loop() -> None:
+    try:
+        while not net_status()["online"]:
+            time.sleep(RECONNECT_EVERY)
+            try:
+                r = _http().head(API_BASE, timeout=5, retries=0)
+            except Exception:
+                continue
+            if r.status_code < 500:
+                _mark_online()
+    finally:
+        _RECONNECTING.clear()
+
 
 def _auth_headers(token: str) -> Dict[str, str]:
     return {
@@ -46,75 +148,196 @@ def _city_or_default(city: Optional[str] = None) -> str:
     except Exception:
         return "aqtobe"
 
-def get_user_info(token: str) -> Dict[str, Any]:
-    r = requests.post(f"{BASE_URL}/auth/me", headers=_auth_headers(token))
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mystat")
+    return _EXECUTOR
+
+def _cache_key(endpoint: str, city: str, params: Optional[dict], token: str) -> str:
+    # пользователь в ключе: ответы разных аккаунтов не смешиваются даже до очистки кэша при смене входа
+    return f"{endpoint}|{db.account_of(token)}|{city}|{json.dumps(params or {}, sort_keys=True)}"
+
+def _fetch_json(method: str, url: str, token: str, params: Optional[dict], key: str):
+    headers = _auth_headers(token)
+    hit = db.cache_get(key)
+    if hit:
+        body, _, etag, last_modified = hit
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    try:
+        r = _http().request(method, url, headers=headers, params=params, timeout=30)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        # сюда же попадает HostDown: автомат API-хоста разомкнут после серии отказов
+        _mark_offline(hit[1] if hit else None)
+        raise ApiUnavailable(f"Нет связи с MyStat: {e}") from e
+    _mark_online()
+    if r.status_code >= 500:
+        # сломан один эндпоинт, а не связь: баннер «нет связи» не включаем
+        raise ApiError(r.status_code, f"Ошибка {r.status_code}: {r.text}")
+    if r.status_code == 304 and hit:
+        db.cache_touch(key)
+        return json.loads(hit[0])
     if r.status_code == 200:
-        return r.json()
+        js = r.json()
+        db.cache_put(key, r.text, r.headers.get("ETag", ""), r.headers.get("Last-Modified", ""))
+        return js
     _raise(r)
 
-def get_attendance(token: str, period: str = "month", *, city: str = None) -> Dict[str, Any]:
+_REVALIDATING = set()
+_REVALIDATING_LOCK = threading.Lock()
+_CACHE_LISTENERS = []
+
+
+def add_cache_listener(fn) -> None:
+    # fn(endpoint) — фоновая перепроверка принесла новые данные, экран стоит перерисовать
+    _CACHE_LISTENERS.append(fn)
+
+
+def remove_cache_listener(fn) -> None:
+    if fn in _CACHE_LISTENERS:
+        _CACHE_LISTENERS.remove(fn)
+
+
+def _notify_cache(key: str) -> None:
+    endpoint = key.split("|", 1)[0]
+    for fn in list(_CACHE_LISTENERS):
+        try:
+            fn(endpoint)
+        except Exception as e:
+            print("cache listener error:", e)
+
+
+def _refresh_changed(before, key: str) -> bool:
+    after = db.cache_get(key)
+    return bool(after) and (not before or after[0] != before[0])
+
+
+def _revalidate(method: str, url: str, token: str, params: Optional[dict], key: str):
+    try:
+        before = db.cache_get(key)
+        _fetch_json(method, url, token, params, key)
+        if _refresh_changed(before, key):
+            _notify_cache(key)
+    except ApiUnavailable:
+        pass  # офлайн уже отмечен в _fetch_json
+    except Exception as e:
+        print("cache revalidate error:", key, e)
+    finally:
+        with _REVALIDATING_LOCK:
+            _REVALIDATING.discard(key)
+
+def _cached_json(endpoint: str, url: str, token: str, params: Optional[dict] = None, *,
+                 city: str = "", method: str = "GET", fresh: bool = False, strict: bool = False):
+    key = _cache_key(endpoint, city, params, token)
+    if not fresh:
+        hit = db.cache_get(key)
+        if hit:
+            body, fetched_at, _, _ = hit
+            if time.time() - fetched_at >= CACHE_TTL.get(endpoint, 0):
+                with _REVALIDATING_LOCK:
+                    stale = key not in _REVALIDATING
+                    _REVALIDATING.add(key)
+                if stale:
+                    _executor().submit(_revalidate, method, url, token, params, key)
+            return json.loads(body)
+    try:
+        return _fetch_json(method, url, token, params, key)
+    except (ApiUnavailable, ApiError) as e:
+        # офлайн или 5xx: последний сохранённый ответ любого возраста лучше пустого экрана;
+        # strict — вызывающему (фоновой синхронизации) нужна именно свежая выборка или ошибка
+        hit = None if strict else db.cache_get(key)
+        if hit:
+            print("cache fallback:", key, e)
+            return json.loads(hit[0])
+        raise
+
+def get_user_info(token: str, *, fresh: bool = False, strict: bool = False) -> Dict[str, Any]:
+    return _cached_json("auth/me", f"{BASE_URL}/auth/me", token, method="POST", fresh=fresh, strict=strict)
+
+def get_attendance(token: str, period: str = "month", *, city: str = None,
+                   fresh: bool = False, strict: bool = False) -> Dict[str, Any]:
     c = _city_or_default(city)
-    r = requests.get(
-        f"{BASE_URL}/{c}/statistic/attendance",
-        headers=_auth_headers(token),
-        params={"period": period},
-        timeout=30,
-    )
-    if r.status_code == 200:
-        return r.json()
-    _raise(r)
+    return _cached_json("statistic/attendance", f"{BASE_URL}/{c}/statistic/attendance", token,
+                        {"period": period}, city=c, fresh=fresh, strict=strict)
 
-def get_progress(token: str, period: str = "year", *, city: str = None) -> Dict[str, Any]:
+def get_progress(token: str, period: str = "year", *, city: str = None,
+                 fresh: bool = False, strict: bool = False) -> Dict[str, Any]:
     c = _city_or_default(city)
-    r = requests.get(
-        f"{BASE_URL}/{c}/statistic/progress",
-        headers=_auth_headers(token),
-        params={"period": period},
-        timeout=30,
-    )
-    if r.status_code == 200:
-        return r.json()
-    _raise(r)
+    return _cached_json("statistic/progress", f"{BASE_URL}/{c}/statistic/progress", token,
+                        {"period": period}, city=c, fresh=fresh, strict=strict)
 
-def get_leader_table(token: str, *, city: str = None) -> dict:
+def get_leader_table(token: str, *, city: str = None, fresh: bool = False, strict: bool = False) -> dict:
     c = _city_or_default(city)
     url = f"{API_BASE}/v1/mystat/{c}/progress/leader-table"
-    r = requests.get(url, headers=_auth_headers(token), timeout=30)
-    r.raise_for_status()
-    return r.json()
+    return _cached_json("progress/leader-table", url, token, city=c, fresh=fresh, strict=strict)
 
-def get_activity(token: str, page: int = 1, per_page: int = 20, *, city: str = None) -> List[Dict[str, Any]]:
+def get_activity(token: str, page: int = 1, per_page: int = 20, *, city: str = None,
+                 fresh: bool = False, strict: bool = False) -> List[Dict[str, Any]]:
     c = _city_or_default(city)
-    r = requests.get(
-        f"{BASE_URL}/{c}/progress/activity",
-        headers=_auth_headers(token),
-        params={"new_format": 1, "per_page": per_page, "page": page},
-        timeout=30,
-    )
-    if r.status_code == 200:
-        return r.json()
-    _raise(r)
+    return _cached_json("progress/activity", f"{BASE_URL}/{c}/progress/activity", token,
+                        {"new_format": 1, "per_page": per_page, "page": page}, city=c, fresh=fresh, strict=strict)
 
-def get_schedule(token: str, date_filter: str, *, city: str = None) -> Dict[str, Any]:
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    try:
+        return fn(*args, **kwargs), None, time.perf_counter() - t0
+    except Exception as e:
+        return None, e, time.perf_counter() - t0
+
+def fetch_dashboard(token: str, city: str = None, *, fresh: bool = False, strict: bool = False) -> Dict[str, Any]:
     c = _city_or_default(city)
-    r = requests.get(
-        f"{BASE_URL}/{c}/schedule/get-month",
-        headers=_auth_headers(token),
-        params={"type": "day", "date_filter": date_filter},
-        timeout=30,
-    )
-    if r.status_code == 200:
-        return r.json()
-    _raise(r)
+    calls = {
+        "user":        (get_user_info, (token,), {"fresh": fresh, "strict": strict}),
+        "attendance":  (get_attendance, (token, "month"), {"city": c, "fresh": fresh, "strict": strict}),
+        "progress":    (get_progress, (token, "year"), {"city": c, "fresh": fresh, "strict": strict}),
+        "leaders":     (get_leader_table, (token,), {"city": c, "fresh": fresh, "strict": strict}),
+        "activity":    (get_activity, (token, 1, 20), {"city": c, "fresh": fresh, "strict": strict}),
+    }
+    t0 = time.perf_counter()
+    futures = {name: _executor().submit(_timed, fn, *args, **kw) for name, (fn, args, kw) in calls.items()}
+    data, errors, timings = {}, {}, {}
+    for name, fut in futures.items():
+        value, err, elapsed = fut.result()
+        timings[name] = elapsed
+        if err is None:
+            data[name] = value
+        else:
+            errors[name] = err
+    return {"data": data, "errors": errors, "timings": timings, "elapsed": time.perf_counter() - t0}
+
+def get_schedule(token: str, date_filter: str, *, city: str = None,
+                 fresh: bool = False, strict: bool = False) -> Dict[str, Any]:
+    c = _city_or_default(city)
+    return _cached_json("schedule/get-month", f"{BASE_URL}/{c}/schedule/get-month", token,
+                        {"type": "day", "date_filter": date_filter}, city=c, fresh=fresh, strict=strict)
 
-def get_homeworks(token: str, status: int, limit: int = 1000, sort: str = "-hw.time", *, city: str = None):
+def get_schedule_month(token: str, year: int, month: int, *, city: str = None,
+                       fresh: bool = False, strict: bool = False) -> List[Dict[str, Any]]:
+    c = _city_or_default(city)
+    js = _cached_json("schedule/get-month", f"{BASE_URL}/{c}/schedule/get-month", token,
+                      {"type": "month", "date_filter": f"{year:04d}-{month:02d}-01"},
+                      city=c, fresh=fresh, strict=strict)
+    return js.get("data", []) if isinstance(js, dict) else (js or [])
+
+def get_homeworks(token: str, status: int, limit: int = 1000, sort: str = "-hw.time", *,
+                  city: str = None, fresh: bool = False, strict: bool = False, page: int = None):
     c = _city_or_default(city)
     url = f"{API_BASE}/v1/mystat/{c}/homework/list"
-    r = requests.get(url, headers=_auth_headers(token), params={"status": status, "limit": limit, "sort": sort}, timeout=30)
-    r.raise_for_status()
-    js = r.json()
+    params = {"status": status, "limit": limit, "sort": sort}
+    if page is not None:
+        params["page"] = page
+    js = _cached_json("homework/list", url, token, params, city=c, fresh=fresh, strict=strict)
     return js.get("data", []), js.get("_meta", {})
 
+LOGIN_HEAD_START = 3  # сек форы для стратегии входа, сработавшей в прошлый раз
+
 def login_with_credentials(*args, **kwargs) -> str:
     city = kwargs.get("city")
     if len(args) == 2:
@@ -126,7 +349,7 @@ def login_with_credentials(*args, **kwargs) -> str:
 
     c = _city_or_default(city)
 
-    ses = requests.Session()
+    ses = _http()
     candidates = [
         (f"{API_BASE}/v1/mystat/auth/login",        "json", {"login": identifier, "password": password}),
         (f"{API_BASE}/v1/mystat/{c}/auth/login",    "json", {"login": identifier, "password": password}),
@@ -149,54 +372,67 @@ def login_with_credentials(*args, **kwargs) -> str:
         return None
 
     jwt_re = re.compile(r'^[A-Za-z0-9\-\_]+\.[A-Za-z0-9\-\_]+\.[A-Za-z0-9\-\_]+$')
-    errors = []
 
-    for url, mode, payload in candidates:
+    def _attempt(url, mode, payload):
+        # (token, None) при успехе, (None, описание ошибки) иначе
         try:
             r = ses.post(url, json=payload, timeout=30) if mode == "json" else ses.post(url, data=payload, timeout=30)
         except Exception as e:
-            errors.append(f"{url} — exception: {e}")
-            continue
+            return None, f"{url} — exception: {e}"
 
         if r.status_code == 200:
             try:
-                js = r.json()
-                tok = _extract_token_from_json(js)
+                tok = _extract_token_from_json(r.json())
                 if tok:
-                    return tok
+                    return tok, None
             except Exception:
                 pass
             raw = (r.text or "").strip().strip('"').strip("'")
             if jwt_re.match(raw):
-                return raw
-            errors.append(f"{url} — 200, но не распознан токен: {r.text[:180]}")
-            continue
+                return raw, None
+            return None, f"{url} — 200, но не распознан токен: {r.text[:180]}"
 
         try:
-            errors.append(f"{url} — HTTP {r.status_code}: {r.text[:200]}")
+            return None, f"{url} — HTTP {r.status_code}: {r.text[:200]}"
         except Exception:
-            errors.append(f"{url} — HTTP {r.status_code}")
-
-    raise RuntimeError("Login failed. Tried:\n" + "\n".join(errors))
+            return None, f"{url} — HTTP {r.status_code}"
 
+    errors = []
+    ex = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="login")
+    try:
+        # стратегия, сработавшая в прошлый раз для этого филиала, стартует первой и получает фору;
+        # не ответила за LOGIN_HEAD_START — к ней наперегонки подключаются остальные
+        remembered = db.get_login_strategy(c)
+        first = [cand for cand in candidates if cand[:2] == remembered][:1]
+        futures = {ex.submit(_attempt, *cand): cand for cand in first}
+        if futures and wait(futures, timeout=LOGIN_HEAD_START).done:
+            tok, err = next(iter(futures)).result()
+            if tok:
+                return tok
+            errors.append(err)
+            futures = {}
+        futures.update({ex.submit(_attempt, *cand): cand for cand in candidates if cand not in first})
+        # первый валидный токен выигрывает, оставшиеся отменяются
+        for fut in as_completed(futures):
+            tok, err = fut.result()
+            if tok:
+                url, mode, _ = futures[fut]
+                if (url, mode) != remembered:
+                    db.set_login_strategy(c, url, mode)
+                return tok
+            errors.append(err)
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
 
-def get_homeworks(token: str, status: int, limit: int = 1000, sort: str = "-hw.time"):
-    url = f"{API_BASE}/v1/mystat/{CITY}/homework/list"
-    headers = {"Authorization": f"Bearer {token}"}
-    params = {"status": status, "limit": limit, "sort": sort}
-    r = requests.get(url, headers=headers, params=params, timeout=30)
-    r.raise_for_status()
-    js = r.json()
-    return js.get("data", []), js.get("_meta", {})
+    raise RuntimeError("Login failed. Tried:\n" + "\n".join(errors))
 
 
-def get_reviews(token: str, page: int = 1, mark_as_read: bool = False) -> dict:
+def get_reviews(token: str, page: int = 1, mark_as_read: bool = False, *,
+                fresh: bool = False, strict: bool = False) -> dict:
     url = f"{API_BASE}/v1/mystat/{CITY}/reviews/list"
-    headers = {"Authorization": f"Bearer {token}"}
     params = {"mark_as_read": "true" if mark_as_read else "false", "page": page}
-    r = requests.get(url, headers=headers, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    # mark_as_read меняет состояние на сервере — такой запрос всегда идёт в сеть
+    return _cached_json("reviews/list", url, token, params, city=CITY, fresh=fresh or mark_as_read, strict=strict)
 
 
 def _filename_from_cd(cd: str) -> Optional[str]:
@@ -213,66 +449,49 @@ def _ext_from_content_type(ct: str) -> str:
     return ext or (".zip" if ct == "application/octet-stream" else ".bin")
 
 
-def download_homework_file(token: str, file_url: str, save_dir: str) -> str:
-    os.makedirs(save_dir, exist_ok=True)
-    headers = {"Authorization": f"Bearer {token}"}
-    with requests.get(file_url, headers=headers, stream=True, timeout=120) as r:
-        r.raise_for_status()
-        cd = r.headers.get("content-disposition") or r.headers.get("Content-Disposition") or ""
-        ct = r.headers.get("content-type") or r.headers.get("Content-Type") or ""
-        fn = _filename_from_cd(cd)
-        if not fn or fn.lower() == "attachment" or "." not in fn:
-            tail = file_url.rstrip("/").split("/")[-1]
-            base = tail if tail and tail != "files" else "attachment"
-            ext = _ext_from_content_type(ct)
-            if not base.endswith(ext):
-                fn = f"{base}{ext}"
-            else:
-                fn = base
-        path = os.path.join(save_dir, fn)
-        with open(path, "wb") as f:
-            for chunk in r.iter_content(8192):
-                if chunk:
-                    f.write(chunk)
-    return path
-
-
-def _try_upload_once(url: str, token: str, file_path: str, with_auth: bool, token_in_query: bool = False) -> str:
-    up_url = url
-    if token_in_query:
-        sep = "&" if "?" in up_url else "?"
-        up_url = f"{up_url}{sep}access-token={token}"
-
-    headers = {
-        "Accept": "application/json, text/plain, */*",
-        "Origin": "https://mystat.itstep.org",
-        "Referer": "https://mystat.itstep.org/",
-        "X-Requested-With": "XMLHttpRequest",
-    }
-    if with_auth:
-        headers["Authorization"] = f"Bearer {token}"
+def _homework_filename(file_url: str, headers) -> str:
+    cd = headers.get("content-disposition") or headers.get("Content-Disposition") or ""
+    ct = headers.get("content-type") or headers.get("Content-Type") or ""
+    fn = _filename_from_cd(cd)
+    if not fn or fn.lower() == "attachment" or "." not in fn:
+        tail = file_url.rstrip("/").split("/")[-1]
+        base = tail if tail and tail != "files" else "attachment"
+        ext = _ext_from_content_type(ct)
+        if not base.endswith(ext):
+            fn = f"{base}{ext}"
+        else:
+            fn = base
+    return fn
 
-    with open(file_path, "rb") as f:
-        files = {"file": (os.path.basename(file_path), f)}
-        r = requests.post(up_url, headers=headers, files=files, allow_redirects=True, timeout=60)
 
-    if r.status_code not in (200, 201):
-        raise Exception(f"HTTP {r.status_code}: {r.text}")
+def download_homework_file(token: str, file_url: str, save_dir: str, *,
+                           on_progress=None, cancel: threading.Event = None) -> str:
+    return download_file(file_url, save_dir, headers={"Authorization": f"Bearer {token}"},
+                         name_for=lambda h: _homework_filename(file_url, h),
+                         on_progress=on_progress, cancel=cancel)
+
 
-    if "application/json" in r.headers.get("Content-Type", ""):
-        data = r.json()
-        if isinstance(data, dict):
-            if data.get("url"):
-                return data["url"]
-            for k in ("uuid", "id", "file", "hash"):
-                if data.get(k):
-                    return re.sub(r"/api/v1/files/?$", f"/api/v1/files/{data[k]}", url)
+def download_homework_files(token: str, homeworks: List[dict], save_dir: str, *, workers: int = BATCH_WORKERS,
+                            on_progress=None, on_item=None, cancel: threading.Event = None) -> dict:
+    # имя с id задания: у разных ДЗ файлы часто называются одинаково
+    headers = {"Authorization": f"Bearer {token}"}
+    jobs = []
+    for hw in homeworks:
+        url = (hw.get("file_path") or "").strip()
+        if not url or url == "-":
+            continue
+        jobs.append({"url": url, "save_dir": save_dir, "headers": headers,
+                     "name_for": lambda h, u=url, i=hw.get("id"): f"{i}_{_homework_filename(u, h)}"})
+    return download_many(jobs, workers=workers, on_progress=on_progress, on_item=on_item, cancel=cancel)
 
-    m = re.search(r'"(?:uuid|id|file|hash)"\s*:\s*"([A-Za-z0-9_\-]+)"', r.text or "")
-    if m:
-        return re.sub(r"/api/v1/files/?$", f"/api/v1/files/{m.group(1)}", url)
 
-    raise Exception(f"Не удалось распознать ответ FS: {r.text[:200]}")
+def _upload_body(file_field: str, path: str, fields: dict = None, *, on_progress=None, cancel=None):
+    # папка уходит ZIP-архивом, который собирается прямо во время отправки
+    if os.path.isdir(path):
+        z = ZipFolderStream(path, on_progress=on_progress, cancel=cancel)
+        return ChunkedMultipartStream(file_field, z, z.filename, fields, content_type="application/zip",
+                                      size_hint=z.total, cancel=cancel)
+    return MultipartStream(file_field, path, fields, on_progress=on_progress, cancel=cancel)
 
 
 def _guess_fs_base_from_examples(examples: List[str]) -> Optional[str]:
@@ -284,45 +503,171 @@ def _guess_fs_base_from_examples(examples: List[str]) -> Optional[str]:
             return f"https://{m.group(1)}/api/v1/files/"
     return None
 
-def _host_ok(host, bearer):
+FS_RANK_TTL = 600  # сек: столько живёт рейтинг FS-хостов, потом перепроверяем
+FS_PROBE_TIMEOUT = 5
+
+
+class FsHostDown(RuntimeError):
+    pass
+
+
+class FsUploadError(ApiError):
+    # FS ответил, но файл не принял (4xx, странный ответ): другой хост и повтор не помогут
+    pass
+
+
+def _fs_base(host: str) -> str:
+    host = (host or "").strip().rstrip("/")
+    return host if "://" in host else f"https://{host}"
+
+
+def _probe_fs_host(host: str, bearer: str) -> Optional[float]:
+    t0 = time.perf_counter()
     try:
-        r = requests.options(f"https://{host}/api/v1/files", headers={"Authorization": f"Bearer {bearer}"}, timeout=10)
-        return r.status_code in (200, 204)
+        r = _http().options(f"{_fs_base(host)}/api/v1/files", headers={"Authorization": f"Bearer {bearer}"},
+                            timeout=FS_PROBE_TIMEOUT, retries=0)
+        if r.status_code in (200, 204):
+            return time.perf_counter() - t0
     except Exception:
-        return False
-
-def _pick_fs_host(bearer):
-    h = get_fs_host()
-    if h and _host_ok(h, bearer):
-        return h
-    for x in FS_HOST_CANDIDATES:
-        if _host_ok(x, bearer):
-            db_set_fs_host(x)
-            return x
-    raise RuntimeError("FS: нет доступного хоста")
-
-def upload_to_fs(token: str, file_path: str, directory: str = "", fs_bearer: str = "", fs_host: str = "") -> str:
+        pass
+    return None
+
+
+def _fs_score(st: dict) -> float:
+    rate = st["ok"] / max(st["ok"] + st["fail"], 1e-6)
+    if st["rtt"] is None or rate < 0.5:
+        return float("inf")
+    return st["rtt"] / rate
+
+
+_FS_PROBING: Dict[tuple, Any] = {}  # (хост, токен) -> Future идущей проверки
+_FS_PROBING_LOCK = threading.Lock()
+
+
+def _probe_in_background(host: str, bearer: str):
+    # проверка с токеном: ответивший хост запоминается как принимающий этот токен
+    with _FS_PROBING_LOCK:
+        fut = _FS_PROBING.get(host)
+        if fut is not None:
+            return fut
+
+        def run():
+            try:
+                rtt = _probe_fs_host(host, bearer)
+                db.fs_host_record(host, rtt is not None, rtt)
+                if rtt is not None:
+                    db.add_fs_bearer_host(bearer, host)
+            finally:
+                with _FS_PROBING_LOCK:
+                    _FS_PROBING.pop((host, bearer), None)
+
+        fut = _FS_PROBING[(host, bearer)] = _executor().submit(run)
+        return fut
+
+
+def rank_fs_hosts(bearer: str, prefer: str = "", *, fresh: bool = False) -> List[str]:
+    # только хосты, принявшие этот токен: домен из file-token первым, пока он не помечен нерабочим.
+    # Остальные FS_HOST_CANDIDATES проверяются с токеном в фоне и попадают в список, если приняли его;
+    # загрузка проверок не ждёт, fresh=True — перепроверить всех и дождаться
+    hosts = list(dict.fromkeys([_fs_base(h) for h in [prefer, *db.get_fs_bearer_hosts(bearer)] if h]))
+    candidates = [h for h in dict.fromkeys(_fs_base(c) for c in FS_HOST_CANDIDATES) if h not in hosts]
+    stats = db.fs_hosts_get()
+    stale = [h for h in hosts + candidates
+             if fresh or h not in stats or time.time() - stats[h]["checked_at"] > FS_RANK_TTL]
+    probes = [_probe_in_background(h, bearer) for h in stale]
+    if fresh:
+        for f in probes:
+            f.result()
+        hosts = list(dict.fromkeys(hosts + db.get_fs_bearer_hosts(bearer)))
+        stats = db.fs_hosts_get()
+    down = [h for h in hosts if h in stats and _fs_score(stats[h]) == float("inf")]
+    up = [h for h in hosts if h not in down]
+    return up[:1] + sorted(up[1:], key=lambda h: _fs_score(stats[h]) if h in stats else float("inf")) + down
+
+
+def _upload_once(base: str, bearer: str, file_path: str, directory: str, on_progress, cancel) -> str:
+    body = _upload_body("files[]", file_path, {"directory": directory} if directory else None,
+                        on_progress=on_progress, cancel=cancel)
+    headers = {"Authorization": f"Bearer {bearer}", "Content-Type": body.content_type}
+    r = _http().post(f"{base}/api/v1/files", headers=headers, data=body, timeout=upload_timeout(body.size))
+    if r.status_code >= 500:
+        raise FsHostDown(f"FS upload error {r.status_code}: {r.text}")
+    if r.status_code not in (200, 201):
+        raise FsUploadError(r.status_code, f"FS upload error {r.status_code}: {r.text}")
+    try:
+        js = r.json()
+    except ValueError:
+        js = None
+    if isinstance(js, list) and js and js[0].get("link"):
+        return js[0].get("link")
+    if isinstance(js, dict) and js.get("link"):
+        return js.get("link")
+    raise FsUploadError(r.status_code, f"FS upload: неожиданный ответ {r.text}")
+
+
+def _upload_to_hosts(hosts: List[str], bearer: str, file_path: str, directory: str, digest, size,
+                     on_progress, cancel) -> str:
+    # хост умер посреди загрузки — начинаем заново на следующем по рейтингу
+    last_err = None
+    for base in hosts:
+        try:
+            link = _upload_once(base, bearer, file_path, directory, on_progress, cancel)
+        except (FsHostDown, requests.ConnectionError, requests.Timeout, urllib3.exceptions.HTTPError) as e:
+            db.fs_host_record(base, False)
+            print("FS upload failover:", base, e)
+            last_err = e
+            continue
+        db.fs_host_record(base, True)
+        db.add_fs_bearer_host(bearer, base)
+        if digest:
+            upload_dedupe.remember_link(digest, size, base, directory, link)
+        return link
+    raise FsHostDown(f"FS: загрузка не удалась ни на одном хосте: {last_err}")
+
+
+def _upload_with_failover(hosts: List[str], bearer: str, file_path: str, directory: str, digest, size,
+                          on_progress, cancel) -> str:
+    try:
+        return _upload_to_hosts(hosts, bearer, file_path, directory, digest, size, on_progress, cancel)
+    except FsHostDown:
+        # все известные хосты лежат: проверяем кандидатов с этим токеном сейчас и пробуем принявших его
+        extra = [h for h in rank_fs_hosts(bearer, hosts[0] if hosts else "", fresh=True) if h not in hosts]
+        if not extra:
+            raise
+    return _upload_to_hosts(extra, bearer, file_path, directory, digest, size, on_progress, cancel)
+
+
+def upload_to_fs(token: str, file_path: str, directory: str = "", fs_bearer: str = "", fs_host: str = "", *,
+                 on_progress=None, cancel: threading.Event = None) -> str:
+    cached_creds = not fs_bearer
+    given_dir = directory
     if not fs_bearer or not fs_host:
         host, bearer, auto_dir = ensure_fs_credentials(token)
         fs_host = fs_host or host
         fs_bearer = fs_bearer or bearer
         directory = directory or auto_dir
-    url = f"{fs_host}/api/v1/files"
-    with open(file_path, "rb") as f:
-        files = [("files[]", (os.path.basename(file_path), f, "application/octet-stream"))]
-        data = {}
-        if directory:
-            data["directory"] = directory
-        headers = {"Authorization": f"Bearer {fs_bearer}"}
-        r = requests.post(url, headers=headers, files=files, data=data, timeout=30)
-    if r.status_code not in (200, 201):
-        raise RuntimeError(f"FS upload error {r.status_code}: {r.text}")
-    js = r.json()
-    if isinstance(js, list) and js:
-        return js[0].get("link")
-    if isinstance(js, dict) and js.get("link"):
-        return js.get("link")
-    raise RuntimeError(f"FS upload: неожиданный ответ {r.text}")
+    hosts = rank_fs_hosts(fs_bearer, fs_host)
+    # тот же файл уже лежит на FS в этой папке — ссылка из локального индекса, без загрузки
+    digest = size = None
+    if os.path.isfile(file_path):
+        size = os.path.getsize(file_path)
+        digest = upload_dedupe.file_digest(file_path, cancel)
+        link = upload_dedupe.find_link(digest, size, hosts, directory)
+        if link:
+            if on_progress is not None:
+                on_progress(size, size)
+            return link
+    try:
+        return _upload_with_failover(hosts, fs_bearer, file_path, directory, digest, size, on_progress, cancel)
+    except FsUploadError as e:
+        if e.status not in (401, 403) or not cached_creds:
+            raise
+    # сохранённый FS-токен протух: забываем его, берём новый у MyStat и пробуем ещё раз
+    db.set_many({"fs_bearer": "", "fs_directory": ""})
+    host, fs_bearer, auto_dir = ensure_fs_credentials(token)
+    hosts = rank_fs_hosts(fs_bearer, host)
+    return _upload_with_failover(hosts, fs_bearer, file_path, given_dir or auto_dir, digest, size,
+                                 on_progress, cancel)
 
 
 def homework_create(token: str, homework_id: int, filename_url: str, answer_text: str = ""):
@@ -333,9 +678,9 @@ def homework_create(token: str, homework_id: int, filename_url: str, answer_text
         "filename": filename_url,
         "id": homework_id,
     }
-    r = requests.post(url, headers=headers, json=payload, timeout=60)
+    r = _http().post(url, headers=headers, json=payload, timeout=60)
     if r.status_code not in (200, 201):
-        raise RuntimeError(f"Create failed {r.status_code}: {r.text}")
+        raise ApiError(r.status_code, f"Create failed {r.status_code}: {r.text}")
     try:
         return r.json()
     except Exception:
@@ -343,7 +688,7 @@ def homework_create(token: str, homework_id: int, filename_url: str, answer_text
 
 def delete_homework(token: str, stud_homework_id: int) -> bool:
     url = f"{API_BASE}/v1/mystat/{CITY}/homework/delete/{int(stud_homework_id)}"
-    r = requests.delete(url, headers=_auth_headers(token), timeout=30)
+    r = _http().delete(url, headers=_auth_headers(token), timeout=30)
     if r.status_code in (200, 201, 204):
         try:
             js = r.json()
@@ -356,14 +701,13 @@ def delete_homework(token: str, stud_homework_id: int) -> bool:
 
 def get_user_file_token(token: str) -> dict:
     url = f"{API_BASE}/v1/mystat/{CITY}/user/file-token"
-    r = requests.get(url, headers=_auth_headers(token), timeout=20)
+    r = _http().get(url, headers=_auth_headers(token), timeout=20)
     r.raise_for_status()
     return r.json()
 
 def ensure_fs_credentials(token: str):
-    host = get_fs_host()
-    bearer = get_fs_bearer()
-    directory = get_fs_directory()
+    kv = db.get_many(["fs_host", "fs_bearer", "fs_directory"])
+    host, bearer, directory = kv["fs_host"], kv["fs_bearer"], kv["fs_directory"]
     if host and bearer and directory:
         return host, bearer, directory
     js = get_user_file_token(token)
@@ -372,9 +716,10 @@ def ensure_fs_credentials(token: str):
     directory = (js.get("directories") or {}).get("homeworkDirId") or ""
     if not (host and bearer):
         raise RuntimeError("Не удалось получить FS доступ")
-    db_set_fs_host(host)
-    db_set_fs_bearer(bearer)
+    creds = {"fs_host": host, "fs_bearer": bearer}
     if directory:
-        db_set_fs_directory(directory)
+        creds["fs_directory"] = directory
+    db.set_many(creds)
+    db.add_fs_bearer_host(bearer, _fs_base(host))
     return host, bearer, directory
 
@@ -0,0 +1,94 @@
+import asyncio
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from backend import mystat_api as api
+from backend.downloader import BATCH_WORKERS
+from backend.multipart import UploadCancelled
+
+
+# корутины поверх синхронного mystat_api: кэш, повторы и автомат хостов остаются в одном месте,
+# а запросы и обращения к SQLite идут в потоках, не блокируя event loop
+async def get_homeworks_all(token: str, limit: int = 1000, *, city: str = None,
+                            fresh: bool = False, strict: bool = False) -> Dict[int, tuple]:
+    statuses = (3, 2, 1)
+    res = await asyncio.gather(*(asyncio.to_thread(api.get_homeworks, token, st, limit, city=city,
+                                                   fresh=fresh, strict=strict)
+                                 for st in statuses))
+    return dict(zip(statuses, res))
+
+
+async def homework_create(token: str, homework_id: int, filename_url: str, answer_text: str = ""):
+    return await asyncio.to_thread(api.homework_create, token, homework_id, filename_url, answer_text)
+
+
+async def login_with_credentials(*args, **kwargs) -> str:
+    return await asyncio.to_thread(api.login_with_credentials, *args, **kwargs)
+
+
+async def upload_to_fs(token: str, file_path: str, directory: str = "", fs_bearer: str = "", fs_host: str = "", *,
+                       on_progress=None, cancel: threading.Event = None) -> str:
+    return await asyncio.to_thread(api.upload_to_fs, token, file_path, directory, fs_bearer, fs_host,
+                                   on_progress=on_progress, cancel=cancel)
+
+
+async def submit_homework(token: str, homework_id: int, file_path: str, answer_text: str = "", *,
+                          on_progress=None, cancel: threading.Event = None):
+    link = await upload_to_fs(token, file_path, on_progress=on_progress, cancel=cancel)
+    if cancel is not None and cancel.is_set():
+        raise UploadCancelled("Отправка отменена")
+    return await homework_create(token, int(homework_id), link, answer_text)
+
+
+async def download_homework_file(token: str, file_url: str, save_dir: str, *,
+                                 on_progress=None, cancel: threading.Event = None) -> str:
+    return await asyncio.to_thread(api.download_homework_file, token, file_url, save_dir,
+                                   on_progress=on_progress, cancel=cancel)
+
+
+async def download_homework_files(token: str, homeworks: List[dict], save_dir: str, *,
+                                  workers: int = BATCH_WORKERS, on_progress=None, on_item=None,
+                                  cancel: threading.Event = None) -> dict:
+    return await asyncio.to_thread(api.download_homework_files, token, homeworks, save_dir, workers=workers,
+                                   on_progress=on_progress, on_item=on_item, cancel=cancel)
+
+
+# отдельный поток с event loop: из GUI/синхронного кода корутины отправляются через submit()
+class LoopThread:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="mystat-async", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_LOOP: Optional[LoopThread] = None
+_LOOP_LOCK = threading.Lock()
+
+
+def loop_thread() -> LoopThread:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = LoopThread()
+            atexit.register(_LOOP.stop)
+    return _LOOP
+
+
+def submit(coro) -> Future:
+    return loop_thread().submit(coro)
+
+
+def run_sync(coro, timeout: float = None):
+    return submit(coro).result(timeout)
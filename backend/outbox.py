@@ -0,0 +1,232 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from backend import mystat_api as api
+from backend import upload_dedupe
+from backend.multipart import UploadCancelled
+from utils import db
+
+OUTBOX_WORKERS = 3        # параллельных отправок; create каждой идёт сразу после её загрузки
+BACKOFF_BASE = 5          # сек до первого повтора, дальше удваивается
+BACKOFF_MAX = 15 * 60
+JITTER = 0.2
+MAX_ATTEMPTS = 8
+PROGRESS_EVERY = 0.25     # сек между событиями прогресса одной отправки
+IDLE_WAIT = 30
+
+# queued -> uploading -> uploaded (ссылка FS сохранена) -> creating -> done; после ошибки — назад с next_at или failed
+PENDING_STATES = ("queued", "uploading", "uploaded", "creating")
+STATE_TITLES = {
+    "queued": "в очереди", "uploading": "загрузка файла", "uploaded": "файл загружен",
+    "creating": "отправка ответа", "done": "отправлено", "failed": "ошибка",
+}
+
+
+# очередь отправок в SQLite: переживает перезапуск и отсутствие сети, фоновый поток разбирает её с backoff;
+# подписчики получают события {"type": ..., "id": ...}
+class Outbox:
+    def __init__(self, token: str, workers: int = OUTBOX_WORKERS):
+        self.token = token
+        self.workers = workers
+        self._listeners: List[Callable[[dict], None]] = []
+        self._active: Dict[int, threading.Event] = {}
+        self._progress: Dict[int, tuple] = {}
+        self._reported: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._net_listener = lambda st: self._wake.set() if st.get("online") else None
+
+    def subscribe(self, fn: Callable[[dict], None]) -> None:
+        self._listeners.append(fn)
+
+    def unsubscribe(self, fn: Callable[[dict], None]) -> None:
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _emit(self, event: dict) -> None:
+        for fn in list(self._listeners):
+            try:
+                fn(event)
+            except Exception as e:
+                print("outbox listener error:", e)
+
+    def enqueue(self, homework_id: int, path: str, answer: str = "") -> int:
+        # тот же файл на то же задание уже ждёт отправки — вторую запись не заводим
+        for it in db.outbox_list(PENDING_STATES):
+            if it["homework_id"] == int(homework_id) and it["path"] == path:
+                return it["id"]
+        upload_dedupe.prehash(path)
+        item_id = db.outbox_add(int(homework_id), path, answer)
+        self._emit({"type": "queued", "id": item_id})
+        self._wake.set()
+        return item_id
+
+    def items(self) -> List[dict]:
+        return db.outbox_list()
+
+    def item(self, item_id: int) -> Optional[dict]:
+        return db.outbox_get(item_id)
+
+    def pending(self) -> List[dict]:
+        return db.outbox_list(PENDING_STATES)
+
+    def progress(self, item_id: int) -> Optional[tuple]:
+        return self._progress.get(item_id)
+
+    def retry(self, item_id: int) -> None:
+        it = db.outbox_get(item_id)
+        if it is None or it["state"] != "failed":
+            return
+        db.outbox_update(item_id, state="uploaded" if it["link"] else "queued", attempts=0, error="",
+                         next_at=time.time())
+        self._emit({"type": "changed", "id": item_id})
+        self._wake.set()
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            cancel = self._active.get(item_id)
+        if cancel is not None:
+            cancel.set()
+        db.outbox_delete(item_id)
+        self._emit({"type": "removed", "id": item_id})
+
+    def clear_done(self) -> None:
+        for it in db.outbox_list(("done",)):
+            db.outbox_delete(it["id"])
+        self._emit({"type": "changed", "id": None})
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+        return delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def _transient(self, e: Exception) -> bool:
+        # нет файла, пустая папка, 4xx от MyStat или FS — повтор не поможет
+        if isinstance(e, (FileNotFoundError, ValueError)):
+            return False
+        status = e.status if isinstance(e, api.ApiError) else None
+        if isinstance(e, requests.HTTPError) and e.response is not None:
+            status = e.response.status_code
+        if status is not None:
+            return status >= 500 or status in (408, 429)
+        return True  # сеть, таймаут, все FS-хосты недоступны
+
+    def _on_progress(self, item_id: int, done: int, total: int) -> None:
+        self._progress[item_id] = (done, total)
+        now = time.monotonic()
+        if done >= total or now - self._reported.get(item_id, 0) >= PROGRESS_EVERY:
+            self._reported[item_id] = now
+            self._emit({"type": "progress", "id": item_id, "done": done, "total": total})
+
+    def _homeworks(self, status: int):
+        # все страницы списка: ДЗ могло уехать дальше первой
+        page = 1
+        while True:
+            items, meta = api.get_homeworks(self.token, status, fresh=True, strict=True, page=page)
+            yield from items
+            if not items or page >= int((meta or {}).get("pageCount") or 1):
+                return
+            page += 1
+
+    def _already_created(self, homework_id: int, link: str) -> bool:
+        # прошлый create мог дойти, а ответ потеряться: ДЗ уже на проверке или проверено — второй раз не создаём;
+        # в «к выполнению» (например, вернули на доработку) считаем отправленным, только если там наша ссылка
+        for status in (2, 1, 3):
+            for hw in self._homeworks(status):
+                if hw.get("id") != homework_id:
+                    continue
+                if status != 3:
+                    return True
+                return bool(link) and link in json.dumps(hw.get("homework_stud") or {}, ensure_ascii=False)
+        return False
+
+    def _process(self, item: dict) -> None:
+        item_id = item["id"]
+        cancel = self._active[item_id]
+        link = item["link"]
+        try:
+            if not link:
+                db.outbox_update(item_id, state="uploading")
+                self._emit({"type": "changed", "id": item_id})
+                if not os.path.exists(item["path"]):
+                    raise FileNotFoundError(f"Файл не найден: {item['path']}")
+                link = api.upload_to_fs(self.token, item["path"], cancel=cancel,
+                                        on_progress=lambda d, t: self._on_progress(item_id, d, t))
+                # ссылка сохранена до create: повтор после сбоя файл заново не загружает
+                db.outbox_update(item_id, state="uploaded", link=link)
+            if cancel.is_set():
+                raise UploadCancelled("Отправка отменена")
+            db.outbox_update(item_id, state="creating")
+            self._emit({"type": "changed", "id": item_id})
+            if not (item["create_tried"] and self._already_created(item["homework_id"], link)):
+                db.outbox_update(item_id, create_tried=1)
+                api.homework_create(self.token, item["homework_id"], link, item["answer"])
+            db.outbox_update(item_id, state="done", error="")
+            self._emit({"type": "done", "id": item_id, "homework_id": item["homework_id"]})
+        except UploadCancelled:
+            pass  # запись удалена пользователем
+        except Exception as e:
+            attempts = item["attempts"] + 1
+            failed = not self._transient(e) or attempts >= MAX_ATTEMPTS
+            if db.outbox_get(item_id) is not None:
+                db.outbox_update(item_id, state="failed" if failed else ("uploaded" if link else "queued"),
+                                 attempts=attempts, error=str(e), next_at=time.time() + self._backoff(attempts))
+            print(f"outbox #{item_id} error:", e)
+            self._emit({"type": "failed" if failed else "retry", "id": item_id, "error": str(e)})
+        finally:
+            with self._lock:
+                self._active.pop(item_id, None)
+            self._progress.pop(item_id, None)
+            self._wake.set()
+
+    def _next_wait(self) -> float:
+        with self._lock:
+            active = set(self._active)
+        due = [it["next_at"] or 0 for it in db.outbox_list(("queued", "uploaded")) if it["id"] not in active]
+        return max(0.0, min(due) - time.time()) if due else IDLE_WAIT
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            if api.net_status()["online"]:
+                now = time.time()
+                with self._lock:
+                    free = self.workers - len(self._active)
+                    due = [it for it in db.outbox_list(("queued", "uploaded"))
+                           if (it["next_at"] or 0) <= now and it["id"] not in self._active][:max(free, 0)]
+                    for it in due:
+                        self._active[it["id"]] = threading.Event()
+                for it in due:
+                    self._pool.submit(self._process, it)
+                wait = self._next_wait()
+            else:
+                wait = IDLE_WAIT  # проснёмся по событию «сеть вернулась»
+            self._wake.wait(min(wait, IDLE_WAIT))
+            self._wake.clear()
+
+    def start(self) -> "Outbox":
+        if self._thread is None or not self._thread.is_alive():
+            # прерванные закрытием приложения шаги начинаются заново
+            for it in db.outbox_list(("uploading", "creating")):
+                db.outbox_update(it["id"], state="uploaded" if it["link"] else "queued")
+            self._stop.clear()
+            self._pool = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="outbox")
+            api.add_net_listener(self._net_listener)
+            self._thread = threading.Thread(target=self.run_forever, name="mystat-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        api.remove_net_listener(self._net_listener)
+        self._stop.set()
+        self._wake.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
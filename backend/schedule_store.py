@@ -0,0 +1,122 @@
+import calendar
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from backend.mystat_api import get_schedule, get_schedule_month, _city_or_default
+from utils import db
+
+_DAY_FIELDS = ("date", "day", "lesson_date", "started_at", "start_date", "date_start")
+_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_DMY = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})")
+
+# запросы по дням идут отдельным маленьким пулом: ~30 запросов месяца не должны занимать общий _executor
+DAY_WORKERS = 3
+_DAY_POOL: Optional[ThreadPoolExecutor] = None
+_DAY_POOL_LOCK = threading.Lock()
+
+
+def _day_pool() -> ThreadPoolExecutor:
+    global _DAY_POOL
+    with _DAY_POOL_LOCK:
+        if _DAY_POOL is None:
+            _DAY_POOL = ThreadPoolExecutor(max_workers=DAY_WORKERS, thread_name_prefix="schedule-day")
+    return _DAY_POOL
+
+
+def _lesson_day(les: dict) -> str:
+    # "" — дата занятия не нашлась (в ответе бывает только time_start/time_end)
+    for k in _DAY_FIELDS:
+        v = str(les.get(k) or "")
+        m = _ISO.match(v)
+        if m:
+            return m.group(0)
+        m = _DMY.match(v)
+        if m:
+            return f"{m.group(3)}-{m.group(2)}-{m.group(1)}"
+    return ""
+
+
+def _month_key(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+# расписание целыми месяцами: индекс «дата → занятия» в памяти и в SQLite
+class ScheduleStore:
+    def __init__(self, token: str, city: str = None):
+        self.token = token
+        self.city = _city_or_default(city)
+        self._days: Dict[str, List[dict]] = {}
+        self._months = set()
+        self._lock = threading.Lock()
+
+    def _apply(self, year: int, month: int, by_day: Dict[str, List[dict]]) -> None:
+        prefix = _month_key(year, month)
+        with self._lock:
+            for day in [d for d in self._days if d.startswith(prefix)]:
+                del self._days[day]
+            self._days.update(by_day)
+            self._months.add((year, month))
+
+    def restore_month(self, year: int, month: int) -> bool:
+        by_day = db.schedule_get_month(self.city, _month_key(year, month))
+        if by_day is None:
+            return False
+        self._apply(year, month, by_day)
+        return True
+
+    def _load_days(self, year: int, month: int, fresh: bool, strict: bool) -> Dict[str, List[dict]]:
+        # запасной путь: по запросу на день, дата занятия тогда известна из самого запроса
+        days = [f"{_month_key(year, month)}-{d:02d}" for d in range(1, calendar.monthrange(year, month)[1] + 1)]
+        futures = {day: _day_pool().submit(get_schedule, self.token, day, city=self.city, fresh=fresh, strict=strict)
+                   for day in days}
+        by_day = {}
+        for day, fut in futures.items():
+            js = fut.result()  # ошибка любого дня — ошибка месяца: неполный месяц не сохраняем
+            lessons = js.get("data", []) if isinstance(js, dict) else (js or [])
+            if lessons:
+                by_day[day] = list(lessons)
+        return by_day
+
+    def load_month(self, year: int, month: int, *, fresh: bool = False, strict: bool = False,
+                   fallback: bool = True) -> Optional[Dict[str, List[dict]]]:
+        # fallback=False — для предзагрузки соседних месяцев: без дат месяц не грузим по дням и возвращаем None
+        by_day: Dict[str, List[dict]] = {}
+        lessons = get_schedule_month(self.token, year, month, city=self.city, fresh=fresh, strict=strict)
+        days = [_lesson_day(les) for les in lessons]
+        if "" in days and not fallback:
+            return None
+        if "" in days:
+            # без даты занятие не разложить по дням; раньше такие молча отбрасывались и месяц кэшировался пустым
+            print(f"schedule {_month_key(year, month)}: {days.count('')} занятий без даты, загружаем по дням")
+            by_day = self._load_days(year, month, fresh, strict)
+        else:
+            for les, day in zip(lessons, days):
+                if day.startswith(_month_key(year, month)):
+                    by_day.setdefault(day, []).append(les)
+        for lessons in by_day.values():
+            lessons.sort(key=lambda x: x.get("time_start") or "")
+        db.schedule_put_month(self.city, _month_key(year, month), by_day)
+        self._apply(year, month, by_day)
+        return by_day
+
+    def has_month(self, year: int, month: int) -> bool:
+        return (year, month) in self._months
+
+    def lessons_on(self, day: str) -> Optional[List[dict]]:
+        # None — месяц ещё не загружен, [] — занятий нет
+        if (int(day[:4]), int(day[5:7])) not in self._months:
+            return None
+        return self._days.get(day, [])
+
+    def days_with_lessons(self, year: int, month: int) -> List[str]:
+        prefix = _month_key(year, month)
+        with self._lock:
+            return sorted(d for d, lessons in self._days.items() if d.startswith(prefix) and lessons)
+
+
+def adjacent_months(year: int, month: int):
+    prev = (year - 1, 12) if month == 1 else (year, month - 1)
+    nxt = (year + 1, 1) if month == 12 else (year, month + 1)
+    return [(year, month), prev, nxt]
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+from backend import mystat_api as api
+from backend import mystat_async
+from backend.homework_store import hw_key
+from backend.schedule_store import ScheduleStore
+from utils import db
+
+# как часто (сек) обновлять каждый ресурс; вся стоимость опроса настраивается здесь
+SYNC_INTERVALS = {
+    "dashboard": 5 * 60,
+    "activity":  5 * 60,
+    "homework":  2 * 60,
+    "reviews":   10 * 60,
+    "schedule":  6 * 3600,
+}
+JITTER = 0.2        # ±20% к интервалу, чтобы клиенты не били в API синхронно
+BACKOFF_MAX = 30 * 60
+
+
+def _digest(data) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
+
+
+def _review_key(r: dict) -> str:
+    return "|".join(str(r.get(k) or "") for k in ("date", "full_spec", "spec", "teacher", "message"))
+
+
+def _mark_key(a: dict) -> str:
+    return "|".join(str(a.get(k) or "") for k in ("created_at", "lesson_name", "name", "mark"))
+
+
+# фоновая синхронизация: каждый ресурс по своему расписанию пишет свежие данные в SQLite,
+# подписчики получают события {"type": ..., "resource": ..., "items": [...]}
+class SyncDaemon:
+    def __init__(self, token: str, city: str = None, intervals: Dict[str, float] = None):
+        self.token = token
+        self.city = api._city_or_default(city)
+        self.intervals = dict(SYNC_INTERVALS, **(intervals or {}))
+        self._listeners: List[Callable[[dict], None]] = []
+        self._due = {name: 0.0 for name in self.intervals}
+        self._failures = {name: 0 for name in self.intervals}
+        self._digests: Dict[str, str] = {}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fetchers = {
+            "dashboard": self._sync_dashboard,
+            "activity":  self._sync_activity,
+            "homework":  self._sync_homework,
+            "reviews":   self._sync_reviews,
+            "schedule":  self._sync_schedule,
+        }
+
+    def subscribe(self, fn: Callable[[dict], None]) -> None:
+        self._listeners.append(fn)
+
+    def unsubscribe(self, fn: Callable[[dict], None]) -> None:
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _emit(self, event: dict) -> None:
+        for fn in list(self._listeners):
+            try:
+                fn(event)
+            except Exception as e:
+                print("sync listener error:", e)
+
+    def _changed(self, name: str, data) -> None:
+        d = _digest(data)
+        if self._digests.get(name) != d:
+            self._digests[name] = d
+            self._emit({"type": "changed", "resource": name})
+
+    def _new_items(self, name: str, items: list, key) -> list:
+        # «увиденные» ключи хранятся в БД: новое за время, пока приложение было закрыто, тоже придёт событием
+        kv = f"sync_seen:{self.city}:{db.account_of(self.token)}:{name}"
+        raw = db.get_many([kv])[kv]
+        keys = {key(it): it for it in items}
+        db.set_many({kv: json.dumps(sorted(keys))})
+        if not raw:
+            return []
+        seen = set(json.loads(raw))
+        return [it for k, it in keys.items() if k not in seen]
+
+    def _sync_dashboard(self):
+        res = api.fetch_dashboard(self.token, self.city, fresh=True, strict=True)
+        if res["data"]:
+            self._changed("dashboard", res["data"])
+        # хоть один блок не обновился — попытка неудачная, следующая пойдёт с backoff
+        if res["errors"] or not res["data"]:
+            raise next(iter(res["errors"].values()), RuntimeError("dashboard: пустой ответ"))
+
+    def _sync_activity(self):
+        items = api.get_activity(self.token, 1, 20, city=self.city, fresh=True, strict=True) or []
+        self._changed("activity", items)
+        marks = self._new_items("activity", [a for a in items if a.get("mark") not in (None, "")], _mark_key)
+        if marks:
+            self._emit({"type": "mark_new", "resource": "activity", "items": marks})
+
+    def _sync_homework(self):
+        by_status = mystat_async.run_sync(
+            mystat_async.get_homeworks_all(self.token, city=self.city, fresh=True, strict=True))
+        self._changed("homework", {st: items for st, (items, _) in by_status.items()})
+        new = self._new_items("homework", by_status.get(3, ([], {}))[0], lambda hw: json.dumps(hw_key(hw)))
+        if new:
+            self._emit({"type": "homework_new", "resource": "homework", "items": new})
+
+    def _sync_reviews(self):
+        items = (api.get_reviews(self.token, fresh=True, strict=True) or {}).get("data", [])
+        self._changed("reviews", items)
+        new = self._new_items("reviews", items, _review_key)
+        if new:
+            self._emit({"type": "review_new", "resource": "reviews", "items": new})
+
+    def _sync_schedule(self):
+        today = date.today()
+        by_day = ScheduleStore(self.token, self.city).load_month(today.year, today.month, fresh=True, strict=True)
+        self._changed("schedule", by_day)
+
+    def _next_delay(self, name: str) -> float:
+        base = self.intervals[name]
+        n = self._failures[name]
+        if n:
+            base = min(base * 2 ** n, max(base, BACKOFF_MAX))
+        return base * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def run_once(self, name: str) -> bool:
+        try:
+            # запросы идут со strict=True: сбой ресурса — исключение, а не тихий ответ из кэша
+            self._fetchers[name]()
+        except Exception as e:
+            self._failures[name] += 1
+            print(f"sync {name} error:", e)
+            ok = False
+        else:
+            self._failures[name] = 0
+            ok = True
+        self._due[name] = time.monotonic() + self._next_delay(name)
+        return ok
+
+    def sync_now(self, name: str = None) -> None:
+        for n in ([name] if name else list(self._due)):
+            self._due[n] = 0.0
+        self._wake.set()
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            name = min(self._due, key=self._due.get)
+            wait = self._due[name] - time.monotonic()
+            if wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            self.run_once(name)
+
+    def start(self, delay: float = 0) -> "SyncDaemon":
+        # delay: первый проход позже, когда окно уже прочитало кэш (устаревшее оно обновит само)
+        if self._thread is None or not self._thread.is_alive():
+            now = time.monotonic()
+            for name in self._due:
+                self._due[name] = now + delay * random.uniform(1, 1 + JITTER)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="mystat-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Iterable, Optional
+
+import requests
+
+from backend.http_client import get_client as _http
+from backend.multipart import UploadCancelled
+from utils import db
+
+HASH_CHUNK = 1024 * 1024
+LINK_RECHECK = 3600  # сек: чаще не проверяем, жива ли ссылка на FS
+
+_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hash")
+_pending: dict = {}  # (path, mtime, size) -> Future
+_lock = threading.Lock()
+
+
+def _file_key(path: str) -> tuple:
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def _hash_file(key: tuple, cancel: threading.Event = None) -> str:
+    path, mtime, size = key
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise UploadCancelled("Отправка отменена")
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    digest = h.hexdigest()
+    db.file_hash_put(path, mtime, size, digest)
+    return digest
+
+
+def _background(key: tuple) -> Future:
+    with _lock:
+        fut = _pending.get(key)
+        if fut is None:
+            fut = _pool.submit(_hash_file, key)
+            _pending[key] = fut
+            fut.add_done_callback(lambda _f: _pending.pop(key, None))
+        return fut
+
+
+def prehash(path: str) -> Optional[Future]:
+    # считаем хэш сразу после выбора файла, пока пользователь пишет комментарий
+    if not os.path.isfile(path):
+        return None
+    key = _file_key(path)
+    if db.file_hash_get(*key):
+        return None
+    return _background(key)
+
+
+def file_digest(path: str, cancel: threading.Event = None) -> str:
+    # sha256 по кэшу (путь, mtime, размер); если файл уже хэшируется в фоне — дожидаемся его
+    key = _file_key(path)
+    digest = db.file_hash_get(*key)
+    if digest:
+        return digest
+    fut = _background(key)
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise UploadCancelled("Отправка отменена")
+        try:
+            return fut.result(timeout=0.2)
+        except FutureTimeout:
+            continue
+
+
+def _link_alive(link: str) -> Optional[bool]:
+    # True/False — ответ сервера, None — проверить не удалось
+    try:
+        r = _http().head(link, timeout=10, allow_redirects=True)
+    except requests.RequestException:
+        return None
+    if r.status_code in (404, 410):
+        return False
+    return r.status_code < 400 or None
+
+
+def find_link(digest: str, size: int, hosts: Iterable[str], directory: str) -> Optional[str]:
+    hit = db.fs_upload_find(digest, size, directory, hosts)
+    if hit is None:
+        return None
+    if time.time() - (hit["checked_at"] or 0) < LINK_RECHECK:
+        return hit["link"]
+    alive = _link_alive(hit["link"])
+    if alive is False:
+        db.fs_upload_forget(hit["link"])
+        return None
+    if alive is None:
+        return None  # неизвестно — надёжнее загрузить заново
+    db.fs_upload_checked(hit["link"])
+    return hit["link"]
+
+
+def remember_link(digest: str, size: int, host: str, directory: str, link: str) -> None:
+    if link:
+        db.fs_upload_put(digest, size, host, directory, link)
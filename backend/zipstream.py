@@ -0,0 +1,142 @@
+import fnmatch
+import os
+import queue
+import threading
+import zipfile
+from typing import Callable, Iterable, List, Tuple
+
+from backend.multipart import CHUNK_SIZE, UploadCancelled
+
+# каталоги, которые никто не хочет видеть в решении: зависимости, VCS, окружения, сборка
+IGNORE_DIRS = {
+    "node_modules", ".git", ".hg", ".svn", "venv", ".venv", "env", "__pycache__", ".idea", ".vs", ".vscode",
+    "build", "dist", "out", "bin", "obj", "target", ".gradle", ".next", ".pytest_cache", ".mypy_cache",
+}
+IGNORE_FILES = ("*.pyc", "*.pyo", "*.class", "*.o", "*.obj", "*.exe", "*.dll", "*.so", ".DS_Store", "Thumbs.db")
+# уже сжатое не пережимаем — только тратит CPU
+STORE_EXT = {".zip", ".7z", ".rar", ".gz", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp3", ".mp4", ".docx",
+             ".xlsx", ".pptx"}
+QUEUE_CHUNKS = 16  # столько кусков CHUNK_SIZE может ждать отправки — потолок памяти
+
+
+def folder_entries(root: str, ignore_dirs=IGNORE_DIRS, ignore_files=IGNORE_FILES) -> List[Tuple[str, str, int]]:
+    # [(путь, имя в архиве, размер)]; игнорируемые каталоги отсекаются целиком, без обхода
+    out = []
+    base = os.path.basename(os.path.normpath(root))
+    for d, dirs, files in os.walk(root):
+        dirs[:] = sorted(x for x in dirs if x not in ignore_dirs)
+        for name in sorted(files):
+            if any(fnmatch.fnmatch(name, pat) for pat in ignore_files):
+                continue
+            path = os.path.join(d, name)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            arc = os.path.join(base, os.path.relpath(path, root)).replace(os.sep, "/")
+            out.append((path, arc, os.path.getsize(path)))
+    return out
+
+
+class _Stopped(Exception):
+    pass
+
+
+# файлоподобный приёмник для ZipFile: режет поток на куски и кладёт в ограниченную очередь
+class _QueueWriter:
+    def __init__(self, q: queue.Queue, stop: threading.Event):
+        self.q = q
+        self.stop = stop
+        self.buf = bytearray()
+
+    def _put(self, item) -> None:
+        while True:
+            if self.stop.is_set():
+                raise _Stopped()
+            try:
+                self.q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data) -> int:
+        self.buf += data
+        while len(self.buf) >= CHUNK_SIZE:
+            self._put(bytes(self.buf[:CHUNK_SIZE]))
+            del self.buf[:CHUNK_SIZE]
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self.buf:
+            self._put(bytes(self.buf))
+            self.buf.clear()
+
+
+# ZIP папки «на лету»: сжатие идёт в отдельном потоке, байты отдаются итератором прямо в тело запроса;
+# каждый проход (в т.ч. повтор на другом FS-хосте) собирает архив заново
+class ZipFolderStream:
+    def __init__(self, folder: str, *, compresslevel: int = 6,
+                 on_progress: Callable[[int, int], None] = None, cancel: threading.Event = None):
+        self.folder = folder
+        self.compresslevel = compresslevel
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.entries = folder_entries(folder)
+        if not self.entries:
+            raise ValueError("В папке нет файлов для отправки (всё отфильтровано правилами игнора)")
+        self.total = sum(size for _, _, size in self.entries)
+        self.filename = os.path.basename(os.path.normpath(folder)) + ".zip"
+
+    def _check(self, stop: threading.Event) -> None:
+        if self.cancel is not None and self.cancel.is_set():
+            raise UploadCancelled("Отправка отменена")
+        if stop.is_set():
+            raise _Stopped()
+
+    def _produce(self, q: queue.Queue, stop: threading.Event) -> None:
+        out = _QueueWriter(q, stop)
+        done = 0
+        try:
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED, compresslevel=self.compresslevel) as zf:
+                for path, arc, size in self.entries:
+                    self._check(stop)
+                    zi = zipfile.ZipInfo.from_file(path, arc, strict_timestamps=False)
+                    stored = os.path.splitext(path)[1].lower() in STORE_EXT
+                    zi.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                    with open(path, "rb") as src, zf.open(zi, "w", force_zip64=size >= zipfile.ZIP64_LIMIT) as dst:
+                        while True:
+                            self._check(stop)
+                            chunk = src.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            dst.write(chunk)
+                            done += len(chunk)
+                            if self.on_progress is not None:
+                                self.on_progress(done, self.total)
+            out.close()
+            out._put(None)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            try:
+                out._put(e)
+            except _Stopped:
+                pass
+
+    def __iter__(self) -> Iterable[bytes]:
+        q: queue.Queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+        stop = threading.Event()
+        worker = threading.Thread(target=self._produce, args=(q, stop), name="zip-stream", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = q.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # отправка оборвалась (ошибка сети, отмена) — останавливаем упаковку
+            stop.set()
@@ -44,3 +44,4 @@ def open_fs_sniffer(parent=None):
     view.setPage(page)
     view.load(QUrl("https://mystat.itstep.org"))
     view.show()
+    return view
@@ -0,0 +1,213 @@
+from datetime import date, datetime as dt
+from typing import List, Optional
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QSize, QRectF
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPainterPath, QPen
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+
+from backend.homework_store import hw_key
+
+ROLE_STUD_ID = Qt.UserRole + 1
+ROLE_HW = Qt.UserRole + 2
+ROLE_SORT = Qt.UserRole + 3
+
+HW_COLUMNS = ["ID", "Создано", "Предмет", "Тема", "Преподаватель", "Дедлайн", "Файл задания"]
+COL_ID, COL_CREATED, COL_SUBJECT, COL_THEME, COL_TEACHER, COL_DEADLINE, COL_FILE = range(7)
+
+SYNC_RESET_AT = 200  # столько новых строк дешевле показать через reset, чем вставлять по одной
+
+
+def fmt_date(s: str) -> str:
+    if not s or s.startswith("-0001"):
+        return "-"
+    try:
+        return dt.strptime(s[:10], "%Y-%m-%d").strftime("%d.%m.%Y")
+    except Exception:
+        return s
+
+
+def deadline_color(deadline_str: str) -> str:
+    try:
+        if not deadline_str or deadline_str.startswith("-0001"):
+            return ""
+        d = dt.strptime(deadline_str[:10], "%Y-%m-%d").date()
+        left = (d - date.today()).days
+        if left < 0:
+            return "#FDE2E2"
+        if left <= 2:
+            return "#FFF2CC"
+        return "#EAF8EE"
+    except Exception:
+        return ""
+
+
+class HomeworkModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: List[dict] = []
+
+    def set_items(self, items: List[dict]) -> None:
+        self.beginResetModel()
+        self._items = list(items or [])
+        self.endResetModel()
+
+    def sync(self, items: List[dict]) -> None:
+        # применяет только разницу с текущими строками: remove/insert/move/dataChanged вместо reset
+        items = list(items or [])
+        new_keys = [hw_key(hw) for hw in items]
+        keep = set(new_keys)
+        if not self._items or len(keep - {hw_key(hw) for hw in self._items}) > SYNC_RESET_AT:
+            self.set_items(items)
+            return
+        for row in range(len(self._items) - 1, -1, -1):
+            if hw_key(self._items[row]) not in keep:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._items[row]
+                self.endRemoveRows()
+
+        rows = {hw_key(hw): i for i, hw in enumerate(self._items)}
+        for i, (key, hw) in enumerate(zip(new_keys, items)):
+            cur = rows.get(key)
+            if cur is None:
+                self.beginInsertRows(QModelIndex(), i, i)
+                self._items.insert(i, hw)
+                self.endInsertRows()
+            elif cur != i:
+                self.beginMoveRows(QModelIndex(), cur, cur, QModelIndex(), i)
+                self._items.insert(i, self._items.pop(cur))
+                self.endMoveRows()
+            if cur is None or cur != i:
+                rows = {hw_key(h): j for j, h in enumerate(self._items)}
+            if self._items[i] != hw:
+                self._items[i] = hw
+                self.dataChanged.emit(self.index(i, 0), self.index(i, len(HW_COLUMNS) - 1))
+
+    def items(self) -> List[dict]:
+        return self._items
+
+    def item(self, row: int) -> Optional[dict]:
+        return self._items[row] if 0 <= row < len(self._items) else None
+
+    def row_of(self, key) -> int:
+        for i, hw in enumerate(self._items):
+            if hw_key(hw) == key:
+                return i
+        return -1
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HW_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HW_COLUMNS[section]
+        return None
+
+    def _raw(self, hw: dict, col: int):
+        return [
+            hw.get("id"),
+            hw.get("creation_time") or "",
+            hw.get("name_spec", "-"),
+            hw.get("theme", "-"),
+            hw.get("fio_teach", "-"),
+            hw.get("completion_time") or "",
+            hw.get("file_path") or "-",
+        ][col]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        hw = self._items[index.row()]
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col in (COL_CREATED, COL_DEADLINE):
+                return fmt_date(self._raw(hw, col))
+            return str(self._raw(hw, col))
+        if role == ROLE_SORT:
+            return self._raw(hw, col)
+        if role == ROLE_HW:
+            return hw
+        if role == ROLE_STUD_ID:
+            return (hw.get("homework_stud") or {}).get("id")
+        if role == Qt.TextAlignmentRole and col not in (COL_THEME, COL_FILE):
+            return Qt.AlignCenter
+        if role == Qt.BackgroundRole and col == COL_DEADLINE:
+            color = deadline_color(hw.get("completion_time") or "")
+            return QColor(color) if color else None
+        return None
+
+
+class HomeworkFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(ROLE_SORT)
+        self.setFilterKeyColumn(-1)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+    def lessThan(self, left, right):
+        a, b = left.data(ROLE_SORT), right.data(ROLE_SORT)
+        if a is None or b is None:
+            return b is not None
+        try:
+            return a < b
+        except TypeError:
+            return str(a) < str(b)
+
+
+# карточка ДЗ рисуется делегатом: никаких виджетов на строку, рисуются только видимые
+class HomeworkCardDelegate(QStyledItemDelegate):
+    MARGIN = 4
+    PAD_X, PAD_Y, GAP = 14, 12, 6
+
+    def _title_font(self, base: QFont) -> QFont:
+        f = QFont(base)
+        f.setPointSizeF(base.pointSizeF() + 2)
+        f.setWeight(QFont.DemiBold)
+        return f
+
+    def sizeHint(self, option, index):
+        th = QFontMetrics(self._title_font(option.font)).height()
+        fh = option.fontMetrics.height()
+        h = self.PAD_Y * 2 + th + (self.GAP + fh) * 2
+        return QSize(option.rect.width(), h + self.MARGIN * 2)
+
+    def paint(self, painter: QPainter, option, index):
+        hw = index.data(ROLE_HW) or {}
+        selected = bool(option.state & QStyle.State_Selected)
+        hover = bool(option.state & QStyle.State_MouseOver)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = QRectF(option.rect).adjusted(1, self.MARGIN, -1, -self.MARGIN)
+        path = QPainterPath()
+        path.addRoundedRect(rect, 14, 14)
+        painter.fillPath(path, QColor("#ffffff"))
+        border = "#7863ff" if selected else ("#d6d6f6" if hover else "#ececf3")
+        painter.setPen(QPen(QColor(border), 1.5 if selected else 1))
+        painter.drawPath(path)
+
+        x = rect.left() + self.PAD_X
+        y = rect.top() + self.PAD_Y
+        w = int(rect.width() - self.PAD_X * 2)
+
+        painter.setFont(self._title_font(option.font))
+        fm = painter.fontMetrics()
+        painter.setPen(QColor("#14151b"))
+        painter.drawText(QRectF(x, y, w, fm.height()), Qt.AlignLeft | Qt.AlignVCenter,
+                         fm.elidedText(hw.get("name_spec", "Задание"), Qt.ElideRight, w))
+        y += fm.height() + self.GAP
+
+        painter.setFont(option.font)
+        fm = painter.fontMetrics()
+        painter.setPen(QColor("#63646d"))
+        painter.drawText(QRectF(x, y, w, fm.height()), Qt.AlignLeft | Qt.AlignVCenter,
+                         fm.elidedText(hw.get("theme", ""), Qt.ElideRight, w))
+        y += fm.height() + self.GAP
+
+        deadline = (hw.get("completion_time") or "").strip()
+        painter.setPen(QColor("#8b8d98"))
+        painter.drawText(QRectF(x, y, w, fm.height()), Qt.AlignLeft | Qt.AlignVCenter,
+                         ("Дедлайн: " + deadline) if deadline else "Без дедлайна")
+        painter.restore()
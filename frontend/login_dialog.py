@@ -1,5 +1,4 @@
 from PyQt5.QtCore import Qt, QEvent
-from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
     QComboBox, QCheckBox, QWidget, QMessageBox
@@ -8,24 +7,26 @@ from PyQt5.QtWidgets import (
 from utils.icons import qicon_from_url, ICON_URLS
 from utils import db
 from backend.mystat_api import login_with_credentials
+from frontend.workers import run_task
 
 PRIMARY = "#6C59F5"
 
 class LoginDialog(QDialog):
     def __init__(self, parent: QWidget = None):
         super().__init__(parent)
+        self._cancelled = False
         self.setWindowTitle("Вход в MyStat")
         self.setWindowModality(Qt.ApplicationModal)
         self.setFixedSize(420, 520)
         self.setAttribute(Qt.WA_DeleteOnClose, True)
-        self.setWindowIcon(QIcon(qicon_from_url(ICON_URLS["favicon"])))
+        self.setWindowIcon(qicon_from_url(ICON_URLS["favicon"], on_ready=self.setWindowIcon))
 
         root = QVBoxLayout(self)
         root.setContentsMargins(28, 28, 28, 28)
         root.setSpacing(10)
 
         logo = QLabel()
-        logo.setPixmap(qicon_from_url(ICON_URLS["favicon"]).pixmap(80, 80))
+        logo.setPixmap(qicon_from_url(ICON_URLS["favicon"], on_ready=lambda ic: logo.setPixmap(ic.pixmap(80, 80))).pixmap(80, 80))
         logo.setAlignment(Qt.AlignCenter)
 
         htitle = QLabel("MyStat Desktop")
@@ -51,8 +52,8 @@ class LoginDialog(QDialog):
         self.ed_pass.setEchoMode(QLineEdit.Password)
 
         self.btn_eye = QPushButton()
-        self.btn_eye.setIcon(qicon_from_url("https://cdn-icons-png.flaticon.com/512/565/565655.png"))
         self.btn_eye.setCheckable(True)
+        self._update_eye_icon()
         self.btn_eye.setCursor(Qt.PointingHandCursor)
         self.btn_eye.setFixedWidth(36)
         self.btn_eye.clicked.connect(self._toggle_echo)
@@ -128,12 +129,13 @@ class LoginDialog(QDialog):
         return super().eventFilter(obj, ev)
 
     def _toggle_echo(self):
-        if self.btn_eye.isChecked():
-            self.ed_pass.setEchoMode(QLineEdit.Normal)
-            self.btn_eye.setIcon(qicon_from_url("https://cdn-icons-png.flaticon.com/512/709/709612.png"))
-        else:
-            self.ed_pass.setEchoMode(QLineEdit.Password)
-            self.btn_eye.setIcon(qicon_from_url("https://cdn-icons-png.flaticon.com/512/565/565655.png"))
+        self.ed_pass.setEchoMode(QLineEdit.Normal if self.btn_eye.isChecked() else QLineEdit.Password)
+        self._update_eye_icon()
+
+    def _update_eye_icon(self):
+        # иконка могла догрузиться после ещё одного переключения: берём ту, что нужна сейчас
+        url = ICON_URLS["eye_off" if self.btn_eye.isChecked() else "eye"]
+        self.btn_eye.setIcon(qicon_from_url(url, on_ready=lambda _: self._update_eye_icon()))
 
     def _set_busy(self, busy: bool):
         for w in (self.cb_city, self.ed_login, self.ed_pass, self.btn_eye, self.chk_remember):
@@ -143,6 +145,8 @@ class LoginDialog(QDialog):
         self.btn_login.setText("Входим…" if busy else "Войти")
 
     def _do_login(self):
+        if not self.btn_login.isEnabled():
+            return
         city = self.cb_city.currentText().strip()
         login = self.ed_login.text().strip()
         pwd   = self.ed_pass.text().strip()
@@ -151,24 +155,39 @@ class LoginDialog(QDialog):
             self._show_err("Заполни логин и пароль.")
             return
 
+        # после «Отмена» диалог ещё жив до deleteLater, поэтому поздний ответ отсекаем флагом
+        self._login_city = city
         self._set_busy(True)
-        try:
-            token = login_with_credentials(city, login, pwd)
-            if isinstance(token, dict):
-                token = token.get("token") or token.get("access_token")
-
-            if not token or not isinstance(token, str):
-                raise RuntimeError("Сервер не вернул токен.")
-
-            db.set_mystat_token(token)
-            if self.chk_remember.isChecked():
-                db.set_city(city)
-
-            self.accept()
-        except Exception as e:
-            self._show_err(str(e) or "Ошибка входа")
-        finally:
-            self._set_busy(False)
+        self.lbl_err.setVisible(False)
+        run_task(login_with_credentials, city, login, pwd,
+                 on_result=self._on_login_done, on_error=self._on_login_failed)
+
+    def reject(self):
+        self._cancelled = True
+        super().reject()
+
+    def _on_login_done(self, token):
+        if self._cancelled:
+            return
+        self._set_busy(False)
+        if isinstance(token, dict):
+            token = token.get("token") or token.get("access_token")
+
+        if not token or not isinstance(token, str):
+            self._show_err("Сервер не вернул токен.")
+            return
+
+        db.set_mystat_token(token)
+        if self.chk_remember.isChecked():
+            db.set_city(self._login_city)
+
+        self.accept()
+
+    def _on_login_failed(self, e):
+        if self._cancelled:
+            return
+        self._set_busy(False)
+        self._show_err(str(e) or "Ошибка входа")
 
     def _show_err(self, msg: str):
         self.lbl_err.setText(msg)
@@ -3,32 +3,43 @@ from PyQt5.QtWidgets import (
     QTableWidget, QTableWidgetItem, QPushButton, QSpacerItem, QFileDialog,
     QMessageBox, QStackedWidget, QListWidget, QListWidgetItem, QFrame, QApplication,
     QInputDialog, QTabWidget, QMenu, QAction, QCalendarWidget, QSplitter, QTableWidgetItem, QListView,
-    QToolButton, QLineEdit, QDialog, QTextEdit, QScrollArea, QGridLayout
+    QToolButton, QLineEdit, QDialog, QTextEdit, QScrollArea, QGridLayout, QComboBox
 )
-from PyQt5.QtGui import QIcon, QColor
-from PyQt5.QtCore import Qt, QUrl, QDate, QSize, pyqtSignal
+from PyQt5.QtGui import QIcon, QColor, QTextCharFormat, QFont
+from PyQt5.QtCore import Qt, QUrl, QDate, QSize, QModelIndex, QTimer, pyqtSignal
 from PyQt5.QtGui import QDesktopServices
 
 import os
-from datetime import date, datetime as dt
+import time
+from datetime import datetime as dt
+from typing import Dict, Optional, Set
 
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from utils import config
+from utils import config, timing
 from backend.mystat_api import (
-    get_user_info, get_attendance, get_progress, get_leader_table, get_activity,
-    get_schedule, get_reviews, get_homeworks,
+    get_progress, get_activity, get_schedule, get_reviews, get_homeworks, fetch_dashboard,
+    add_net_listener, remove_net_listener, net_status,
+    add_cache_listener, remove_cache_listener,
     download_homework_file,
-    upload_to_fs,
-    homework_create,
+    download_homework_files,
     delete_homework,
     _guess_fs_base_from_examples,
     ensure_fs_credentials
 )
-from frontend.fs_sniffer import open_fs_sniffer
 from utils.db import get_fs_directory, set_fs_directory
 from utils.icons import qicon_from_url, ICON_URLS
-ROLE_STUD_ID = Qt.UserRole + 1
+from frontend.workers import run_task, run_async, Progress
+from frontend.progress_chart import ProgressChart, series_from_progress
+from frontend.hw_model import (
+    HomeworkModel, HomeworkFilterProxy, HomeworkCardDelegate,
+    ROLE_HW, COL_CREATED, COL_SUBJECT, COL_DEADLINE
+)
+from backend import mystat_async
+from backend.schedule_store import ScheduleStore, adjacent_months
+from backend.homework_store import HomeworkStore, hw_key
+from backend.upload_dedupe import prehash
+from backend.sync_daemon import SyncDaemon
+from backend.outbox import Outbox, STATE_TITLES
+from backend.batch_submit import Batch, match_files
 
 def _make_badge(title: str, value_text: str, bg: str) -> QWidget:
     w = QWidget()
@@ -61,47 +72,36 @@ def _metric(self, title: str, value_text: str):
     """)
     return w
 
-class PlotCanvas(FigureCanvas):
-    def __init__(self, parent=None, width=5, height=2.4, dpi=100):
-        fig = Figure(figsize=(width, height), dpi=dpi)
-        self.ax = fig.add_subplot(111)
-        super().__init__(fig)
-        self.setParent(parent)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.updateGeometry()
-
-    def plot_progress(self, x_labels, y_values, title="Прогресс за год"):
-        self.ax.clear()
-        self.ax.plot(y_values, marker="o")
-        self.ax.set_title(title)
-        self.ax.set_ylabel("Баллы")
-        self.ax.set_xticks(range(len(x_labels)))
-        self.ax.set_xticklabels(x_labels, rotation=45, ha="right")
-        self.ax.grid(True, axis="y", linestyle="--", alpha=0.3)
-        self.draw()
-        
 class HomeworkDialog(QDialog):
-    def __init__(self, parent, token, hw_id, title):
+    def __init__(self, parent, token, hw_id, title, outbox):
         super().__init__(parent)
         self.token = token
         self.hw_id = hw_id
+        self.outbox = outbox
         self.setWindowTitle(title)
         self.resize(520, 420)
         v = QVBoxLayout(self)
         self.lbl_deadline = QLabel("")
         self.txt = QTextEdit()
         self.btn_file = QPushButton("Выбрать файл…")
+        self.btn_dir = QPushButton("Папка…")
+        self.btn_dir.setToolTip("Папка уйдёт ZIP-архивом без node_modules, .git, venv и сборки")
         self.btn_send = QPushButton("Отправить")
+        self.btn_cancel = QPushButton("Отмена")
         v.addWidget(self.lbl_deadline)
         v.addWidget(self.txt, 1)
         h = QHBoxLayout()
         h.addWidget(self.btn_file)
+        h.addWidget(self.btn_dir)
         h.addStretch(1)
+        h.addWidget(self.btn_cancel)
         h.addWidget(self.btn_send)
         v.addLayout(h)
         self._chosen = ""
         self.btn_file.clicked.connect(self._pick)
+        self.btn_dir.clicked.connect(self._pick_dir)
         self.btn_send.clicked.connect(self._send)
+        self.btn_cancel.clicked.connect(self.reject)
         hist = self.hw.get("communication_history") if hasattr(self, "hw") else None
         if hist:
             box = QGroupBox("Отправленные сообщения"); lv = QVBoxLayout(box)
@@ -115,65 +115,43 @@ class HomeworkDialog(QDialog):
         if p:
             self._chosen = p
             self.btn_file.setText(os.path.basename(p))
+            prehash(p)
+            self.btn_dir.setText("Папка…")
+
+    def _pick_dir(self):
+        p = QFileDialog.getExistingDirectory(self, "Папка с решением")
+        if p:
+            self._chosen = p
+            self.btn_dir.setText(f"{os.path.basename(os.path.normpath(p))}.zip")
+            self.btn_file.setText("Выбрать файл…")
 
     def _send(self):
         if not self._chosen:
-            QMessageBox.warning(self, "Внимание", "Выберите файл.")
+            QMessageBox.warning(self, "Внимание", "Выберите файл или папку.")
             return
-        try:
-            link = upload_to_fs(self.token, self._chosen)
-            homework_create(self.token, self.hw_id, link, self.txt.toPlainText().strip())
-            self.accept()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
-
-class HomeworkCard(QFrame):
-    clicked = pyqtSignal(int)
-
-    def __init__(self, hw: dict, index: int):
-        super().__init__()
-        self.hw = hw
-        self.index = index
-        self.setObjectName("HwCard")
-        self.setProperty("selected", False)
-        self.setFrameShape(QFrame.NoFrame)
-
-        title = hw.get("name_spec", "Задание")
-        theme = hw.get("theme", "")
-        deadline = (hw.get("completion_time") or "").strip()
-
-        title_lbl = QLabel(title)
-        title_lbl.setObjectName("HwTitle")
-
-        sub_lbl = QLabel(theme)
-        sub_lbl.setObjectName("HwSub")
-
-        meta = QLabel(("Дедлайн: " + deadline) if deadline else "Без дедлайна")
-        meta.setObjectName("HwMeta")
-
-        v = QVBoxLayout(self)
-        v.setContentsMargins(14, 12, 14, 12)
-        v.setSpacing(6)
-        v.addWidget(title_lbl)
-        v.addWidget(sub_lbl)
-        v.addWidget(meta)
-
-    def mousePressEvent(self, e):
-        self.clicked.emit(self.index)
-        super().mousePressEvent(e)
-
-    def setSelected(self, on: bool):
-        self.setProperty("selected", bool(on))
-        self.style().unpolish(self)
-        self.style().polish(self)
-
-
+        # отправка уходит в очередь: диалог закрывается сразу, ход виден в «Очереди отправки»
+        self.outbox.enqueue(self.hw_id, self._chosen, self.txt.toPlainText().strip())
+        self.accept()
+
+# какой экран перерисовать, когда фоновая перепроверка кэша принесла новый ответ
+CACHE_RESOURCES = {
+    "auth/me": "dashboard", "statistic/attendance": "dashboard", "statistic/progress": "dashboard",
+    "progress/leader-table": "dashboard", "progress/activity": "activity", "homework/list": "homework",
+    "reviews/list": "reviews", "schedule/get-month": "schedule",
+}
+SYNC_START_DELAY = 20  # сек: стартовые данные окно берёт из кэша, демон подключается следом
+PAGE_DASH, PAGE_HW, PAGE_SCHED, PAGE_REVIEWS = range(4)
 
 class MainWindow(QMainWindow):
+    net_changed = pyqtSignal(object)
+    sync_event = pyqtSignal(object)
+    outbox_event = pyqtSignal(object)
+    cache_changed = pyqtSignal(str)
+
     def __init__(self, token: str):
         super().__init__()
         self.setWindowTitle("MyStat Desktop App")
-        self.setWindowIcon(QIcon(qicon_from_url(ICON_URLS["favicon"])))
+        self.setWindowIcon(qicon_from_url(ICON_URLS["favicon"], on_ready=self.setWindowIcon))
         self.resize(1200, 720)
         self.token = token
         self.fs_directory = "uYjjAT9ZRiNrBHX3vTdEWMWiboZBKK9v"
@@ -187,10 +165,10 @@ class MainWindow(QMainWindow):
         nav.setContentsMargins(8, 8, 8, 8)
         nav.setSpacing(10)
 
-        def _nav_btn(icon_path, tip, index=None, on_click=None):
+        def _nav_btn(icon_url, tip, index=None, on_click=None):
             b = QToolButton()
             b.setObjectName("Nav")
-            b.setIcon(QIcon(icon_path))
+            b.setIcon(qicon_from_url(icon_url, on_ready=b.setIcon))
             b.setIconSize(QSize(26, 26))
             b.setCheckable(True)
             b.setAutoExclusive(True)
@@ -198,43 +176,92 @@ class MainWindow(QMainWindow):
             if on_click is not None:
                 b.clicked.connect(on_click)
             elif index is not None:
-                b.clicked.connect(lambda: self.pages.setCurrentIndex(index))
+                b.clicked.connect(lambda: self._show_page(index))
             nav.addWidget(b, 0, Qt.AlignHCenter)
             return b
 
-        btn_home  = _nav_btn(qicon_from_url(ICON_URLS["home"]), "Главная", 0)
-        btn_hw    = _nav_btn(qicon_from_url(ICON_URLS["homework"]), "Домашние задания", 1)
-        btn_cal   = _nav_btn(qicon_from_url(ICON_URLS["calendar"]), "Расписание", 2)
-        btn_rev   = _nav_btn(qicon_from_url(ICON_URLS["reviews"]), "Отзывы", 3)
+        btn_home  = _nav_btn(ICON_URLS["home"], "Главная", PAGE_DASH)
+        btn_hw    = _nav_btn(ICON_URLS["homework"], "Домашние задания", PAGE_HW)
+        btn_cal   = _nav_btn(ICON_URLS["calendar"], "Расписание", PAGE_SCHED)
+        btn_rev   = _nav_btn(ICON_URLS["reviews"], "Отзывы", PAGE_REVIEWS)
 
-        self.nav_btn_fs = _nav_btn(qicon_from_url(ICON_URLS["key"]),"FS (обновить доступ)", None, on_click=self._refresh_fs_access)
+        self.nav_btn_fs = _nav_btn(ICON_URLS["key"],"FS (обновить доступ)", None, on_click=self._refresh_fs_access)
 
         nav.addStretch(1)
         btn_home.setChecked(True)
         
-        self.hw_tables = {}
-        self.hw_cards = {}
-        self.hw_card_list = {}
-        self.hw_items_by_status: dict[int, list] = {}
-        self.hw_card_widgets: dict[int, list] = {}
-        self.hw_selected_idx: dict[int, int] = {1:-1, 2:-1, 3:-1}
-        self.hw_cards_layout: dict[int, QVBoxLayout] = {}
-
+        self.hw_models: Dict[int, HomeworkModel] = {}
+        self.hw_proxies: Dict[int, HomeworkFilterProxy] = {}
+        self.hw_views: Dict[int, QListView] = {}
+        self.hw_sort_modes = [
+            ("Как на сервере", -1, Qt.AscendingOrder),
+            ("По дедлайну", COL_DEADLINE, Qt.AscendingOrder),
+            ("Сначала новые", COL_CREATED, Qt.DescendingOrder),
+            ("По предмету", COL_SUBJECT, Qt.AscendingOrder),
+        ]
+        self.hw_store = HomeworkStore()
+        self.hw_items_by_status: Dict[int, list] = {}
+        self.hw_selected_idx: Dict[int, int] = {1:-1, 2:-1, 3:-1}
+        self.hw_meta_by_status: Dict[int, dict] = {}
+        self._hw_req: Dict[int, int] = {}
+        self._sched_date = ""
+
+        # страницы строятся при первом переходе: до этого в стеке пустые заглушки
         self.pages = QStackedWidget()
-        self.page_dash = self._build_tab_dashboard()
-        self.page_hw   = self._build_tab_homeworks()
-        self.page_sched= self._build_tab_schedule()
-        self.page_reviews = self._build_tab_reviews()
-
-        self.pages.addWidget(self.page_dash)
-        self.pages.addWidget(self.page_hw)
-        self.pages.addWidget(self.page_sched)
-        self.pages.addWidget(self.page_reviews)
-        self.pages.addWidget(QWidget())
+        self._page_builders = {
+            PAGE_DASH: self._build_tab_dashboard,
+            PAGE_HW: self._build_tab_homeworks,
+            PAGE_SCHED: self._build_tab_schedule,
+            PAGE_REVIEWS: self._build_tab_reviews,
+        }
+        self._pages_built: Set[int] = set()
+        for _ in range(len(self._page_builders) + 1):
+            self.pages.addWidget(QWidget())
+        self._show_page(PAGE_DASH)
+
+        # плашка офлайн-режима над страницами: данные из локального снимка, сверка в фоне
+        self.lbl_net = QLabel()
+        self.lbl_net.setObjectName("NetBanner")
+        self.lbl_net.setVisible(False)
+        content = QVBoxLayout(); content.setContentsMargins(0, 0, 0, 0); content.setSpacing(6)
+        content.addWidget(self.lbl_net)
+        content.addWidget(self.pages, 1)
 
         root.addWidget(self.nav)
-        root.addWidget(self.pages, 1)
+        root.addLayout(content, 1)
         self.setCentralWidget(wrapper)
+
+        # данные обновляет фоновый демон; окно только перечитывает локальное хранилище по его событиям
+        self.sync = SyncDaemon(token)
+        self._sync_listener = self.sync_event.emit
+        self.sync.subscribe(self._sync_listener)
+        self.sync_event.connect(self._on_sync_event)
+        self.sync.start(delay=SYNC_START_DELAY)
+
+        # отправки решений идут через очередь в SQLite: переживают сбой сети и перезапуск
+        self.btn_outbox = QToolButton()
+        self.btn_outbox.setAutoRaise(True)
+        self.btn_outbox.clicked.connect(self._show_outbox)
+        self.statusBar().addPermanentWidget(self.btn_outbox)
+        self._outbox_dlg = None
+        self._batch = None
+        self.outbox = Outbox(token)
+        self._outbox_listener = self.outbox_event.emit
+        self.outbox.subscribe(self._outbox_listener)
+        self.outbox_event.connect(self._on_outbox_event)
+        self.outbox.start()
+        self._update_outbox_button()
+
+        self._cache_dirty = set()
+        self.cache_changed.connect(self._on_cache_changed)
+        self._cache_listener = self.cache_changed.emit
+        add_cache_listener(self._cache_listener)
+
+        self._net_online = True
+        self.net_changed.connect(self._on_net_changed)
+        self._net_listener = self.net_changed.emit
+        add_net_listener(self._net_listener)
+        self._on_net_changed(net_status())
         
         self.setStyleSheet("""
         QToolButton#Nav { width:44px; height:44px; border-radius:12px; }
@@ -243,12 +270,8 @@ class MainWindow(QMainWindow):
         QToolButton#Nav:checked { background:#7863ff; color:white; }
         """)
         self.setStyleSheet(self.styleSheet() + """
-        #HwCard { background: #fff; border-radius: 14px; border:1px solid #ececf3; }
-        #HwCard:hover { border-color:#d6d6f6; box-shadow: 0 6px 18px rgba(0,0,0,.06); }
-        #HwCard[selected="true"] { border-color:#7863ff; box-shadow: 0 10px 26px rgba(120,99,255,.22); }
-        #HwCard QLabel#HwTitle { font-weight: 600; font-size: 15px; color:#14151b; }
-        #HwCard QLabel#HwSub   { color:#63646d; }
-        #HwCard QLabel#HwMeta  { color:#8b8d98; }
+        QListView#HwList { background: transparent; border: none; outline: none; }
+        QLabel#NetBanner { background:#FFF2CC; color:#7a5b00; border-radius:10px; padding:6px 12px; }
         """)
         self.setStyleSheet(self.styleSheet() + """
         #Card { background:#fff; border:1px solid #ececf3; border-radius:14px; }
@@ -267,6 +290,21 @@ class MainWindow(QMainWindow):
         QTableWidget#Leaders { border:none; }
         """)
 
+    def _ensure_page(self, index: int) -> QWidget:
+        if index in self._page_builders and index not in self._pages_built:
+            self._pages_built.add(index)
+            t = time.perf_counter()
+            page = self._page_builders[index]()
+            stub = self.pages.widget(index)
+            self.pages.insertWidget(index, page)
+            self.pages.removeWidget(stub)
+            stub.deleteLater()
+            timing.mark(f"страница {index}", since=t)
+        return self.pages.widget(index)
+
+    def _show_page(self, index: int) -> None:
+        self.pages.setCurrentWidget(self._ensure_page(index))
+
     def _mk_tile(self, big_text: str, small_text: str, accent: str) -> QWidget:
         w = QFrame(); w.setObjectName("Tile"); w.setProperty("accent", accent)
         v = QVBoxLayout(w); v.setContentsMargins(20,16,20,16); v.setSpacing(6)
@@ -290,34 +328,276 @@ class MainWindow(QMainWindow):
         h.addWidget(l); h.addStretch(1); h.addWidget(r)
         return row
 
+    def _on_net_changed(self, st: dict) -> None:
+        was_online, self._net_online = self._net_online, st.get("online", True)
+        if not self._net_online:
+            text = "Нет связи с MyStat — показаны сохранённые данные"
+            if st.get("stale_since"):
+                text += f" (от {dt.fromtimestamp(st['stale_since']).strftime('%d.%m.%Y %H:%M')})"
+            self.lbl_net.setText(text)
+            self.lbl_net.setVisible(True)
+            return
+        self.lbl_net.setVisible(False)
+        if not was_online:
+            self._reconcile()
+
+    def _reconcile(self) -> None:
+        # связь вернулась: демон перезапрашивает всё сразу, окно обновится по его событиям
+        self.sync.sync_now()
+
+    def _on_cache_changed(self, endpoint: str) -> None:
+        # несколько перепроверок подряд (три статуса ДЗ, пять запросов главной) — одна перерисовка
+        res = CACHE_RESOURCES.get(endpoint)
+        if res is None:
+            return
+        if not self._cache_dirty:
+            QTimer.singleShot(300, self._flush_cache_changes)
+        self._cache_dirty.add(res)
+
+    def _flush_cache_changes(self) -> None:
+        dirty, self._cache_dirty = self._cache_dirty, set()
+        for res in dirty:
+            self._on_sync_event({"type": "changed", "resource": res})
+
+    def _on_sync_event(self, ev: dict) -> None:
+        kind, res = ev.get("type"), ev.get("resource")
+        if kind == "changed":
+            if res == "dashboard":
+                self._load_dashboard()
+            elif res == "activity":
+                self._load_activity()
+            elif res == "homework" and PAGE_HW in self._pages_built:
+                self.hw_store.invalidate()
+                self._hw_prefetch_all()
+            elif res == "reviews" and PAGE_REVIEWS in self._pages_built:
+                self._load_reviews()
+            elif res == "schedule" and PAGE_SCHED in self._pages_built:
+                y, m = self.calendar.yearShown(), self.calendar.monthShown()
+                if self.schedule.restore_month(y, m):
+                    self._shade_schedule_month(y, m)
+                    if self._sched_date:
+                        self._load_day_schedule(self._sched_date)
+            return
+        items = ev.get("items") or []
+        if kind == "homework_new":
+            text = f"Новое ДЗ: {items[0].get('name_spec') or ''} — {items[0].get('theme') or ''}"
+        elif kind == "review_new":
+            text = f"Новый отзыв: {items[0].get('full_spec') or items[0].get('spec') or ''}"
+        elif kind == "mark_new":
+            text = f"Новая оценка: {items[0].get('mark')} — {items[0].get('lesson_name') or ''}"
+        else:
+            return
+        if len(items) > 1:
+            text += f" (и ещё {len(items) - 1})"
+        self.statusBar().showMessage(text, 15000)
+
+    def _enqueue_submission(self, hw_id: int, path: str, answer: str) -> None:
+        self.outbox.enqueue(hw_id, path, answer)
+        self._update_outbox_button()
+        text = f"Задача #{hw_id} поставлена в очередь отправки"
+        if not self._net_online:
+            text += " — уйдёт, когда появится связь"
+        self.statusBar().showMessage(text, 8000)
+
+    def _update_outbox_button(self, ev: dict = None) -> None:
+        pending = self.outbox.pending()
+        failed = [it for it in self.outbox.items() if it["state"] == "failed"]
+        text = f"Очередь: {len(pending)}"
+        if ev and ev.get("type") == "progress" and ev.get("total"):
+            text += f" · {int(ev['done'] * 100 / ev['total'])}%"
+        if failed:
+            text += f" · ошибок: {len(failed)}"
+        self.btn_outbox.setText(text)
+        self.btn_outbox.setVisible(bool(pending or failed))
+
+    def _on_outbox_event(self, ev: dict) -> None:
+        self._update_outbox_button(ev)
+        kind = ev.get("type")
+        if self._batch is not None and kind in ("done", "failed", "removed"):
+            self._on_batch_item(ev["id"])
+        if kind == "done":
+            self.statusBar().showMessage(f"Задача #{ev.get('homework_id')} отправлена.", 10000)
+            if self._batch is not None:
+                pass  # список ДЗ перечитаем один раз, когда отправится весь пакет
+            elif PAGE_HW in self._pages_built:
+                self._hw_reload_active(fresh=True)
+            else:
+                self.sync.sync_now("homework")
+        elif kind == "failed":
+            self.statusBar().showMessage(f"Отправка не удалась: {ev.get('error')}", 15000)
+        if self._outbox_dlg is not None and kind != "progress":
+            self._fill_outbox_table()
+
+    def _show_outbox(self) -> None:
+        if self._outbox_dlg is not None:
+            self._outbox_dlg.raise_()
+            return
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Очередь отправки")
+        dlg.resize(720, 320)
+        v = QVBoxLayout(dlg)
+        self.tbl_outbox = QTableWidget(0, 5)
+        self.tbl_outbox.setHorizontalHeaderLabels(["ДЗ", "Файл", "Состояние", "Попыток", "Ошибка"])
+        self.tbl_outbox.setSelectionBehavior(QTableWidget.SelectRows)
+        self.tbl_outbox.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.tbl_outbox.horizontalHeader().setStretchLastSection(True)
+        v.addWidget(self.tbl_outbox, 1)
+        h = QHBoxLayout()
+        btn_retry = QPushButton("Повторить")
+        btn_remove = QPushButton("Убрать")
+        btn_clear = QPushButton("Очистить отправленные")
+        h.addWidget(btn_retry)
+        h.addWidget(btn_remove)
+        h.addStretch(1)
+        h.addWidget(btn_clear)
+        v.addLayout(h)
+
+        def _selected():
+            return [self.tbl_outbox.item(i.row(), 0).data(Qt.UserRole)
+                    for i in self.tbl_outbox.selectionModel().selectedRows()]
+
+        btn_retry.clicked.connect(lambda: [self.outbox.retry(i) for i in _selected()])
+        btn_remove.clicked.connect(lambda: [self.outbox.remove(i) for i in _selected()])
+        btn_clear.clicked.connect(self.outbox.clear_done)
+        dlg.finished.connect(lambda _: setattr(self, "_outbox_dlg", None))
+        self._outbox_dlg = dlg
+        self._fill_outbox_table()
+        dlg.show()
+
+    def _fill_outbox_table(self) -> None:
+        items = self.outbox.items()
+        self.tbl_outbox.setRowCount(len(items))
+        for row, it in enumerate(items):
+            cells = [f"#{it['homework_id']}", os.path.basename(os.path.normpath(it["path"])),
+                     STATE_TITLES.get(it["state"], it["state"]), str(it["attempts"] or 0), it["error"] or ""]
+            for col, text in enumerate(cells):
+                cell = QTableWidgetItem(text)
+                if col == 0:
+                    cell.setData(Qt.UserRole, it["id"])
+                if col == 1:
+                    cell.setToolTip(it["path"])
+                self.tbl_outbox.setItem(row, col, cell)
+        self.tbl_outbox.resizeColumnsToContents()
+
+    def closeEvent(self, ev):
+        remove_net_listener(self._net_listener)
+        remove_cache_listener(self._cache_listener)
+        self.sync.unsubscribe(self._sync_listener)
+        self.sync.stop()
+        self.outbox.unsubscribe(self._outbox_listener)
+        self.outbox.stop()
+        super().closeEvent(ev)
+
     def _build_tab_dashboard(self) -> QWidget:
         page = QWidget()
         root = QVBoxLayout(page)
 
-        user = get_user_info(self.token)
+        self.lbl_user_name = QLabel("Имя: …"); self.lbl_user_name.setStyleSheet("font-weight: 600;")
+        self.lbl_user_email = QLabel("Email: …")
+        root.addWidget(self.lbl_user_name); root.addWidget(self.lbl_user_email)
+
+        grp_att = QGroupBox("Посещаемость за 30 дней"); grp_att_l = QVBoxLayout(grp_att)
+        self.att_badges = QHBoxLayout(); self.att_badges.setSpacing(10)
+        grp_att_l.addLayout(self.att_badges)
+        grp_att_l.addWidget(QLabel("Последние занятия:"))
+        self.att_recent = QVBoxLayout()
+        self.att_recent.addWidget(QLabel("Загрузка…"))
+        grp_att_l.addLayout(self.att_recent)
+        root.addWidget(grp_att)
+
+        self.grp_prog = grp_prog = QGroupBox()
+        grp_prog_l = QVBoxLayout(grp_prog)
+        prog_hdr = QHBoxLayout(); prog_hdr.addStretch(1)
+        self.btn_prog_period = {}
+        for period, title in (("year", "Год"), ("month", "Месяц")):
+            b = QToolButton(); b.setText(title); b.setCheckable(True); b.setAutoExclusive(True)
+            b.clicked.connect(lambda _, p=period: self._set_progress_period(p))
+            prog_hdr.addWidget(b)
+            self.btn_prog_period[period] = b
+        grp_prog_l.addLayout(prog_hdr)
+        self.progress_chart = ProgressChart()
+        self.progress_chart.periodRequested.connect(self._set_progress_period)
+        grp_prog_l.addWidget(self.progress_chart)
+        self._progress_title("year")
+        root.addWidget(grp_prog)
+
+        root.addWidget(self._build_leaderboard_box())
+
+        self.activity_page = 1
+        grp_act = QGroupBox("Начисления (последние события)"); act_layout = QVBoxLayout(grp_act)
+        self.tbl = QTableWidget(0, 5)
+        self.tbl.setHorizontalHeaderLabels(["Дата", "Дисциплина", "Действие", "Награда", "Оценка"])
+        self.tbl.horizontalHeader().setStretchLastSection(True)
+        self.tbl.setSelectionBehavior(self.tbl.SelectRows)
+        self.tbl.setEditTriggers(self.tbl.NoEditTriggers)
+        act_layout.addWidget(self.tbl)
+        pager = QHBoxLayout()
+        self.btn_prev = QPushButton("← Назад"); self.btn_next = QPushButton("Вперёд →")
+        self.lbl_page = QLabel(f"Стр. {self.activity_page}")
+        self.btn_prev.clicked.connect(self._prev_page); self.btn_next.clicked.connect(self._next_page)
+        pager.addWidget(self.btn_prev); pager.addWidget(self.lbl_page); pager.addWidget(self.btn_next)
+        pager.addItem(QSpacerItem(20, 10, QSizePolicy.Expanding, QSizePolicy.Minimum))
+        act_layout.addLayout(pager)
+        root.addWidget(grp_act)
+
+        self.lbl_page.setText(f"Стр. {self.activity_page} …")
+        self._load_dashboard()
+
+        return page
+
+    def _load_dashboard(self, fresh: bool = False) -> None:
+        run_task(fetch_dashboard, self.token, fresh=fresh, on_result=self._fill_dashboard,
+                 on_error=lambda e: self.lbl_user_name.setText(f"Не удалось загрузить данные: {e}"))
+
+    def _fill_dashboard(self, res: dict) -> None:
+        data, errors = res.get("data", {}), res.get("errors", {})
+        for name, e in errors.items():
+            print(f"dashboard {name} error:", e)
+        if "user" in data:
+            self._fill_user(data["user"])
+        else:
+            self.lbl_user_name.setText(f"Не удалось загрузить профиль: {errors.get('user')}")
+        if "attendance" in data:
+            self._fill_attendance(data["attendance"])
+        else:
+            self._fill_attendance({}, error=errors.get("attendance"))
+        if "progress" in data:
+            self._fill_progress(data["progress"])
+        self._fill_leaderboard(data.get("leaders") or {})
+        if self.activity_page == 1:
+            self._fill_activity(data.get("activity") or [])
+
+    def _clear_layout(self, lay) -> None:
+        while lay.count():
+            it = lay.takeAt(0)
+            w = it.widget()
+            if w:
+                w.setParent(None)
+
+    def _fill_user(self, user: dict) -> None:
         name = user.get("name") or (
             f"{user.get('user_storage', {}).get('firstname','')} "
             f"{user.get('user_storage', {}).get('lastname','')}"
         ).strip() or "Неизвестно"
         email = user.get("email", "Неизвестно")
+        self.lbl_user_name.setText(f"Имя: {name}")
+        self.lbl_user_email.setText(f"Email: {email}")
 
-        title_lbl = QLabel(f"Имя: {name}"); title_lbl.setStyleSheet("font-weight: 600;")
-        email_lbl = QLabel(f"Email: {email}")
-        root.addWidget(title_lbl); root.addWidget(email_lbl)
-
-        att = get_attendance(self.token, "month")
+    def _fill_attendance(self, att: dict, error=None) -> None:
         p_attend = att.get("percentOfAttendance", 0)
         p_absent = att.get("percentOfAbsent", 0)
         p_late   = att.get("percentOfLate", 0)
 
-        grp_att = QGroupBox("Посещаемость за 30 дней"); grp_att_l = QVBoxLayout(grp_att)
-        badges = QHBoxLayout(); badges.setSpacing(10)
-        badges.addWidget(_make_badge("Посещение", f"{p_attend}%", "#EAF8EE"))
-        badges.addWidget(_make_badge("Пропуск",   f"{p_absent}%", "#FFF1E8"))
-        badges.addWidget(_make_badge("Опоздания", f"{p_late}%",   "#F3F4F6"))
-        grp_att_l.addLayout(badges)
+        self._clear_layout(self.att_badges)
+        self.att_badges.addWidget(_make_badge("Посещение", f"{p_attend}%", "#EAF8EE"))
+        self.att_badges.addWidget(_make_badge("Пропуск",   f"{p_absent}%", "#FFF1E8"))
+        self.att_badges.addWidget(_make_badge("Опоздания", f"{p_late}%",   "#F3F4F6"))
 
-        grp_att_l.addWidget(QLabel("Последние занятия:"))
+        lay = self.att_recent
+        self._clear_layout(lay)
+        if error is not None:
+            lay.addWidget(QLabel(f"Не удалось загрузить посещаемость: {error}"))
+            return
         data = att.get("data", {})
         if data:
             years = sorted(map(int, data.keys()))
@@ -338,59 +618,30 @@ class MainWindow(QMainWindow):
                     if "1" in was_list: status, color = "✅ Был", "#1A7F37"
                     elif "0" in was_list: status, color = "❌ Пропустил", "#C62828"
                     lbl = QLabel(f"{day_num}: {status}"); lbl.setStyleSheet(f"color: {color};")
-                    grp_att_l.addWidget(lbl)
+                    lay.addWidget(lbl)
             else:
-                grp_att_l.addWidget(QLabel("Нет данных за месяц."))
+                lay.addWidget(QLabel("Нет данных за месяц."))
         else:
-            grp_att_l.addWidget(QLabel("Нет данных посещаемости."))
-        root.addWidget(grp_att)
-
-        progress = get_progress(self.token, "year")
-        from collections import defaultdict, OrderedDict
-        sum_by_month = defaultdict(int)
-        for dataset in progress.get("data", []):
-            for cm in dataset.get("chart_models", []):
-                d = cm.get("date"); pts = cm.get("points")
-                if pts is not None and d:
-                    sum_by_month[d] += pts
-
-        def _mm_yy(s):
-            try: return f"{s[5:7]}/{s[2:4]}"
-            except Exception: return s
-
-        ordered = OrderedDict(sorted(sum_by_month.items(), key=lambda kv: kv[0]))
-        x_labels = [_mm_yy(d) for d in ordered.keys()]
-        y_values = list(ordered.values())
-
-        grp_prog = QGroupBox("Годовой прогресс (сумма баллов по месяцам)")
-        grp_prog_l = QVBoxLayout(grp_prog)
-        canvas = PlotCanvas(self, width=6.2, height=2.6, dpi=100)
-        canvas.plot_progress(x_labels, y_values)
-        grp_prog_l.addWidget(canvas)
-        root.addWidget(grp_prog)
+            lay.addWidget(QLabel("Нет данных посещаемости."))
+
+    def _fill_progress(self, progress: dict, period: str = "year") -> None:
+        labels, values = series_from_progress(progress, period)
+        self.progress_chart.set_series(labels, values, period)
+
+    def _progress_title(self, period: str) -> None:
+        self.btn_prog_period[period].setChecked(True)
+        self.grp_prog.setTitle("Прогресс за месяц (баллы по дням)" if period == "month"
+                               else "Годовой прогресс (сумма баллов по месяцам)")
+
+    def _set_progress_period(self, period: str) -> None:
+        self._progress_title(period)
+        self.progress_chart.set_period(period)
+        if period == "year":
+            return  # годовой ряд приходит вместе с дашбордом
+        # месяц: из кэша сразу, если он есть, сверка в фоне
+        run_task(get_progress, self.token, period, on_result=lambda js: self._fill_progress(js, period),
+                 on_error=lambda e: print("progress error:", e))
 
-        root.addWidget(self._build_leaderboard_box())
-
-        self.activity_page = 1
-        grp_act = QGroupBox("Начисления (последние события)"); act_layout = QVBoxLayout(grp_act)
-        self.tbl = QTableWidget(0, 5)
-        self.tbl.setHorizontalHeaderLabels(["Дата", "Дисциплина", "Действие", "Награда", "Оценка"])
-        self.tbl.horizontalHeader().setStretchLastSection(True)
-        self.tbl.setSelectionBehavior(self.tbl.SelectRows)
-        self.tbl.setEditTriggers(self.tbl.NoEditTriggers)
-        act_layout.addWidget(self.tbl)
-        pager = QHBoxLayout()
-        self.btn_prev = QPushButton("← Назад"); self.btn_next = QPushButton("Вперёд →")
-        self.lbl_page = QLabel(f"Стр. {self.activity_page}")
-        self.btn_prev.clicked.connect(self._prev_page); self.btn_next.clicked.connect(self._next_page)
-        pager.addWidget(self.btn_prev); pager.addWidget(self.lbl_page); pager.addWidget(self.btn_next)
-        pager.addItem(QSpacerItem(20, 10, QSizePolicy.Expanding, QSizePolicy.Minimum))
-        act_layout.addLayout(pager)
-        root.addWidget(grp_act)
-        self._load_activity()
-
-        return page
-    
     def _make_medal(self, pos: int) -> str:
         return {1: "🥇", 2: "🥈", 3: "🥉"}.get(pos, f"{pos}")
 
@@ -404,6 +655,9 @@ class MainWindow(QMainWindow):
             cur    = bool(x.get("current"))
 
             it_name = QTableWidgetItem(name)
+            photo = x.get("photo_path")
+            if photo:
+                it_name.setIcon(qicon_from_url(photo, on_ready=it_name.setIcon))
             it_pts  = QTableWidgetItem(str(amount))
             it_pos  = QTableWidgetItem(self._make_medal(pos))
 
@@ -449,18 +703,16 @@ class MainWindow(QMainWindow):
         tabs.addTab(w_stream, "В потоке")
 
         v.addWidget(tabs)
-
-        try:
-            data = get_leader_table(self.token)
-        except Exception as e:
-            data = {}
-            print("leader-table error:", e)
-
-        self._fill_leader_table(tbl_g, data.get("group",{}).get("top",[]) or [])
-        self._fill_leader_table(tbl_s, data.get("stream",{}).get("top",[]) or [])
+        self.tbl_leaders_group = tbl_g
+        self.tbl_leaders_stream = tbl_s
 
         return grp
 
+    def _fill_leaderboard(self, data: dict) -> None:
+        data = data or {}
+        self._fill_leader_table(self.tbl_leaders_group, data.get("group",{}).get("top",[]) or [])
+        self._fill_leader_table(self.tbl_leaders_stream, data.get("stream",{}).get("top",[]) or [])
+
 
     def _build_tab_homeworks(self) -> QWidget:
         page = QWidget()
@@ -469,9 +721,17 @@ class MainWindow(QMainWindow):
         hdr = QHBoxLayout()
         self.lbl_hw_title = QLabel("Домашние задания")
         self.lbl_hw_title.setStyleSheet("font-weight: 600;")
+        self.ed_hw_filter = QLineEdit()
+        self.ed_hw_filter.setPlaceholderText("Поиск по предмету, теме, преподавателю…")
+        self.ed_hw_filter.setClearButtonEnabled(True)
+        self.cb_hw_sort = QComboBox()
+        for title, col, order in self.hw_sort_modes:
+            self.cb_hw_sort.addItem(title)
         btn_refresh = QPushButton("Обновить")
         hdr.addWidget(self.lbl_hw_title)
         hdr.addItem(QSpacerItem(20, 10, QSizePolicy.Expanding, QSizePolicy.Minimum))
+        hdr.addWidget(self.ed_hw_filter, 1)
+        hdr.addWidget(self.cb_hw_sort)
         hdr.addWidget(btn_refresh)
         root.addLayout(hdr)
 
@@ -485,24 +745,29 @@ class MainWindow(QMainWindow):
             tab = QWidget()
             v = QVBoxLayout(tab)
 
-            scroll = QScrollArea(); scroll.setWidgetResizable(True)
-            content = QWidget()
-            lay = QVBoxLayout(content)
-            lay.setContentsMargins(0, 0, 0, 0)
-            lay.setSpacing(10)
-            scroll.setWidget(content)
-            v.addWidget(scroll, 1)
-
-            tbl = QTableWidget(0, 7)
-            tbl.setHorizontalHeaderLabels(["ID","Создано","Предмет","Тема","Преподаватель","Дедлайн","Файл задания"])
-            tbl.setVisible(False)
-            v.addWidget(tbl)
+            model = HomeworkModel(self)
+            proxy = HomeworkFilterProxy(self)
+            proxy.setSourceModel(model)
+
+            view = QListView()
+            view.setObjectName("HwList")
+            view.setModel(proxy)
+            view.setItemDelegate(HomeworkCardDelegate(view))
+            view.setUniformItemSizes(True)
+            view.setMouseTracking(True)
+            view.setSelectionMode(QListView.SingleSelection)
+            view.setVerticalScrollMode(QListView.ScrollPerPixel)
+            view.setContextMenuPolicy(Qt.CustomContextMenu)
+            view.customContextMenuRequested.connect(lambda pos, w=view: self._hw_context_menu(w, pos))
+            view.selectionModel().currentChanged.connect(
+                lambda cur, _prev, s=st: self._on_hw_current_changed(s, cur))
+            v.addWidget(view, 1)
 
             self.hw_tabs.addTab(tab, title)
 
-            self.hw_tables[st] = tbl
-            self.hw_cards_layout[st] = lay
-            self.hw_card_widgets[st] = []
+            self.hw_models[st] = model
+            self.hw_proxies[st] = proxy
+            self.hw_views[st] = view
             self.hw_items_by_status[st] = []
             self.hw_selected_idx[st] = -1
 
@@ -512,283 +777,391 @@ class MainWindow(QMainWindow):
         self.btn_hw_open = QPushButton("Открыть задачу…")
         self.btn_hw_download = QPushButton("Скачать файл задания")
         self.btn_hw_upload   = QPushButton("Отправить решение…")
+        self.btn_hw_batch    = QPushButton("Отправить пакетом…")
+        self.btn_hw_batch.setToolTip("Несколько решений сразу: файлы сопоставляются с заданиями «К выполнению»")
         self.btn_hw_remove   = QPushButton("Удалить решение…")
         btns.addWidget(self.btn_hw_open)
         btns.addWidget(self.btn_hw_download)
+        self.btn_hw_download_all = QPushButton("Скачать все файлы")
+        btns.addWidget(self.btn_hw_download_all)
         btns.addWidget(self.btn_hw_upload)
+        btns.addWidget(self.btn_hw_batch)
         btns.addWidget(self.btn_hw_remove)
         btns.addItem(QSpacerItem(20, 10, QSizePolicy.Expanding, QSizePolicy.Minimum))
         root.addLayout(btns)
 
-        btn_refresh.clicked.connect(self._hw_reload_active)
+        btn_refresh.clicked.connect(lambda: self.sync.sync_now("homework"))
+        self.ed_hw_filter.textChanged.connect(self._hw_apply_filter)
+        self.cb_hw_sort.currentIndexChanged.connect(self._hw_apply_sort)
         self.btn_hw_download.clicked.connect(self._hw_download_selected)
+        self.btn_hw_download_all.clicked.connect(self._hw_download_all)
         self.btn_hw_upload.clicked.connect(self.on_send_clicked)
+        self.btn_hw_batch.clicked.connect(self._open_batch_dialog)
         self.btn_hw_remove.clicked.connect(self._hw_remove_selected)
         self.btn_hw_open.clicked.connect(self._open_hw_dialog)
-        self.hw_tabs.currentChanged.connect(lambda _: self._hw_reload_active())
+        self.hw_tabs.currentChanged.connect(lambda _: self._hw_on_tab_changed())
 
-        self._hw_reload_active()
+        self._hw_apply_sort(0)
+        self._hw_prefetch_all()
         return page
 
-    
-    def _render_hw_cards(self, status: int, items: list[dict]) -> None:
-        lay = self.hw_cards_layout[status]
-        while lay.count():
-            it = lay.takeAt(0)
-            w = it.widget()
-            if w:
-                w.setParent(None)
+    def _hw_prefetch_all(self, fresh: bool = False) -> None:
+        # все три статуса одним батчем в async-клиенте; вкладки заполняются сразу
+        self.lbl_hw_title.setText("Загрузка…")
+        reqs = {st: self._hw_req.get(st, 0) + 1 for st, _ in self.hw_statuses}
+        self._hw_req.update(reqs)
+
+        def _done(by_status):
+            for st, (items, meta) in by_status.items():
+                if reqs[st] == self._hw_req.get(st):
+                    self._fill_homeworks(st, items, meta)
+
+        def _fail(e):
+            print("Ошибка загрузки ДЗ:", e)
+            self._hw_reload_active()
+
+        run_async(mystat_async.get_homeworks_all(self.token, fresh=fresh), on_result=_done, on_error=_fail)
+
+    def _hw_apply_filter(self, text: str) -> None:
+        for proxy in self.hw_proxies.values():
+            proxy.setFilterFixedString(text.strip())
+
+    def _hw_apply_sort(self, index: int) -> None:
+        _, col, order = self.hw_sort_modes[index]
+        for proxy in self.hw_proxies.values():
+            proxy.sort(col, order)
 
-        self.hw_items_by_status[status] = items or []
-        self.hw_card_widgets[status] = []
-
-        for i, hw in enumerate(self.hw_items_by_status[status]):
-            card = HomeworkCard(hw, i)
-            for c in card.findChildren(QLabel):
-                if c.text() == hw.get("name_spec", "Задание"):
-                    c.setObjectName("HwTitle")
-                elif c.text() == hw.get("theme", ""):
-                    c.setObjectName("HwSub")
-                else:
-                    c.setObjectName("HwMeta")
-
-            card.clicked.connect(lambda idx, st=status: self._on_card_clicked(st, idx))
-            lay.addWidget(card)
-            self.hw_card_widgets[status].append(card)
-
-        lay.addStretch(1)
-        sel = self.hw_selected_idx.get(status, -1)
-        if 0 <= sel < len(self.hw_card_widgets[status]):
-            self._apply_card_selection(status, sel)
-
-    def _on_card_clicked(self, status: int, index: int) -> None:
-        self.hw_selected_idx[status] = index
-        self._apply_card_selection(status, index)
-
-        tbl = self.hw_tables[status]
-        if 0 <= index < tbl.rowCount():
-            tbl.setCurrentCell(index, 0)
-
-    def _apply_card_selection(self, status: int, index: int) -> None:
-        for i, w in enumerate(self.hw_card_widgets[status]):
-            w.setSelected(i == index)
-
-    def _current_hw_from_cards(self) -> dict | None:
+    def _on_hw_current_changed(self, status: int, proxy_index) -> None:
+        src = self.hw_proxies[status].mapToSource(proxy_index)
+        self.hw_selected_idx[status] = src.row() if src.isValid() else -1
+
+    def _hw_restore_selection(self, status: int) -> None:
+        row = self.hw_selected_idx.get(status, -1)
+        model, proxy, view = self.hw_models[status], self.hw_proxies[status], self.hw_views[status]
+        if 0 <= row < model.rowCount():
+            idx = proxy.mapFromSource(model.index(row, 0))
+            if idx.isValid():
+                view.setCurrentIndex(idx)
+                return
+        view.setCurrentIndex(QModelIndex())
+        self.hw_selected_idx[status] = -1
+
+    def _current_hw(self) -> Optional[dict]:
         st = self._active_hw_status()
-        idx = self.hw_selected_idx.get(st, -1)
-        items = self.hw_items_by_status.get(st, [])
-        if 0 <= idx < len(items):
-            return items[idx]
-        return None
+        return self.hw_models[st].item(self.hw_selected_idx.get(st, -1))
 
-    
     def _open_hw_dialog(self):
-        row = self._current_hw_row()
-        if row is None:
+        hw = self._current_hw()
+        if hw is None:
             return
-        hw_id = self._current_hw_id(row)
-        title = self.hw_tables[self._active_hw_status()].item(row, 3).text()
-        dlg = HomeworkDialog(self, self.token, hw_id, title)
-        dlg.exec_()
-        self._hw_reload_active()
-    
+        hw_id = hw.get("id")
+        title = hw.get("theme", "-")
+        dlg = HomeworkDialog(self, self.token, hw_id, title, self.outbox)
+        if dlg.exec_() == QDialog.Accepted:
+            self._update_outbox_button()
+
     def _hw_remove_selected(self):
-        status, tbl, row = self._hw_selected_row()
-        if row < 0:
+        status = self._active_hw_status()
+        hw = self._current_hw()
+        if hw is None:
             QMessageBox.warning(self, "Внимание", "Не выбрано ДЗ в текущей вкладке.")
             return
         if status != 2:
             QMessageBox.warning(self, "Внимание", "Удалять можно только во вкладке «На проверке».")
             return
-        it = tbl.item(row, 0)
-        stud_id = it.data(ROLE_STUD_ID) if it else None
+        stud_id = (hw.get("homework_stud") or {}).get("id")
         if not stud_id:
             QMessageBox.warning(self, "Внимание", "Не найден ID отправки (homework_stud.id).")
             return
         confirm = QMessageBox.question(self, "Подтвердите", f"Удалить отправленное решение #{stud_id}?")
         if confirm != QMessageBox.Yes:
             return
-        try:
-            ok = delete_homework(self.token, int(stud_id))
+        def _done(ok):
             if ok:
                 QMessageBox.information(self, "Готово", "Решение удалено.")
-                self._hw_reload_active()
+                self._hw_reload_active(fresh=True)
             else:
                 QMessageBox.warning(self, "Внимание", "Сервер вернул false.")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"{e}")
+
+        self.btn_hw_remove.setEnabled(False)
+        run_task(delete_homework, self.token, int(stud_id),
+                 on_result=_done,
+                 on_error=lambda e: QMessageBox.critical(self, "Ошибка", f"{e}"),
+                 on_finished=lambda: self.btn_hw_remove.setEnabled(self._active_hw_status() == 2))
 
     def _hw_status_name(self, st: int) -> str:
         return {3: "К выполнению", 2: "На проверке", 1: "Выполнены",}.get(st, str(st))
 
-    def _hw_fmt_date(self, s: str) -> str:
-        if not s or s.startswith("-0001"):
-            return "-"
-        try:
-            return dt.strptime(s[:10], "%Y-%m-%d").strftime("%d.%m.%Y")
-        except Exception:
-            return s
-
-    def _hw_deadline_color(self, deadline_str: str) -> str:
-        try:
-            if not deadline_str or deadline_str.startswith("-0001"):
-                return ""
-            d = dt.strptime(deadline_str[:10], "%Y-%m-%d").date()
-            left = (d - date.today()).days
-            if left < 0:
-                return "#FDE2E2"
-            if left <= 2:
-                return "#FFF2CC"
-            return "#EAF8EE"
-        except Exception:
-            return ""
+    def _hw_reload_active(self, fresh: bool = False):
+        status = self._active_hw_status()
+        if fresh:
+            # после отправки/удаления ДЗ переезжает между статусами — устарели все вкладки
+            self.hw_store.invalidate()
+        self._load_homeworks(status, fresh=fresh)
+        self.btn_hw_remove.setEnabled(status == 2)
 
-    def _hw_reload_active(self):
-        idx = self.hw_tabs.currentIndex()
-        status = self.hw_statuses[idx][0]
-        tbl = self.hw_tables[status]
-        self._load_homeworks_into_table(status, tbl)
+    def _hw_on_tab_changed(self):
+        status = self._active_hw_status()
+        if not self.hw_store.is_fresh(status):
+            return self._hw_reload_active()
+        self._hw_restore_selection(status)
+        self._hw_update_title(status)
         self.btn_hw_remove.setEnabled(status == 2)
 
-    def _load_homeworks_into_table(self, status: int, table: QTableWidget):
-        try:
-            items, meta = get_homeworks(self.token, status=status, limit=1000)
-        except Exception as e:
-            items, meta = [], {}
+    def _load_homeworks(self, status: int, fresh: bool = False):
+        self._hw_req[status] = req = self._hw_req.get(status, 0) + 1
+        if status == self._active_hw_status():
+            self.lbl_hw_title.setText("Загрузка…")
+
+        def _done(res):
+            if req == self._hw_req.get(status):
+                self._fill_homeworks(status, *res)
+
+        def _fail(e):
+            # при ошибке уже показанные записи не трогаем
             print("Ошибка загрузки ДЗ:", e)
+            if req == self._hw_req.get(status) and status == self._active_hw_status():
+                self._hw_update_title(status)
+
+        run_task(get_homeworks, self.token, status=status, limit=1000, fresh=fresh, on_result=_done, on_error=_fail)
 
+    def _hw_update_title(self, status: int) -> None:
         if status == 3:
-            total = meta.get("totalCount", len(items))
+            items = self.hw_items_by_status.get(status, [])
+            total = self.hw_meta_by_status.get(status, {}).get("totalCount", len(items))
             self.lbl_hw_title.setText(f"Невыполненные задачи: {int(total)}")
         else:
             self.lbl_hw_title.setText(self._hw_status_name(status))
 
-        table.setRowCount(0)
+    def _fill_homeworks(self, status: int, items: list, meta: dict):
+        model = self.hw_models[status]
+        selected = model.item(self.hw_selected_idx.get(status, -1))
+        diff = self.hw_store.update(status, items, meta)
+        if diff or model.rowCount() != len(items or []):
+            model.sync(self.hw_store.items(status))
+        self.hw_meta_by_status[status] = self.hw_store.meta(status)
+        self.hw_items_by_status[status] = model.items()
         if status == 3:
-            self._hw_examples_files = []
-
-        for row, hw in enumerate(items):
-            table.insertRow(row)
-            if status == 3:
-                self._hw_examples_files.append(hw.get("file_path"))
-
-            stud = hw.get("homework_stud") or {}
-            stud_id = stud.get("id")
-
-            raw_deadline = hw.get("completion_time") or ""
-            values = [
-                hw.get("id"),
-                self._hw_fmt_date(hw.get("creation_time")),
-                hw.get("name_spec", "-"),
-                hw.get("theme", "-"),
-                hw.get("fio_teach", "-"),
-                self._hw_fmt_date(raw_deadline),
-                hw.get("file_path") or "-",
-            ]
-
-            for col, val in enumerate(values):
-                it = QTableWidgetItem(str(val))
-                if col not in (3, 6):
-                    it.setTextAlignment(Qt.AlignCenter)
-                if col == 0:
-                    it.setData(ROLE_STUD_ID, stud_id)
-                table.setItem(row, col, it)
-
-            color = self._hw_deadline_color(raw_deadline)
-            if color:
-                table.item(row, 5).setBackground(QColor(color))
-        self._render_hw_cards(status, items)
-        table.resizeColumnsToContents()
-
-    def _hw_current_table_and_status(self):
-        idx = self.hw_tabs.currentIndex()
-        status = self.hw_statuses[idx][0]
-        tbl = self.hw_tables[status]
-        return status, tbl
-
-    def _hw_selected_row(self):
-        status, tbl = self._hw_current_table_and_status()
-        return status, tbl, tbl.currentRow()
-
-    def _hw_context_menu(self, table, pos):
-        row = table.indexAt(pos).row()
-        if row < 0: return
+            self._hw_examples_files = [hw.get("file_path") for hw in self.hw_items_by_status[status]]
+        self.hw_selected_idx[status] = model.row_of(hw_key(selected)) if selected else -1
+        self._hw_restore_selection(status)
+        if status == self._active_hw_status():
+            self._hw_update_title(status)
+
+    def _hw_context_menu(self, view, pos):
+        idx = view.indexAt(pos)
+        if not idx.isValid(): return
+        url = ((idx.data(ROLE_HW) or {}).get("file_path") or "").strip()
         m = QMenu(self)
         act_open = m.addAction("Открыть файл задания в браузере")
         act_copy = m.addAction("Копировать ссылку на файл")
-        a = m.exec_(table.viewport().mapToGlobal(pos))
+        act_open.setEnabled(bool(url)); act_copy.setEnabled(bool(url))
+        a = m.exec_(view.viewport().mapToGlobal(pos))
         if a == act_open:
-            url = table.item(row, 6).text()
-            if url and url != "-":
-                import webbrowser; webbrowser.open(url)
+            import webbrowser; webbrowser.open(url)
         elif a == act_copy:
-            url = table.item(row, 6).text()
-            if url and url != "-":
-                QApplication.clipboard().setText(url)
+            QApplication.clipboard().setText(url)
 
 
     def _hw_download_selected(self):
-        status, tbl = self._hw_current_table_and_status()
-        row = tbl.currentRow()
-        if row < 0:
+        hw = self._current_hw()
+        if hw is None:
             return
-        file_url = tbl.item(row, 6).text().strip()
+        file_url = (hw.get("file_path") or "").strip()
         if not file_url or file_url == "-":
             return
         save_dir = QFileDialog.getExistingDirectory(self, "Куда сохранить файл задания?")
         if not save_dir:
             return
-        try:
-            path = download_homework_file(self.token, file_url, save_dir)
-            QMessageBox.information(self, "Готово", f"Файл сохранён:\n{path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить файл: {e}")
-
-    def _hw_upload_selected(self):
-        row = self._current_hw_row()
-        if row is None:
-            QMessageBox.warning(self, "Внимание", "Не выбрано ДЗ.")
+        state = {"pct": 0, "rate": 0.0}
+
+        def _show():
+            self.btn_hw_download.setText(f"Скачивание… {state['pct']}% · {state['rate'] / 1048576:.1f} МБ/с")
+
+        def _progress(done, total):
+            state["pct"] = int(done * 100 / max(total, 1))
+            _show()
+
+        def _rate(rate):
+            state["rate"] = rate
+            _show()
+
+        def _finished():
+            self.btn_hw_download.setEnabled(True)
+            self.btn_hw_download.setText("Скачать файл задания")
+
+        self.btn_hw_download.setEnabled(False)
+        prog = Progress(self.btn_hw_download)
+        prog.changed.connect(_progress)
+        prog.throughput.connect(_rate)
+        run_task(download_homework_file, self.token, file_url, save_dir, on_progress=prog.report,
+                 on_result=lambda path: QMessageBox.information(self, "Готово", f"Файл сохранён:\n{path}"),
+                 on_error=lambda e: QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить файл: {e}"),
+                 on_finished=_finished)
+
+    def _hw_download_all(self):
+        # все файлы заданий из «К выполнению» одной кнопкой
+        items = [hw for hw in self.hw_items_by_status.get(3, []) if (hw.get("file_path") or "-").strip() != "-"]
+        if not items:
+            QMessageBox.information(self, "Внимание", "Во вкладке «К выполнению» нет файлов заданий.")
             return
-        hw_id = self._current_hw_id(row)
-        if hw_id is None:
-            QMessageBox.warning(self, "Внимание", "Не могу прочитать ID задачи.")
+        save_dir = QFileDialog.getExistingDirectory(self, "Куда сохранить файлы заданий?")
+        if not save_dir:
             return
-        file_path, _ = QFileDialog.getOpenFileName(self, "Выберите файл решения")
-        if not file_path:
+        total_files = len({hw["file_path"].strip() for hw in items})
+        state = {"files": 0, "pct": 0}
+
+        def _show():
+            self.btn_hw_download_all.setText(f"Скачивание… {state['files']}/{total_files} · {state['pct']}%")
+
+        def _progress(done, total):
+            state["pct"] = int(done * 100 / max(total, 1))
+            _show()
+
+        def _item(_url, _res):
+            state["files"] += 1
+            _show()
+
+        def _done(summary):
+            lines = [f"Скачано: {len(summary['saved'])}", f"Уже были: {len(summary['skipped'])}"]
+            if summary["failed"]:
+                lines.append(f"Ошибки: {len(summary['failed'])}")
+                lines += [f"• {url}: {e}" for url, e in list(summary["failed"].items())[:5]]
+            QMessageBox.information(self, "Готово", "\n".join(lines))
+
+        def _finished():
+            self.btn_hw_download_all.setEnabled(True)
+            self.btn_hw_download_all.setText("Скачать все файлы")
+
+        self.btn_hw_download_all.setEnabled(False)
+        prog = Progress(self.btn_hw_download_all)
+        prog.changed.connect(_progress)
+        prog.item.connect(_item)
+        _show()
+        run_task(download_homework_files, self.token, items, save_dir,
+                 on_progress=prog.report, on_item=prog.report_item, on_result=_done,
+                 on_error=lambda e: QMessageBox.critical(self, "Ошибка", f"Не удалось скачать файлы: {e}"),
+                 on_finished=_finished)
+
+    def _open_batch_dialog(self) -> None:
+        homeworks = list(self.hw_items_by_status.get(3, []))
+        if not homeworks:
+            QMessageBox.information(self, "Внимание", "Во вкладке «К выполнению» нет заданий.")
             return
-        answer_text, ok = QInputDialog.getMultiLineText(self, "Комментарий", "answerText:")
-        if not ok:
+        if self._batch is not None:
+            QMessageBox.information(self, "Внимание", "Предыдущий пакет ещё отправляется — см. «Очередь».")
             return
-        try:
-            link = upload_to_fs(self.token, file_path)
-            res = homework_create(self.token, hw_id, link, (answer_text or "").strip())
-            QMessageBox.information(self, "Отправлено", f"Задача #{hw_id} отправлена.")
-            self._hw_reload_active()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"{e}")
 
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Пакетная отправка")
+        dlg.resize(760, 440)
+        v = QVBoxLayout(dlg)
+        tbl = QTableWidget(0, 2)
+        tbl.setHorizontalHeaderLabels(["Решение", "Задание"])
+        tbl.setSelectionBehavior(QTableWidget.SelectRows)
+        tbl.horizontalHeader().setStretchLastSection(True)
+        v.addWidget(tbl, 1)
+        txt = QLineEdit()
+        txt.setPlaceholderText("Комментарий ко всем решениям (необязательно)")
+        v.addWidget(txt)
+        h = QHBoxLayout()
+        btn_files = QPushButton("Файлы…")
+        btn_dir = QPushButton("Папка…")
+        btn_dir.setToolTip("Папка уйдёт ZIP-архивом без node_modules, .git, venv и сборки")
+        btn_del = QPushButton("Убрать")
+        btn_cancel = QPushButton("Отмена")
+        btn_send = QPushButton("Отправить все")
+        for b in (btn_files, btn_dir, btn_del):
+            h.addWidget(b)
+        h.addStretch(1)
+        h.addWidget(btn_cancel)
+        h.addWidget(btn_send)
+        v.addLayout(h)
+        titles = ["— не отправлять —"] + [f"#{hw.get('id')} {hw.get('name_spec') or ''} — {hw.get('theme') or ''}"
+                                          for hw in homeworks]
+
+        def _add(paths):
+            used = {tbl.cellWidget(r, 1).currentIndex() - 1 for r in range(tbl.rowCount())}
+            free = [hw for i, hw in enumerate(homeworks) if i not in used]
+            for path, hw in match_files(paths, free):
+                row = tbl.rowCount()
+                tbl.insertRow(row)
+                cell = QTableWidgetItem(os.path.basename(os.path.normpath(path)))
+                cell.setData(Qt.UserRole, path)
+                cell.setToolTip(path)
+                cell.setFlags(cell.flags() & ~Qt.ItemIsEditable)
+                tbl.setItem(row, 0, cell)
+                cb = QComboBox()
+                cb.addItems(titles)
+                cb.setCurrentIndex(homeworks.index(hw) + 1 if hw is not None else 0)
+                tbl.setCellWidget(row, 1, cb)
+                prehash(path)
+            tbl.resizeColumnToContents(0)
+
+        def _pick_files():
+            paths, _ = QFileDialog.getOpenFileNames(self, "Файлы решений")
+            if paths:
+                _add(paths)
+
+        def _pick_dir():
+            p = QFileDialog.getExistingDirectory(self, "Папка с решением")
+            if p:
+                _add([p])
 
-            
-    def _current_hw_table(self):
-        st = self._active_hw_status()
-        return self.hw_tables.get(st)
-
-    def _current_hw_row(self):
-        tbl = self._current_hw_table()
-        if not tbl:
-            return None
-        row = tbl.currentRow()
-        return row if row >= 0 else None
-
-    def _current_hw_id(self, row: int):
-        tbl = self._current_hw_table()
-        if not tbl:
-            return None
-        it = tbl.item(row, 0)
-        if not it:
-            return None
-        s = it.text().strip()
-        return int(s) if s.isdigit() else None
+        def _del():
+            for r in sorted({i.row() for i in tbl.selectionModel().selectedRows()}, reverse=True):
+                tbl.removeRow(r)
+
+        def _send():
+            jobs, seen = [], set()
+            for r in range(tbl.rowCount()):
+                idx = tbl.cellWidget(r, 1).currentIndex()
+                if idx <= 0:
+                    continue
+                hw_id = int(homeworks[idx - 1]["id"])
+                if hw_id in seen:
+                    QMessageBox.warning(dlg, "Внимание", f"На задание #{hw_id} выбрано несколько решений.")
+                    return
+                seen.add(hw_id)
+                jobs.append((hw_id, tbl.item(r, 0).data(Qt.UserRole)))
+            if not jobs:
+                QMessageBox.warning(dlg, "Внимание", "Сопоставьте хотя бы один файл с заданием.")
+                return
+            answer = txt.text().strip()
+            self._batch = Batch(self.outbox.enqueue(hw_id, path, answer) for hw_id, path in jobs)
+            self._update_outbox_button()
+            self.statusBar().showMessage(f"Пакет из {len(jobs)} решений поставлен в очередь отправки", 8000)
+            dlg.accept()
+
+        btn_files.clicked.connect(_pick_files)
+        btn_dir.clicked.connect(_pick_dir)
+        btn_del.clicked.connect(_del)
+        btn_send.clicked.connect(_send)
+        btn_cancel.clicked.connect(dlg.reject)
+        _pick_files()
+        dlg.exec_()
+
+    def _on_batch_item(self, item_id: int) -> None:
+        batch = self._batch
+        if not batch.update(item_id, self.outbox.item(item_id)):
+            return
+        self.btn_hw_batch.setText(f"Пакет: {batch.done_count}/{len(batch.results)}")
+        if not batch.finished:
+            return
+        self._batch = None
+        self.btn_hw_batch.setText("Отправить пакетом…")
+        res = batch.summary()
+        lines = [f"Отправлено: {len(res['done'])}"]
+        lines += [f"• #{it['homework_id']} {os.path.basename(os.path.normpath(it['path']))}" for it in res["done"]]
+        if res["failed"]:
+            lines.append(f"Ошибки: {len(res['failed'])}")
+            lines += [f"• #{it['homework_id']} {os.path.basename(os.path.normpath(it['path']))}: {it['error']}"
+                      for it in res["failed"]]
+        if res["removed"]:
+            lines.append(f"Убрано из очереди: {len(res['removed'])}")
+        QMessageBox.information(self, "Пакетная отправка", "\n".join(lines))
+        if PAGE_HW in self._pages_built:
+            self._hw_reload_active(fresh=True)
 
     def _active_hw_status(self):
         idx = self.hw_tabs.currentIndex()
@@ -822,15 +1195,79 @@ class MainWindow(QMainWindow):
             s = f"{d.year():04d}-{d.month():02d}-{d.day():02d}"
             self._load_day_schedule(s)
 
+        self.schedule = ScheduleStore(self.token)
+        self._sched_loading = set()
         self.calendar.selectionChanged.connect(_on_date)
+        self.calendar.currentPageChanged.connect(self._prefetch_schedule)
+        self._prefetch_schedule(self.calendar.yearShown(), self.calendar.monthShown())
         _on_date()
         return page
 
+    def _prefetch_schedule(self, year: int, month: int) -> None:
+        for y, m in adjacent_months(year, month):
+            if not self.schedule.has_month(y, m) and self.schedule.restore_month(y, m):
+                self._shade_schedule_month(y, m)
+            # соседние месяцы без дат по дням не догружаем: это ~30 запросов ради невидимой страницы
+            self._load_schedule_month(y, m, fallback=(y, m) == (year, month))
+
+    def _load_schedule_month(self, year: int, month: int, fresh: bool = False, fallback: bool = True) -> None:
+        if (year, month) in self._sched_loading:
+            return
+        self._sched_loading.add((year, month))
+        skipped = []
+
+        def _done(by_day):
+            if by_day is None:
+                skipped.append(True)
+                return
+            self._shade_schedule_month(year, month)
+            d = self._sched_date
+            if d and (int(d[:4]), int(d[5:7])) == (year, month):
+                self._fill_day_schedule(self.schedule.lessons_on(d) or [])
+
+        def _fail(e):
+            print("schedule month error:", e)
+            d = self._sched_date
+            if d and (int(d[:4]), int(d[5:7])) == (year, month) and not self.schedule.has_month(year, month):
+                self._load_day_schedule_remote(d)
+
+        def _finished():
+            self._sched_loading.discard((year, month))
+            # пока шла предзагрузка, месяц могли открыть — теперь он нужен целиком
+            d = self._sched_date
+            wanted = {(self.calendar.yearShown(), self.calendar.monthShown())}
+            if d:
+                wanted.add((int(d[:4]), int(d[5:7])))
+            if skipped and (year, month) in wanted:
+                self._load_schedule_month(year, month, fresh)
+
+        run_task(self.schedule.load_month, year, month, fresh=fresh, fallback=fallback, on_result=_done,
+                 on_error=_fail, on_finished=_finished)
+
+    def _shade_schedule_month(self, year: int, month: int) -> None:
+        fmt = QTextCharFormat()
+        fmt.setBackground(QColor("#ede9fe"))
+        fmt.setFontWeight(QFont.Bold)
+        for day in self.schedule.days_with_lessons(year, month):
+            self.calendar.setDateTextFormat(QDate.fromString(day, "yyyy-MM-dd"), fmt)
+
     def _load_day_schedule(self, date_str: str):
-        try:
-            data = get_schedule(self.token, date_str).get("data", [])
-        except Exception:
-            data = []
+        self._sched_date = date_str
+        lessons = self.schedule.lessons_on(date_str)
+        if lessons is not None:
+            self._fill_day_schedule(lessons)
+            return
+        self.tbl_schedule.setRowCount(0)
+        self._load_schedule_month(int(date_str[:4]), int(date_str[5:7]))
+
+    def _load_day_schedule_remote(self, date_str: str):
+        def _done(js):
+            if self._sched_date == date_str:
+                self._fill_day_schedule((js or {}).get("data", []))
+
+        run_task(get_schedule, self.token, date_str, on_result=_done, on_error=lambda e: _done({}))
+
+    def _fill_day_schedule(self, data: list):
         self.tbl_schedule.setRowCount(len(data))
         for i, les in enumerate(data):
             start = les.get("time_start","-")
@@ -856,30 +1293,29 @@ class MainWindow(QMainWindow):
         self.tbl_reviews.horizontalHeader().setStretchLastSection(True)
         self.tbl_reviews.setEditTriggers(self.tbl_reviews.NoEditTriggers)
         v.addWidget(self.tbl_reviews)
-
-        def _load():
-            try:
-                js = get_reviews(self.token, page=1, mark_as_read=False)
-                items = js.get("data", [])
-            except Exception:
-                items = []
-            self.tbl_reviews.setRowCount(len(items))
-            for i, it in enumerate(items):
-                for c, val in enumerate([
-                    it.get("date","-"),
-                    it.get("full_spec") or it.get("spec") or "-",
-                    it.get("teacher","-"),
-                    it.get("message","-"),
-                ]):
-                    cell = QTableWidgetItem(str(val))
-                    if c == 0:
-                        cell.setTextAlignment(Qt.AlignCenter)
-                    self.tbl_reviews.setItem(i, c, cell)
-            self.tbl_reviews.resizeColumnsToContents()
-
-        _load()
+        self._load_reviews()
         return page
 
+    def _load_reviews(self, fresh: bool = False) -> None:
+        run_task(get_reviews, self.token, page=1, mark_as_read=False, fresh=fresh,
+                 on_result=self._fill_reviews, on_error=lambda e: print("Ошибка загрузки отзывов:", e))
+
+    def _fill_reviews(self, js):
+        items = (js or {}).get("data", [])
+        self.tbl_reviews.setRowCount(len(items))
+        for i, it in enumerate(items):
+            for c, val in enumerate([
+                it.get("date","-"),
+                it.get("full_spec") or it.get("spec") or "-",
+                it.get("teacher","-"),
+                it.get("message","-"),
+            ]):
+                cell = QTableWidgetItem(str(val))
+                if c == 0:
+                    cell.setTextAlignment(Qt.AlignCenter)
+                self.tbl_reviews.setItem(i, c, cell)
+        self.tbl_reviews.resizeColumnsToContents()
+
     def _fmt_dt(self, s: str) -> str:
         try:
             dtm = dt.strptime(s, "%Y-%m-%dT%H:%M:%S.%fZ")
@@ -891,7 +1327,21 @@ class MainWindow(QMainWindow):
         return {"coins": "монеты", "cristals": "кристаллы", "achivements": "ачивки", "points": "баллы", None: ""}.get(alias, alias or "")
 
     def _load_activity(self):
-        items = get_activity(self.token, page=self.activity_page, per_page=20)
+        page = self.activity_page
+        self.lbl_page.setText(f"Стр. {page} …")
+
+        def _done(items):
+            if page == self.activity_page:
+                self._fill_activity(items or [])
+
+        def _fail(e):
+            print("activity error:", e)
+            if page == self.activity_page:
+                self.lbl_page.setText(f"Стр. {page}")
+
+        run_task(get_activity, self.token, page=page, per_page=20, on_result=_done, on_error=_fail)
+
+    def _fill_activity(self, items: list):
         self.lbl_page.setText(f"Стр. {self.activity_page}")
         self.tbl.setRowCount(len(items))
         for row, it in enumerate(items):
@@ -918,20 +1368,28 @@ class MainWindow(QMainWindow):
             self._load_activity()
             
     def _refresh_fs_access(self):
-        try:
-            host, bearer, d = ensure_fs_credentials(self.token)
+        def _done(res):
+            host, bearer, d = res
             QMessageBox.information(self, "FS", f"OK\nhost: {host}\nfolder: {d or '-'}")
-        except Exception as e:
-            QMessageBox.critical(self, "FS", str(e))
 
-    def on_send_clicked(self) -> None:
-        hw = self._current_hw_from_cards()
-        if not hw:
-            st, tbl = self._hw_current_table_and_status()
-            row = tbl.currentRow()
-            if row >= 0 and row < len(self.hw_items_by_status.get(st, [])):
-                hw = self.hw_items_by_status[st][row]
+        def _fail(e):
+            ans = QMessageBox.question(self, "FS", f"{e}\n\nОткрыть MyStat во встроенном браузере и поймать FS-токен?")
+            if ans == QMessageBox.Yes:
+                self._open_fs_sniffer()
+
+        run_task(ensure_fs_credentials, self.token, on_result=_done, on_error=_fail)
+
+    def _open_fs_sniffer(self) -> None:
+        # WebEngine тяжёлый и необязательный: грузится только здесь
+        try:
+            from frontend.fs_sniffer import open_fs_sniffer
+        except ImportError:
+            QMessageBox.critical(self, "FS", "Для перехвата токена нужен пакет PyQtWebEngine.")
+            return
+        self._fs_sniffer = open_fs_sniffer()  # отдельное окно; ссылка держит его живым
 
+    def on_send_clicked(self) -> None:
+        hw = self._current_hw()
         if not hw:
             QMessageBox.information(self, "Задание", "Выбери карточку задания (или строку таблицы).")
             return
@@ -956,15 +1414,20 @@ class MainWindow(QMainWindow):
 
         file_row = QHBoxLayout()
         btn_pick = QPushButton("Выбрать файл…")
+        btn_pick_dir = QPushButton("Папка…")
+        btn_pick_dir.setToolTip("Папка уйдёт ZIP-архивом без node_modules, .git, venv и сборки")
         lbl_file = QLabel("Файл не выбран")
         lbl_file.setStyleSheet("color:#666;")
         file_row.addWidget(btn_pick)
+        file_row.addWidget(btn_pick_dir)
         file_row.addWidget(lbl_file, 1)
         v.addLayout(file_row)
 
         btns = QHBoxLayout()
         btns.addStretch(1)
+        btn_cancel = QPushButton("Отмена")
         btn_send = QPushButton("Отправить")
+        btns.addWidget(btn_cancel)
         btns.addWidget(btn_send)
         v.addLayout(btns)
 
@@ -975,20 +1438,23 @@ class MainWindow(QMainWindow):
             if p:
                 chosen["path"] = p
                 lbl_file.setText(os.path.basename(p))
+                prehash(p)
+
+        def _pick_dir():
+            p = QFileDialog.getExistingDirectory(self, "Папка с решением")
+            if p:
+                chosen["path"] = p
+                lbl_file.setText(f"{os.path.basename(os.path.normpath(p))}.zip (папка)")
 
         def _send():
             if not chosen["path"]:
-                QMessageBox.warning(dlg, "Внимание", "Выберите файл.")
+                QMessageBox.warning(dlg, "Внимание", "Выберите файл или папку.")
                 return
-            try:
-                link = upload_to_fs(self.token, chosen["path"])
-                homework_create(self.token, int(hw_id), link, txt.toPlainText().strip())
-                QMessageBox.information(self, "Отправлено", f"Задача #{hw_id} отправлена.")
-                dlg.accept()
-                self._hw_reload_active()
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", str(e))
+            self._enqueue_submission(int(hw_id), chosen["path"], txt.toPlainText().strip())
+            dlg.accept()
 
         btn_pick.clicked.connect(_pick)
+        btn_pick_dir.clicked.connect(_pick_dir)
         btn_send.clicked.connect(_send)
+        btn_cancel.clicked.connect(dlg.reject)
         dlg.exec_()
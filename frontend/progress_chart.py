@@ -0,0 +1,202 @@
+import math
+from bisect import bisect_left
+from collections import defaultdict
+
+from PyQt5.QtCore import Qt, QPointF, QRect, QRectF, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QPainterPath, QPen
+from PyQt5.QtWidgets import QSizePolicy, QToolTip, QWidget
+
+SLOTS = {"year": 12, "month": 31}  # столько точек помещается без пересчёта оси X
+
+
+def series_from_progress(progress: dict, period: str = "year") -> tuple:
+    # ответ statistic/progress -> (подписи, суммы баллов) по датам по возрастанию
+    by_date = defaultdict(int)
+    for dataset in (progress or {}).get("data", []):
+        for cm in dataset.get("chart_models", []):
+            d = cm.get("date"); pts = cm.get("points")
+            if pts is not None and d:
+                by_date[d] += pts
+    dates = sorted(by_date)
+    if period == "month":
+        labels = [f"{d[8:10]}.{d[5:7]}" if len(d) >= 10 else d for d in dates]
+    else:
+        labels = [f"{d[5:7]}/{d[2:4]}" if len(d) >= 7 else d for d in dates]
+    return labels, [by_date[d] for d in dates]
+
+
+def _nice_max(v: float, ticks: int) -> float:
+    # верх оси Y: «круглый» шаг делений * их число; запас сверху вмещает новые точки без пересчёта
+    if v <= 0:
+        return ticks
+    step = v / ticks
+    mag = 10 ** math.floor(math.log10(step))
+    for k in (1, 2, 2.5, 5, 10):
+        if step <= k * mag:
+            return k * mag * ticks
+    return 10 * mag * ticks
+
+
+# линия прогресса на QPainter: геометрия точек кэшируется и пересчитывается только при
+# смене размера или масштаба, новые точки дорисовываются частичным update()
+class ProgressChart(QWidget):
+    periodRequested = pyqtSignal(str)
+
+    PAD_L, PAD_R, PAD_T, PAD_B = 44, 28, 14, 30
+    TICKS = 4
+    HIT = 14  # px: радиус наведения на точку
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMouseTracking(True)
+        self.setMinimumHeight(200)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.period = "year"
+        self._series = {}  # period -> (labels, values)
+        self._labels: list = []
+        self._values: list = []
+        self._ymax = 0.0
+        self._slots = 0
+        self._pts: list = []   # кэш: QPointF каждой точки
+        self._xs: list = []
+        self._path = None
+        self._hover = -1
+
+    def has_period(self, period: str) -> bool:
+        return period in self._series
+
+    def set_period(self, period: str) -> None:
+        if period == self.period:
+            return
+        self.period = period
+        self._hover = -1
+        labels, values = self._series.get(period, ([], []))
+        self._apply(labels, values, force=True)
+
+    def set_series(self, labels: list, values: list, period: str = "year") -> None:
+        self._series[period] = (list(labels), list(values))
+        if period == self.period:
+            self._apply(list(labels), list(values))
+
+    def _apply(self, labels: list, values: list, force: bool = False) -> None:
+        old = len(self._values)
+        if not force and labels == self._labels and values == self._values:
+            return
+        grows = (not force and old and len(values) > old and labels[:old] == self._labels
+                 and values[:old] == self._values)
+        self._labels, self._values = labels, values
+        if grows and self._pts and len(values) <= self._slots and max(values) <= self._ymax:
+            # старые точки остались на месте: считаем и перерисовываем только хвост
+            self._extend(old)
+            return
+        self._invalidate()
+        self.update()
+
+    def _invalidate(self) -> None:
+        self._pts, self._xs, self._path = [], [], None
+
+    def _plot_rect(self) -> QRectF:
+        return QRectF(self.PAD_L, self.PAD_T, max(1, self.width() - self.PAD_L - self.PAD_R),
+                      max(1, self.height() - self.PAD_T - self.PAD_B))
+
+    def _point(self, i: int, v: float) -> QPointF:
+        r = self._plot_rect()
+        step = r.width() / max(1, self._slots - 1)
+        return QPointF(r.left() + i * step, r.bottom() - r.height() * v / self._ymax)
+
+    def _layout(self) -> None:
+        self._slots = max(SLOTS.get(self.period, 12), len(self._values))
+        self._ymax = _nice_max(max(self._values, default=0), self.TICKS)
+        self._pts = [self._point(i, v) for i, v in enumerate(self._values)]
+        self._xs = [p.x() for p in self._pts]
+        self._path = QPainterPath()
+        for i, p in enumerate(self._pts):
+            self._path.lineTo(p) if i else self._path.moveTo(p)
+
+    def _extend(self, start: int) -> None:
+        new = [self._point(i, v) for i, v in enumerate(self._values[start:], start)]
+        for p in new:
+            self._path.lineTo(p)
+        self._pts += new
+        self._xs += [p.x() for p in new]
+        first = self._pts[start - 1]
+        dirty = QRectF(first.x() - self.HIT, self.PAD_T - self.HIT,
+                       new[-1].x() - first.x() + self.HIT * 2, self.height())
+        self.update(dirty.toAlignedRect())
+
+    def resizeEvent(self, ev):
+        self._invalidate()
+        super().resizeEvent(ev)
+
+    def paintEvent(self, ev):
+        if self._path is None:
+            self._layout()
+        p = QPainter(self)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.setClipRect(ev.rect())
+        r = self._plot_rect()
+        fm = p.fontMetrics()
+
+        p.setPen(QPen(QColor("#d6d6e2"), 1, Qt.DashLine))
+        for k in range(self.TICKS + 1):
+            y = r.bottom() - r.height() * k / self.TICKS
+            p.drawLine(QPointF(r.left(), y), QPointF(r.right(), y))
+            p.setPen(QColor("#8b8d98"))
+            text = f"{self._ymax * k / self.TICKS:g}"
+            p.drawText(QRectF(0, y - fm.height() / 2, self.PAD_L - 6, fm.height()),
+                       Qt.AlignRight | Qt.AlignVCenter, text)
+            p.setPen(QPen(QColor("#d6d6e2"), 1, Qt.DashLine))
+
+        if not self._pts:
+            p.setPen(QColor("#8b8d98"))
+            p.drawText(r, Qt.AlignCenter, "Нет данных")
+            return
+
+        p.setPen(QPen(QColor("#7863ff"), 2))
+        p.drawPath(self._path)
+        p.setBrush(QColor("#ffffff"))
+        for i, pt in enumerate(self._pts):
+            radius = 5 if i == self._hover else 3
+            p.setPen(QPen(QColor("#7863ff"), 2))
+            p.drawEllipse(pt, radius, radius)
+
+        # подписи X через одну-две, если не помещаются
+        p.setPen(QColor("#63646d"))
+        w = max(fm.horizontalAdvance(s) for s in self._labels) + 8
+        slot_w = r.width() / max(1, self._slots - 1)
+        every = max(1, math.ceil(w / max(slot_w, 1)))
+        for i, (pt, label) in enumerate(zip(self._pts, self._labels)):
+            if i % every == 0 or i == self._hover:
+                p.drawText(QRectF(pt.x() - w / 2, r.bottom() + 6, w, fm.height()), Qt.AlignCenter, label)
+
+    def _hover_rect(self, i: int) -> QRect:
+        if not 0 <= i < len(self._pts):
+            return QRect()
+        pt = self._pts[i]
+        return QRect(int(pt.x() - 60), 0, 120, self.height())
+
+    def _nearest(self, x: float) -> int:
+        i = bisect_left(self._xs, x)
+        best = min((j for j in (i - 1, i) if 0 <= j < len(self._xs)), key=lambda j: abs(self._xs[j] - x),
+                   default=-1)
+        return best if best >= 0 and abs(self._xs[best] - x) <= self.HIT else -1
+
+    def mouseMoveEvent(self, ev):
+        i = self._nearest(ev.pos().x()) if self._pts else -1
+        if i != self._hover:
+            old, self._hover = self._hover, i
+            self.update(self._hover_rect(old))
+            self.update(self._hover_rect(i))
+        if i >= 0:
+            QToolTip.showText(ev.globalPos(), f"{self._labels[i]}: {self._values[i]:g} балл.", self)
+        else:
+            QToolTip.hideText()
+
+    def leaveEvent(self, ev):
+        if self._hover >= 0:
+            old, self._hover = self._hover, -1
+            self.update(self._hover_rect(old))
+        super().leaveEvent(ev)
+
+    def mouseDoubleClickEvent(self, ev):
+        self.periodRequested.emit("month" if self.period == "year" else "year")
@@ -0,0 +1,113 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+MAX_THREADS = 8
+
+_POOL = None
+_ACTIVE = set()
+
+
+class _AsyncBridge(QObject):
+    done = pyqtSignal(object, object, object)
+
+    def __init__(self):
+        super().__init__()
+        self.done.connect(self._dispatch)
+
+    def _dispatch(self, callbacks, res, err):
+        on_result, on_error, on_finished = callbacks
+        try:
+            if err is None:
+                if on_result is not None:
+                    on_result(res)
+            elif on_error is not None:
+                on_error(err)
+            else:
+                print("async task error:", err)
+        finally:
+            if on_finished is not None:
+                on_finished()
+
+
+_BRIDGE = None
+
+
+class TaskSignals(QObject):
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+class Progress(QObject):
+    # создаётся в GUI-потоке; report() можно звать из рабочего потока (байты могут не влезть в int)
+    changed = pyqtSignal(object, object)
+    throughput = pyqtSignal(float)
+    item = pyqtSignal(object, object)
+
+    def report(self, done, total, rate=None):
+        self.changed.emit(done, total)
+        if rate is not None:
+            self.throughput.emit(float(rate))
+
+    def report_item(self, key, result):
+        self.item.emit(key, result)
+
+
+class Task(QRunnable):
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            res = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            self.signals.result.emit(res)
+        finally:
+            self.signals.finished.emit()
+
+
+def thread_pool() -> QThreadPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = QThreadPool()
+        _POOL.setMaxThreadCount(MAX_THREADS)
+    return _POOL
+
+
+def run_task(fn, *args, on_result=None, on_error=None, on_finished=None, **kwargs) -> Task:
+    # колбэки подключаются из GUI-потока, поэтому вызываются в нём же (queued connection)
+    task = Task(fn, *args, **kwargs)
+    if on_result is not None:
+        task.signals.result.connect(on_result)
+    if on_error is not None:
+        task.signals.error.connect(on_error)
+    else:
+        task.signals.error.connect(lambda e: print(f"{getattr(fn, '__name__', fn)} error:", e))
+    if on_finished is not None:
+        task.signals.finished.connect(on_finished)
+    _ACTIVE.add(task)
+    task.signals.finished.connect(lambda: _ACTIVE.discard(task))
+    thread_pool().start(task)
+    return task
+
+
+def run_async(coro, *, on_result=None, on_error=None, on_finished=None):
+    # корутина исполняется в loop-потоке backend.mystat_async, результат приходит в GUI-поток
+    global _BRIDGE
+    from backend.mystat_async import submit
+    if _BRIDGE is None:
+        _BRIDGE = _AsyncBridge()
+    callbacks = (on_result, on_error, on_finished)
+
+    def _done(fut):
+        err = fut.exception()
+        _BRIDGE.done.emit(callbacks, None if err else fut.result(), err)
+
+    fut = submit(coro)
+    fut.add_done_callback(_done)
+    return fut
@@ -1,27 +1,54 @@
+from utils import timing  # первым: от него отсчитывается время старта
 import sys
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QIcon
-from frontend.main_window import MainWindow
-from frontend.login_dialog import LoginDialog
 from frontend.theme import APP_QSS
 from utils import db
-from utils.icons import qicon_from_url, ICON_URLS
+from utils.icons import qicon_from_url, prefetch_icons, ICON_URLS
+
+def run_sync_daemon():
+    # без окна: python main.py --sync — держит локальную БД свежей и печатает события
+    from backend.sync_daemon import SyncDaemon
+    token = db.get_mystat_token()
+    if not token:
+        print("Нет сохранённого токена: сначала войдите через приложение.")
+        sys.exit(1)
+    daemon = SyncDaemon(token)
+    daemon.subscribe(lambda ev: print(ev.get("type"), ev.get("resource"), len(ev.get("items") or [])))
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
 
 def main():
+    if "--sync" in sys.argv:
+        return run_sync_daemon()
+    timing.ENABLED = "--timing" in sys.argv
+    timing.mark("импорты")
     app = QApplication(sys.argv)
     app.setApplicationName("MyStat Desktop")
     app.setStyleSheet(APP_QSS or "")
-    app.setWindowIcon(qicon_from_url(ICON_URLS["favicon"]))
+    prefetch_icons()
+    app.setWindowIcon(qicon_from_url(ICON_URLS["favicon"], on_ready=app.setWindowIcon))
+    timing.mark("QApplication")
 
     token = db.get_mystat_token()
     if not token:
+        from frontend.login_dialog import LoginDialog
         dlg = LoginDialog()
         if dlg.exec_() != dlg.Accepted:
             sys.exit(0)
         token = db.get_mystat_token()
+        timing.mark("вход (ожидание пользователя)")
 
+    from frontend.main_window import MainWindow
+    timing.mark("импорт окна")
     w = MainWindow(token)
+    timing.mark("MainWindow")
     w.show()
+    if timing.ENABLED:
+        QTimer.singleShot(0, lambda: (timing.mark("первый кадр"), print(timing.report())))
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
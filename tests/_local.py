@@ -0,0 +1,93 @@
+import json, os, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from utils import db
+
+
+# офлайн-тесты: своя БД во временной папке и HTTP-сервер на 127.0.0.1 вместо MyStat/FS;
+# глобальные настройки меняются через monkeypatch и возвращаются после теста
+def use_temp_db(tmp_path, monkeypatch) -> str:
+    monkeypatch.setattr(db, "_DB_PATH", os.path.join(str(tmp_path), "app.db"))
+    return db._DB_PATH
+
+
+def use_local_api(monkeypatch, base: str, city: str = "aqtobe") -> None:
+    from backend import mystat_api as api
+    monkeypatch.setattr(api, "BASE_URL", f"{base}/v1/mystat")
+    monkeypatch.setattr(api, "API_BASE", base)
+    monkeypatch.setattr(api, "CITY", city)
+    monkeypatch.setattr(api, "FS_HOST_CANDIDATES", [])  # настоящие FS-хосты тесты не трогают
+    api._mark_online()
+
+
+class LocalServer:
+    # routes: путь -> fn(req) -> (код, заголовки, тело) или список ответов, отдаваемых по очереди
+    def __init__(self, routes: dict = None):
+        self.routes = dict(routes or {})
+        self.requests = []
+        server = self
+
+        class H(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *a):
+                pass
+
+            def _handle(self):
+                u = urlparse(self.path)
+                n = int(self.headers.get("Content-Length") or 0)
+                if n:
+                    body = self.rfile.read(n)
+                elif self.headers.get("Transfer-Encoding") == "chunked":
+                    body = b""
+                    while True:
+                        size = int(self.rfile.readline().strip(), 16)
+                        if not size:
+                            self.rfile.readline()
+                            break
+                        body += self.rfile.read(size)
+                        self.rfile.readline()
+                else:
+                    body = b""
+                req = {"method": self.command, "path": u.path, "query": {k: v[0] for k, v in parse_qs(u.query).items()},
+                       "headers": dict(self.headers), "body": body}
+                server.requests.append(req)
+                code, headers, out = server._respond(req)
+                if isinstance(out, (dict, list)):
+                    out = json.dumps(out).encode()
+                    headers = dict({"Content-Type": "application/json"}, **headers)
+                elif isinstance(out, str):
+                    out = out.encode()
+                self.send_response(code)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(out)
+
+            do_GET = do_POST = do_HEAD = do_OPTIONS = do_DELETE = do_PUT = _handle
+
+        self._srv = ThreadingHTTPServer(("127.0.0.1", 0), H)
+        self.base = f"http://127.0.0.1:{self._srv.server_address[1]}"
+        self.host = self.base.split("://", 1)[1]
+        threading.Thread(target=self._srv.serve_forever, daemon=True).start()
+
+    def _respond(self, req):
+        route = self.routes.get(req["path"])
+        if route is None:
+            return 404, {}, {"error": req["path"]}
+        if isinstance(route, list):
+            route = route.pop(0) if len(route) > 1 else route[0]
+        res = route(req) if callable(route) else route
+        if len(res) == 2:
+            return res[0], {}, res[1]
+        return res
+
+    def hits(self, path: str) -> int:
+        return sum(1 for r in self.requests if r["path"] == path)
+
+    def close(self):
+        self._srv.shutdown()
+        self._srv.server_close()
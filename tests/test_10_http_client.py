@@ -0,0 +1,82 @@
+import socket, time
+from email.utils import formatdate
+import pytest
+import requests
+from tests._local import LocalServer
+from backend.http_client import CircuitBreaker, HostDown, HttpClient, RetryPolicy, retry_after
+
+
+def _client(**kw):
+    return HttpClient(retry=RetryPolicy(backoff=0.01, **kw), circuit=CircuitBreaker(threshold=3, cooldown=0.3))
+
+
+def test_idempotent_request_is_retried_post_is_not():
+    srv = LocalServer({"/get": [(503, "busy"), (502, "busy"), (200, "ok")], "/post": [(503, "busy"), (200, "ok")]})
+    c = _client()
+    assert c.get(f"{srv.base}/get").text == "ok"
+    assert srv.hits("/get") == 3
+    assert c.post(f"{srv.base}/post").status_code == 503
+    assert srv.hits("/post") == 1
+    srv.close()
+
+
+def test_retry_after_is_honoured_or_gives_up():
+    srv = LocalServer({"/a": [(429, {"Retry-After": "0.3"}, "slow down"), (200, "ok")],
+                       "/b": [(503, {"Retry-After": "120"}, "later"), (200, "ok")]})
+    c = _client()
+    t0 = time.perf_counter()
+    assert c.get(f"{srv.base}/a").text == "ok"
+    assert time.perf_counter() - t0 >= 0.3
+    assert c.get(f"{srv.base}/b").status_code == 503  # ждать дольше RETRY_AFTER_MAX не стали
+    assert srv.hits("/b") == 1
+    srv.close()
+
+
+def test_retry_after_formats():
+    assert retry_after({"Retry-After": "5"}) == 5
+    assert 8 <= retry_after({"Retry-After": formatdate(time.time() + 10, usegmt=True)}) <= 10
+    assert retry_after({"Retry-After": "завтра"}) is None
+    assert retry_after(None) is None
+
+
+def test_breaker_state_machine():
+    b = CircuitBreaker(threshold=2, cooldown=0.2)
+    b.failure("h")
+    assert b.state("h") == "closed" and b.allow("h")
+    b.failure("h")
+    assert b.state("h") == "open" and not b.allow("h") and b.retry_in("h") > 0
+    time.sleep(0.25)
+    assert b.allow("h") and b.state("h") == "half-open"
+    b.failure("h")  # пробный запрос не прошёл — снова open, без накопления до threshold
+    assert b.state("h") == "open" and not b.allow("h")
+    time.sleep(0.25)
+    assert b.allow("h")
+    b.success("h")
+    assert b.state("h") == "closed" and b.retry_in("h") == 0
+
+
+def test_dead_host_fails_fast_after_threshold():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    url = f"http://127.0.0.1:{s.getsockname()[1]}/x"
+    s.close()  # порт свободен: соединение отвергается
+    c = _client(retries=0)
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError) as e:
+            c.get(url)
+        assert not isinstance(e.value, HostDown)
+    with pytest.raises(HostDown):
+        c.get(url)
+
+
+def test_one_broken_endpoint_counts_once_per_request():
+    srv = LocalServer({"/broken": (503, "busy"), "/ok": (200, "ok")})
+    c = _client()
+    c.get(f"{srv.base}/broken")  # три попытки, но для автомата хоста — одна неудача
+    assert srv.hits("/broken") == 3 and c.circuit.state(srv.host) == "closed"
+    assert c.get(f"{srv.base}/ok").text == "ok"
+    srv.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,67 @@
+import os, threading
+from email.parser import BytesParser
+from email.policy import HTTP
+import pytest
+import requests
+from tests._local import LocalServer
+from backend.multipart import ChunkedMultipartStream, MultipartStream, UploadCancelled
+
+
+def _parts(content_type: str, body: bytes) -> list:
+    msg = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    return [(p.get_param("name", header="content-disposition"), p.get_filename(), p.get_payload(decode=True))
+            for p in msg.iter_parts()]
+
+
+def _file(tmp_path, size=700 * 1024) -> str:
+    path = os.path.join(str(tmp_path), 'отчёт "финал".bin')
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def test_stream_framing_and_length(tmp_path):
+    path = _file(tmp_path)
+    progress = []
+    s = MultipartStream("files[]", path, {"directory": "dir1"}, chunk_size=64 * 1024,
+                        on_progress=lambda done, total: progress.append((done, total)))
+    body = b"".join(s)
+    assert len(body) == len(s) == s.size
+    with open(path, "rb") as f:
+        data = f.read()
+    assert _parts(s.content_type, body) == [("directory", None, b"dir1"),
+                                            ("files[]", "отчёт %22финал%22.bin", data)]
+    assert [d for d, _ in progress] == sorted(d for d, _ in progress) and progress[-1] == (len(s), len(s))
+
+
+def test_cancel_stops_mid_file(tmp_path):
+    cancel = threading.Event()
+    s = MultipartStream("f", _file(tmp_path), chunk_size=64 * 1024, cancel=cancel)
+    it = iter(s)
+    next(it), next(it)
+    cancel.set()
+    with pytest.raises(UploadCancelled):
+        next(it)
+
+
+def test_chunked_stream_framing():
+    chunks = [b"PK\x03\x04", os.urandom(1000), b"end"]
+    s = ChunkedMultipartStream("files[]", iter(chunks), "project.zip", {"directory": "d"}, size_hint=1007)
+    body = b"".join(s)
+    assert s.size == len(body)
+    assert _parts(s.content_type, body) == [("directory", None, b"d"), ("files[]", "project.zip", b"".join(chunks))]
+
+
+def test_server_receives_exact_body(tmp_path):
+    srv = LocalServer({"/upload": (200, "ok")})
+    s = MultipartStream("files[]", _file(tmp_path, 300 * 1024))
+    requests.post(f"{srv.base}/upload", data=s, headers={"Content-Type": s.content_type})
+    req = srv.requests[0]
+    assert int(req["headers"]["Content-Length"]) == len(s) == len(req["body"])
+    with open(s.file_path, "rb") as f:
+        assert _parts(req["headers"]["Content-Type"], req["body"])[0][2] == f.read()
+    srv.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,83 @@
+import os, re, threading
+import pytest
+from tests._local import LocalServer, use_temp_db
+from backend.downloader import Download, DownloadCancelled, MIN_SEGMENT, SEGMENTS, _split
+from utils import db
+
+DATA = os.urandom(3 * MIN_SEGMENT + 12345)
+
+
+def _server(etag='"v1"', ranges=True):
+    state = {"etag": etag}
+
+    def route(req):
+        m = re.match(r"bytes=(\d+)-(\d+)", req["headers"].get("Range", ""))
+        if not ranges or not m:
+            return 200, {}, DATA
+        a, b = int(m.group(1)), min(int(m.group(2)), len(DATA) - 1)
+        return 206, {"Content-Range": f"bytes {a}-{b}/{len(DATA)}", "ETag": state["etag"]}, DATA[a:b + 1]
+
+    srv = LocalServer({"/file.bin": route})
+    srv.state = state
+    return srv
+
+
+def _ranges(srv) -> list:
+    return sorted(int(re.match(r"bytes=(\d+)", r["headers"]["Range"]).group(1)) for r in srv.requests[1:])
+
+
+def _interrupted(tmp_path, srv) -> str:
+    # обрыв на середине: отмена, когда скачана примерно половина
+    cancel = threading.Event()
+
+    def on_progress(done, total, rate):
+        if done > total // 2:
+            cancel.set()
+
+    dl = Download(f"{srv.base}/file.bin", str(tmp_path), on_progress=on_progress, cancel=cancel)
+    with pytest.raises(DownloadCancelled):
+        dl.run()
+    return dl.path
+
+
+def test_interrupted_download_resumes_from_saved_segments(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    srv = _server()
+    path = _interrupted(tmp_path, srv)
+    saved = db.download_get(path)["segments"]
+    assert len(saved) == 3 and any(pos > a for a, _, pos in saved)
+    del srv.requests[:]
+    assert Download(f"{srv.base}/file.bin", str(tmp_path)).run() == path
+    # докачивается только недостающее: каждый диапазон начинается с сохранённой позиции
+    assert _ranges(srv) == sorted(pos for _, b, pos in saved if pos <= b)
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert db.download_get(path) is None and not os.path.exists(path + ".part")
+    srv.close()
+
+
+def test_changed_file_is_downloaded_again(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    srv = _server()
+    path = _interrupted(tmp_path, srv)
+    srv.state["etag"] = '"v2"'
+    del srv.requests[:]
+    Download(f"{srv.base}/file.bin", str(tmp_path)).run()
+    assert _ranges(srv) == [a for a, _, _ in _split(len(DATA), SEGMENTS)]  # ETag другой — с нуля
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    srv.close()
+
+
+def test_server_without_ranges_streams_whole_file(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    srv = _server(ranges=False)
+    path = Download(f"{srv.base}/file.bin", str(tmp_path)).run()
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert len(srv.requests) == 1
+    srv.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,67 @@
+import os, time
+from tests._local import LocalServer, use_temp_db
+from tests.test_6_outbox import FakeMyStat
+from backend import mystat_api as api
+from backend import upload_dedupe as dd
+from utils import db
+
+
+def _file(tmp_path, data=b"solution") -> str:
+    path = os.path.join(str(tmp_path), "sol.zip")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _age_links():
+    c = db._conn()
+    with c:
+        c.execute("UPDATE fs_uploads SET checked_at=0")
+
+
+def test_digest_is_cached_until_file_changes(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    path = _file(tmp_path)
+    dd.prehash(path).result(5)
+    assert dd.prehash(path) is None  # уже в кэше
+    first = dd.file_digest(path)
+    _file(tmp_path, b"other solution")
+    assert dd.file_digest(path) != first
+
+
+def test_lookup_matches_host_and_directory(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    dd.remember_link("abc", 10, "https://fs1", "dir1", "https://fs1/files/1")
+    assert dd.find_link("abc", 10, ["https://fs2", "https://fs1"], "dir1") == "https://fs1/files/1"
+    assert dd.find_link("abc", 10, ["https://fs2"], "dir1") is None
+    assert dd.find_link("abc", 10, ["https://fs1"], "dir2") is None
+    assert dd.find_link("abc", 11, ["https://fs1"], "dir1") is None
+
+
+def test_stale_link_is_rechecked(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    srv = LocalServer({"/files/alive": (200, ""), "/files/gone": (404, "")})
+    alive, gone = f"{srv.base}/files/alive", f"{srv.base}/files/gone"
+    dd.remember_link("a", 1, srv.base, "d", alive)
+    dd.remember_link("g", 1, srv.base, "d", gone)
+    _age_links()
+    assert dd.find_link("a", 1, [srv.base], "d") == alive
+    assert dd.find_link("g", 1, [srv.base], "d") is None
+    assert db.fs_upload_find("g", 1, "d", [srv.base]) is None  # мёртвая ссылка забыта
+    assert dd.find_link("a", 1, [srv.base], "d") == alive
+    assert srv.hits("/files/alive") == 1  # после проверки снова доверяем кэшу
+    srv.close()
+
+
+def test_same_file_is_not_uploaded_twice(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+    first = api.upload_to_fs("tok", fake.file)
+    progress = []
+    assert api.upload_to_fs("tok", fake.file, on_progress=lambda d, t: progress.append((d, t))) == first
+    assert len(fake.uploads()) == 1 and progress[-1][0] == progress[-1][1]
+    fake.srv.close()
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,67 @@
+import os, random
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QPersistentModelIndex
+from PyQt5.QtTest import QAbstractItemModelTester
+from PyQt5.QtWidgets import QApplication
+from frontend.hw_model import HomeworkModel, SYNC_RESET_AT
+
+app = QApplication.instance() or QApplication([])
+
+
+def _hw(i, stud=None, theme=""):
+    return {"id": i, "homework_stud": {"id": stud} if stud else None, "theme": theme or f"Тема {i}",
+            "name_spec": "Python", "creation_time": "2024-05-01", "completion_time": "2024-05-10"}
+
+
+def _model(items):
+    m = HomeworkModel()
+    m.set_items(items)
+    m.tester = QAbstractItemModelTester(m, QAbstractItemModelTester.FailureReportingMode.Fatal)
+    m.resets = []
+    m.modelReset.connect(lambda: m.resets.append(1))
+    return m
+
+
+def test_random_diffs_match_target_without_reset():
+    rnd = random.Random(7)
+    m = _model([_hw(i) for i in range(30)])
+    for _ in range(50):
+        cur = list(m.items())
+        rnd.shuffle(cur)
+        cur = cur[:rnd.randint(10, len(cur))]
+        cur += [_hw(rnd.randint(100, 10_000)) for _ in range(rnd.randint(0, 5))]
+        for j in rnd.sample(range(len(cur)), 3):
+            cur[j] = dict(cur[j], theme=f"изменено {rnd.random()}")
+        cur = list({(hw["id"], None): hw for hw in cur}.values())
+        m.sync(cur)
+        assert m.items() == cur
+    assert m.resets == []
+
+
+def test_selection_follows_its_row_and_only_changed_rows_repaint():
+    m = _model([_hw(1), _hw(2), _hw(3), _hw(4)])
+    sel = QPersistentModelIndex(m.index(2, 0))  # ДЗ 3
+    changed = []
+    m.dataChanged.connect(lambda a, b: changed.append(a.row()))
+    m.sync([_hw(4), _hw(5), _hw(3, theme="новая тема"), _hw(1)])
+    assert [hw["id"] for hw in m.items()] == [4, 5, 3, 1]
+    assert sel.isValid() and m.item(sel.row())["id"] == 3
+    assert changed == [2]
+
+
+def test_same_homework_with_new_submission_is_a_new_row():
+    m = _model([_hw(1), _hw(2)])
+    m.sync([_hw(1), _hw(2), _hw(2, stud=20)])
+    assert m.row_of((2, 20)) == 2 and m.row_of((2, None)) == 1
+
+
+def test_many_new_rows_use_reset():
+    m = _model([_hw(0)])
+    m.sync([_hw(i) for i in range(SYNC_RESET_AT + 2)])
+    assert m.resets == [1] and m.rowCount() == SYNC_RESET_AT + 2
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
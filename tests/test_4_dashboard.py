@@ -0,0 +1,12 @@
+from tests._utils import load_token
+from backend.mystat_api import fetch_dashboard
+def main():
+    t = load_token()
+    res = fetch_dashboard(t)
+    for name, sec in sorted(res["timings"].items()):
+        print(f"{name:<11} {sec*1000:7.0f} ms", "OK" if name in res["data"] else f"ERR {res['errors'][name]}")
+    total = sum(res["timings"].values())
+    print(f"WALL: {res['elapsed']*1000:.0f} ms, SUM: {total*1000:.0f} ms")
+    raise SystemExit(0 if not res["errors"] else 1)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import base64, json
+from tests._local import LocalServer, use_local_api, use_temp_db
+from backend import mystat_api as api
+from utils import db
+
+
+def _jwt(user_id: int, salt: str = "") -> str:
+    part = lambda d: base64.urlsafe_b64encode(json.dumps(d).encode()).decode().rstrip("=")
+    return f"{part({'alg': 'none'})}.{part({'id': user_id, 'salt': salt})}.sig"
+
+
+def _setup(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    srv = LocalServer({"/v1/mystat/auth/me": lambda req: (200, {"who": req["headers"]["Authorization"][-12:]})})
+    use_local_api(monkeypatch, srv.base)
+    return srv
+
+
+def test_cache_is_per_account(tmp_path, monkeypatch):
+    srv = _setup(tmp_path, monkeypatch)
+    a, b = _jwt(1), _jwt(2)
+    assert api.get_user_info(a)["who"] == a[-12:]
+    assert api.get_user_info(b)["who"] == b[-12:]
+    assert api.get_user_info(a)["who"] == a[-12:]
+    assert srv.hits("/v1/mystat/auth/me") == 2  # третий вызов — из кэша своего аккаунта
+    srv.close()
+
+
+def test_relogin_same_user_keeps_cache(tmp_path, monkeypatch):
+    srv = _setup(tmp_path, monkeypatch)
+    db.set_mystat_token(_jwt(1, "first"))
+    api.get_user_info(_jwt(1, "first"))
+    db.set_mystat_token(_jwt(1, "second"))
+    api.get_user_info(_jwt(1, "second"))
+    assert srv.hits("/v1/mystat/auth/me") == 1
+    srv.close()
+
+
+def test_account_switch_clears_user_data(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    db.set_mystat_token(_jwt(1))
+    db.schedule_put_month("aqtobe", "2024-05", {"2024-05-03": [{"subject_name": "S"}]})
+    db.outbox_add(5, "/tmp/x.zip", "")
+    db.set_many({"fs_bearer": "b1", "sync_seen:aqtobe:u1:homework": "[]"})
+    db.set_mystat_token(_jwt(2))
+    assert db.schedule_get_month("aqtobe", "2024-05") is None
+    assert db.outbox_list() == []
+    assert db.get_fs_bearer() == ""
+    assert db.get_many(["sync_seen:aqtobe:u1:homework"])["sync_seen:aqtobe:u1:homework"] == ""
+    db.set_mystat_token(_jwt(1))
+    assert [it["homework_id"] for it in db.outbox_list()] == [5]  # очередь вернулась к владельцу
+
+
+def test_relogin_with_opaque_token_keeps_user_data(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    db.set_mystat_token("opaque-first")
+    db.schedule_put_month("aqtobe", "2024-05", {"2024-05-03": [{"subject_name": "S"}]})
+    db.outbox_add(5, "/tmp/x.zip", "")
+    db.set_mystat_token("opaque-second")
+    assert db.schedule_get_month("aqtobe", "2024-05") is not None
+    assert [it["homework_id"] for it in db.outbox_list()] == [5]
+
+
+def test_revalidation_notifies_on_change(tmp_path, monkeypatch):
+    import time
+    srv = _setup(tmp_path, monkeypatch)
+    bodies = [(200, {"v": 1}), (200, {"v": 2}), (200, {"v": 2})]
+    srv.routes["/v1/mystat/auth/me"] = bodies
+    seen = []
+    api.add_cache_listener(seen.append)
+    try:
+        tok = _jwt(1)
+        assert api.get_user_info(tok) == {"v": 1}
+        monkeypatch.setitem(api.CACHE_TTL, "auth/me", 0)
+        assert api.get_user_info(tok) == {"v": 1}  # устаревшее сразу, свежее — в фоне
+        for _ in range(50):
+            if seen:
+                break
+            time.sleep(0.05)
+        assert seen == ["auth/me"]
+        assert api.get_user_info(tok) == {"v": 2}
+        time.sleep(0.5)
+        assert seen == ["auth/me"]  # тело не изменилось — повторного события нет
+    finally:
+        api.remove_cache_listener(seen.append)
+        srv.close()
+
+
+def test_endpoint_5xx_is_not_offline(tmp_path, monkeypatch):
+    from backend.http_client import get_client
+    srv = _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(get_client().retry, "backoff", 0.01)
+    tok = _jwt(1)
+    srv.routes["/v1/mystat/auth/me"] = [(200, {"v": 1}), (502, "bad gateway")]
+    assert api.get_user_info(tok) == {"v": 1}
+    assert api.get_user_info(tok, fresh=True) == {"v": 1}  # 5xx: отдали кэш
+    assert api.net_status()["online"]
+    srv.routes["/v1/mystat/statistic"] = (503, "down")
+    try:
+        api._cached_json("statistic", f"{srv.base}/v1/mystat/statistic", tok)
+        assert False, "ожидалась ApiError"
+    except api.ApiError as e:
+        assert e.status == 503
+    assert api.net_status()["online"]
+    get_client().circuit.reset()
+    srv.close()
+
+
+def test_connection_error_goes_offline(tmp_path, monkeypatch):
+    use_temp_db(tmp_path, monkeypatch)
+    use_local_api(monkeypatch, "http://127.0.0.1:9")
+    try:
+        api.get_user_info(_jwt(1), fresh=True)
+        assert False, "ожидалась ApiUnavailable"
+    except api.ApiUnavailable:
+        pass
+    assert not api.net_status()["online"]
+    api._mark_online()
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
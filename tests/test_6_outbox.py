@@ -0,0 +1,233 @@
+import os, threading, time
+import pytest
+from tests._local import LocalServer, use_local_api, use_temp_db
+from backend import mystat_api as api
+from backend import mystat_async
+from backend import outbox as outbox_mod
+from backend.outbox import Outbox
+from utils import db
+
+
+class FakeMyStat:
+    # MyStat + один FS-хост на локальном сервере; ответы FS задаются списком по очереди
+    def __init__(self, tmp_path, monkeypatch, fs_upload=None):
+        use_temp_db(tmp_path, monkeypatch)
+        self.tokens = iter(["fs1", "fs2", "fs3"])
+        self.srv = LocalServer({
+            "/v1/mystat/aqtobe/user/file-token": lambda req: (200, {
+                "domain": self.srv.base, "token": next(self.tokens), "directories": {"homeworkDirId": "dir1"}}),
+            "/api/v1/files": lambda req: self._fs(req),
+            "/v1/mystat/aqtobe/homework/create": (200, {"ok": True}),
+            "/v1/mystat/aqtobe/homework/list": (200, {"data": []}),
+        })
+        self.fs_upload = fs_upload or [(200, [{"link": f"{self.srv.base}/files/1"}])]
+        use_local_api(monkeypatch, self.srv.base)
+        self.probe_delay = 0
+        self.file = os.path.join(str(tmp_path), "solution.zip")
+        with open(self.file, "wb") as f:
+            f.write(os.urandom(64 * 1024))
+
+    def _fs(self, req):
+        if req["method"] == "OPTIONS":
+            time.sleep(self.probe_delay)
+            return 204, ""
+        return self.fs_upload.pop(0) if len(self.fs_upload) > 1 else self.fs_upload[0]
+
+    def uploads(self):
+        return [r for r in self.srv.requests if r["path"] == "/api/v1/files" and r["method"] == "POST"]
+
+    def creates(self):
+        return [r for r in self.srv.requests if r["path"].endswith("homework/create")]
+
+
+def _run(outbox: Outbox, item_id: int) -> dict:
+    # один проход воркера синхронно, без фонового потока
+    outbox._active[item_id] = threading.Event()
+    outbox._process(db.outbox_get(item_id))
+    return db.outbox_get(item_id)
+
+
+def test_outbox_upload_then_create(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+    o = Outbox("tok")
+    events = []
+    o.subscribe(lambda ev: events.append(ev["type"]))
+    item = _run(o, o.enqueue(7, fake.file, "ответ"))
+    assert item["state"] == "done" and item["link"].endswith("/files/1")
+    assert len(fake.uploads()) == 1 and len(fake.creates()) == 1
+    assert events[0] == "queued" and events[-1] == "done"
+    fake.srv.close()
+
+
+def test_fs_4xx_is_permanent(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch, [(413, {"error": "too large"})])
+    o = Outbox("tok")
+    item = _run(o, o.enqueue(7, fake.file, ""))
+    assert item["state"] == "failed" and item["attempts"] == 1
+    assert "413" in item["error"]
+    assert fake.creates() == []
+    fake.srv.close()
+
+
+def test_fs_401_refreshes_bearer(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch, [(401, {"error": "expired"}), (200, [{"link": "http://fs/files/9"}])])
+    o = Outbox("tok")
+    item = _run(o, o.enqueue(7, fake.file, ""))
+    assert item["state"] == "done"
+    auth = [r["headers"]["Authorization"] for r in fake.uploads()]
+    assert auth == ["Bearer fs1", "Bearer fs2"]
+    assert db.get_fs_bearer() == "fs2"
+    fake.srv.close()
+
+
+def test_fs_5xx_is_retried_later(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch, [(503, "busy")])
+    o = Outbox("tok")
+    item = _run(o, o.enqueue(7, fake.file, ""))
+    assert item["state"] == "queued" and item["attempts"] == 1 and item["next_at"] > 0
+    fake.srv.close()
+
+
+def test_missing_file_fails_without_retry(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+    o = Outbox("tok")
+    item = _run(o, o.enqueue(7, os.path.join(str(tmp_path), "нет.zip"), ""))
+    assert item["state"] == "failed" and "не найден" in item["error"]
+    assert fake.uploads() == []
+    fake.srv.close()
+
+
+def test_transient_errors_give_up_after_max_attempts(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch, [(503, "busy")])
+    o = Outbox("tok")
+    item_id = o.enqueue(7, fake.file, "")
+    states = []
+    for _ in range(outbox_mod.MAX_ATTEMPTS):
+        states.append(_run(o, item_id)["state"])
+    assert states == ["queued"] * (outbox_mod.MAX_ATTEMPTS - 1) + ["failed"]
+    fake.srv.close()
+
+
+def test_create_rejected_then_retried_without_reupload(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+    fake.srv.routes["/v1/mystat/aqtobe/homework/create"] = [(422, {"error": "closed"}), (200, {"ok": True})]
+    o = Outbox("tok")
+    item_id = o.enqueue(7, fake.file, "")
+    item = _run(o, item_id)
+    assert item["state"] == "failed" and item["link"]  # ссылка FS сохранилась
+    o.retry(item_id)
+    assert o.item(item_id)["state"] == "uploaded" and o.item(item_id)["attempts"] == 0
+    assert _run(o, item_id)["state"] == "done"
+    assert len(fake.uploads()) == 1 and len(fake.creates()) == 2
+    fake.srv.close()
+
+
+def test_start_resumes_interrupted_items(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+    o = Outbox("tok")
+    uploading, creating = o.enqueue(7, fake.file, ""), o.enqueue(8, fake.file, "")
+    db.outbox_update(uploading, state="uploading")
+    db.outbox_update(creating, state="creating", link="http://fs/files/8")
+    done = threading.Event()
+    o.subscribe(lambda ev: ev["type"] == "done" and not o.pending() and done.set())
+    o.start()
+    try:
+        assert done.wait(10)
+    finally:
+        o.stop()
+    assert [o.item(i)["state"] for i in (uploading, creating)] == ["done", "done"]
+    assert len(fake.uploads()) == 1 and len(fake.creates()) == 2
+    fake.srv.close()
+
+
+def _fs_host(bearer: str) -> LocalServer:
+    # FS-хост, который принимает только свой токен: проверка OPTIONS с чужим — 401
+    def files(req):
+        if req["headers"].get("Authorization") != f"Bearer {bearer}":
+            return 401, {"error": "bad token"}
+        return (204, "") if req["method"] == "OPTIONS" else (200, [{"link": f"http://{bearer}-host/files/1"}])
+    return LocalServer({"/api/v1/files": files})
+
+
+def _posts(srv: LocalServer) -> list:
+    return [r for r in srv.requests if r["method"] == "POST"]
+
+
+def test_upload_stays_on_hosts_that_accept_the_bearer(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+    fake.probe_delay = 3
+    foreign = _fs_host("other-token")
+    monkeypatch.setattr(api, "FS_HOST_CANDIDATES", [foreign.base])
+    t0 = time.perf_counter()
+    link = api.upload_to_fs("tok", fake.file)
+    assert time.perf_counter() - t0 < 2  # медленная проверка хоста идёт в фоне
+    assert link.startswith(fake.srv.base)
+    assert api.rank_fs_hosts("fs1", fake.srv.base, fresh=True) == [fake.srv.base]
+    assert _posts(foreign) == [] and foreign.hits("/api/v1/files") >= 1  # проверен, но токен не принял
+    fake.srv.close()
+    foreign.close()
+
+
+def test_upload_fails_over_to_discovered_host(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch, [(503, "busy")])
+    other, foreign = _fs_host("fs1"), _fs_host("other-token")
+    monkeypatch.setattr(api, "FS_HOST_CANDIDATES", [foreign.base, other.base])
+    assert api.upload_to_fs("tok", fake.file) == "http://fs1-host/files/1"
+    assert len(fake.uploads()) == 1 and len(_posts(other)) == 1 and _posts(foreign) == []
+    assert db.get_fs_bearer_hosts("fs1") == [fake.srv.base, other.base]
+    fake.srv.close()
+    other.close()
+    foreign.close()
+
+
+def test_async_submit_and_create_error(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+    assert mystat_async.run_sync(mystat_async.submit_homework("tok", 7, fake.file, "ответ"), 30) == {"ok": True}
+    assert len(fake.uploads()) == 1 and len(fake.creates()) == 1
+    fake.srv.routes["/v1/mystat/aqtobe/homework/create"] = (422, {"error": "closed"})
+    with pytest.raises(api.ApiError) as e:
+        mystat_async.run_sync(mystat_async.homework_create("tok", 7, "http://fs/files/1"), 30)
+    assert e.value.status == 422
+    fake.srv.close()
+
+
+def _lost_create_reply(fake, listing):
+    # create дошёл до сервера, но ответ потерялся (503); при повторе список ДЗ решает, слать ли снова
+    fake.srv.routes["/v1/mystat/aqtobe/homework/create"] = [(503, "lost"), (200, {"ok": True})]
+    fake.srv.routes["/v1/mystat/aqtobe/homework/list"] = listing
+    o = Outbox("tok")
+    item_id = o.enqueue(7, fake.file, "")
+    assert _run(o, item_id)["state"] == "uploaded"
+    db.outbox_update(item_id, next_at=0)
+    return _run(o, item_id)
+
+
+def test_lost_create_found_graded_on_second_page(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+
+    def listing(req):
+        st, page = int(req["query"]["status"]), int(req["query"].get("page", 1))
+        data = [{"id": 7, "homework_stud": {"id": 70}}] if (st, page) == (1, 2) else [{"id": 100 + page}]
+        return 200, {"data": data, "_meta": {"pageCount": 2, "currentPage": page}}
+
+    item = _lost_create_reply(fake, listing)
+    assert item["state"] == "done"
+    assert len(fake.creates()) == 1 and len(fake.uploads()) == 1
+    fake.srv.close()
+
+
+def test_lost_create_still_pending_is_sent_again(tmp_path, monkeypatch):
+    fake = FakeMyStat(tmp_path, monkeypatch)
+
+    def listing(req):
+        data = [{"id": 7, "homework_stud": None}] if req["query"]["status"] == "3" else []
+        return 200, {"data": data, "_meta": {"pageCount": 1}}
+
+    item = _lost_create_reply(fake, listing)
+    assert item["state"] == "done"
+    assert len(fake.creates()) == 2 and len(fake.uploads()) == 1
+    fake.srv.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
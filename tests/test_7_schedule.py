@@ -0,0 +1,88 @@
+import pytest
+from tests._local import LocalServer, use_local_api, use_temp_db
+from backend import mystat_api as api
+from backend.schedule_store import ScheduleStore
+from utils import db
+
+# так отвечает schedule/get-month: у занятия есть время, но нет даты
+LESSON = {"time_start": "09:00", "time_end": "10:30", "subject_name": "Python", "room": "204",
+          "teacher_name": "Иванов И.И."}
+
+
+def _server(tmp_path, monkeypatch, month_data, day_fn):
+    use_temp_db(tmp_path, monkeypatch)
+
+    def route(req):
+        if req["query"]["type"] == "month":
+            return 200, {"data": month_data}
+        return day_fn(req["query"]["date_filter"])
+
+    srv = LocalServer({"/v1/mystat/aqtobe/schedule/get-month": route})
+    use_local_api(monkeypatch, srv.base)
+    return srv
+
+
+def test_dated_lessons_grouped_by_day(tmp_path, monkeypatch):
+    month = [dict(LESSON, date="2024-05-03"), dict(LESSON, date="03.05.2024", time_start="08:00"),
+             dict(LESSON, date="2024-05-17")]
+    srv = _server(tmp_path, monkeypatch, month, lambda day: (500, "не должно вызываться"))
+    by_day = ScheduleStore("tok", "aqtobe").load_month(2024, 5)
+    assert sorted(by_day) == ["2024-05-03", "2024-05-17"]
+    assert [l["time_start"] for l in by_day["2024-05-03"]] == ["08:00", "09:00"]
+    assert srv.hits("/v1/mystat/aqtobe/schedule/get-month") == 1
+    srv.close()
+
+
+def test_undated_month_falls_back_to_days(tmp_path, monkeypatch):
+    srv = _server(tmp_path, monkeypatch, [LESSON, LESSON],
+                  lambda day: (200, {"data": [LESSON] if day in ("2024-05-06", "2024-05-13") else []}))
+    store = ScheduleStore("tok", "aqtobe")
+    by_day = store.load_month(2024, 5)
+    assert sorted(by_day) == ["2024-05-06", "2024-05-13"]
+    assert store.lessons_on("2024-05-07") == []
+    assert sorted(db.schedule_get_month("aqtobe", "2024-05")) == ["2024-05-06", "2024-05-13"]
+    srv.close()
+
+
+def test_failed_fallback_caches_nothing(tmp_path, monkeypatch):
+    srv = _server(tmp_path, monkeypatch, [LESSON], lambda day: (404, {"error": "no"}) if day.endswith("-15") else (200, {"data": []}))
+    with pytest.raises(Exception):
+        ScheduleStore("tok", "aqtobe").load_month(2024, 5)
+    assert db.schedule_get_month("aqtobe", "2024-05") is None
+    srv.close()
+
+
+
+def test_day_fallback_is_bounded(tmp_path, monkeypatch):
+    import threading, time
+    from backend import schedule_store
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    def day(_):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return 200, {"data": []}
+
+    srv = _server(tmp_path, monkeypatch, [LESSON], day)
+    ScheduleStore("tok", "aqtobe").load_month(2024, 5)
+    assert srv.hits("/v1/mystat/aqtobe/schedule/get-month") == 1 + 31
+    assert peak[0] <= schedule_store.DAY_WORKERS
+    srv.close()
+
+
+def test_prefetch_skips_day_fallback(tmp_path, monkeypatch):
+    srv = _server(tmp_path, monkeypatch, [LESSON], lambda day: (500, "не должно вызываться"))
+    store = ScheduleStore("tok", "aqtobe")
+    assert store.load_month(2024, 5, fallback=False) is None
+    assert srv.hits("/v1/mystat/aqtobe/schedule/get-month") == 1
+    assert not store.has_month(2024, 5)
+    assert db.schedule_get_month("aqtobe", "2024-05") is None
+    srv.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,42 @@
+import time
+from tests._local import LocalServer, use_local_api, use_temp_db
+from backend import mystat_api as api
+from utils import db
+
+
+def _server(tmp_path, monkeypatch, slow_remembered):
+    use_temp_db(tmp_path, monkeypatch)
+
+    def remembered(req):
+        time.sleep(slow_remembered)
+        return 200, {"token": "a.b.remembered"}
+
+    srv = LocalServer({
+        "/v1/mystat/aqtobe/auth/login": remembered,
+        "/v1/mystat/auth/login": (200, {"data": {"access_token": "a.b.other"}}),
+    })
+    use_local_api(monkeypatch, srv.base)
+    monkeypatch.setattr(api, "LOGIN_HEAD_START", 0.5)
+    db.set_login_strategy("aqtobe", f"{srv.base}/v1/mystat/aqtobe/auth/login", "json")
+    return srv
+
+
+def test_remembered_strategy_wins_within_head_start(tmp_path, monkeypatch):
+    srv = _server(tmp_path, monkeypatch, 0)
+    assert api.login_with_credentials("aqtobe", "user", "pwd") == "a.b.remembered"
+    assert [r["path"] for r in srv.requests] == ["/v1/mystat/aqtobe/auth/login"]
+    srv.close()
+
+
+def test_slow_remembered_strategy_is_raced(tmp_path, monkeypatch):
+    srv = _server(tmp_path, monkeypatch, 5)
+    t0 = time.perf_counter()
+    assert api.login_with_credentials("aqtobe", "user", "pwd") == "a.b.other"
+    assert time.perf_counter() - t0 < 3
+    assert db.get_login_strategy("aqtobe")[0] == f"{srv.base}/v1/mystat/auth/login"
+    srv.close()
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
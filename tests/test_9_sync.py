@@ -0,0 +1,42 @@
+from tests._local import LocalServer, use_local_api, use_temp_db
+from tests.test_5_cache import _jwt
+from backend import mystat_api as api
+from backend.sync_daemon import SyncDaemon
+
+REVIEW = {"date": "2024-05-03", "spec": "Python", "teacher": "Иванов И.И.", "message": "Хорошо"}
+
+
+def _setup(tmp_path, monkeypatch, reviews):
+    use_temp_db(tmp_path, monkeypatch)
+    srv = LocalServer({"/v1/mystat/aqtobe/reviews/list": reviews})
+    use_local_api(monkeypatch, srv.base)
+    return srv
+
+
+def test_endpoint_failure_is_a_failed_run_even_with_cache(tmp_path, monkeypatch):
+    srv = _setup(tmp_path, monkeypatch, [(200, {"data": [REVIEW]}), (503, "busy")])
+    daemon = SyncDaemon(_jwt(1), "aqtobe")
+    assert daemon.run_once("reviews")
+    assert not daemon.run_once("reviews")  # раньше кэш прятал 503, и backoff не включался
+    assert daemon._failures["reviews"] == 1 and api.net_status()["online"]
+    srv.close()
+
+
+def test_seen_items_are_per_account(tmp_path, monkeypatch):
+    srv = _setup(tmp_path, monkeypatch, (200, {"data": [REVIEW]}))
+    events = []
+    a, b = SyncDaemon(_jwt(1), "aqtobe"), SyncDaemon(_jwt(2), "aqtobe")
+    a.subscribe(events.append)
+    b.subscribe(events.append)
+    a.run_once("reviews")
+    srv.routes["/v1/mystat/aqtobe/reviews/list"] = (200, {"data": [REVIEW, dict(REVIEW, message="Новый")]})
+    b.run_once("reviews")  # первый проход другого аккаунта — для него ничего не «новое»
+    assert [ev for ev in events if ev["type"] == "review_new"] == []
+    a.run_once("reviews")
+    assert [ev["items"][0]["message"] for ev in events if ev["type"] == "review_new"] == ["Новый"]
+    srv.close()
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
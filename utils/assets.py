@@ -0,0 +1,131 @@
+import hashlib, mimetypes, os, shutil, threading, time
+from typing import Optional
+from urllib.parse import urlparse
+
+from backend.http_client import get_client as _http
+from utils import db
+
+# файлы лежат в _assetcache/v{CACHE_VERSION}: смена формата = новая папка, старые удаляются целиком
+CACHE_VERSION = 1
+_ROOT = os.path.join(os.path.dirname(__file__), "_assetcache")
+_LEGACY_DIRS = [os.path.join(os.path.dirname(__file__), "_iconcache")]
+MAX_BYTES = 32 * 1024 * 1024
+MAX_AGE = 7 * 24 * 3600  # сек: после этого файл перепроверяется условным запросом
+FETCH_TIMEOUT = 6
+
+_LOCK = threading.Lock()
+_dir_ready = False
+_EXT = {"image/x-icon": ".ico", "image/vnd.microsoft.icon": ".ico", "image/jpeg": ".jpg", "image/svg+xml": ".svg"}
+
+
+def configure(*, max_bytes: int = None, max_age: float = None) -> None:
+    global MAX_BYTES, MAX_AGE
+    if max_bytes is not None:
+        MAX_BYTES = max_bytes
+    if max_age is not None:
+        MAX_AGE = max_age
+    evict()
+
+
+def _dir() -> str:
+    return os.path.join(_ROOT, f"v{CACHE_VERSION}")
+
+
+def _ensure_dir() -> None:
+    global _dir_ready
+    with _LOCK:
+        if _dir_ready:
+            return
+        os.makedirs(_dir(), exist_ok=True)
+        for name in os.listdir(_ROOT):
+            if name != f"v{CACHE_VERSION}":
+                shutil.rmtree(os.path.join(_ROOT, name), ignore_errors=True)
+        for d in _LEGACY_DIRS:
+            shutil.rmtree(d, ignore_errors=True)
+        _dir_ready = True
+
+
+def _ext(content_type: str, url: str) -> str:
+    ct = (content_type or "").split(";")[0].strip().lower()
+    return (_EXT.get(ct) or mimetypes.guess_extension(ct) or os.path.splitext(urlparse(url).path)[1]
+            or ".bin")
+
+
+def lookup(url: str) -> Optional[dict]:
+    # запись индекса + path/stale; запись без файла (удалили руками) забывается
+    entry = db.asset_get(url)
+    if entry is None:
+        return None
+    entry["path"] = os.path.join(_dir(), entry["file"])
+    if not os.path.isfile(entry["path"]):
+        db.asset_delete(url)
+        return None
+    entry["stale"] = time.time() - (entry["fetched_at"] or 0) > MAX_AGE
+    return entry
+
+
+def touch(url: str) -> None:
+    db.asset_touch(url)
+
+
+def fetch(url: str, timeout: float = FETCH_TIMEOUT) -> str:
+    entry = lookup(url)
+    headers = {}
+    if entry and entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    r = _http().get(url, headers=headers, timeout=timeout)
+    if r.status_code == 304 and entry:
+        db.asset_revalidated(url)
+        return entry["path"]
+    r.raise_for_status()
+
+    ct = r.headers.get("Content-Type", "")
+    name = hashlib.sha1(url.encode("utf-8")).hexdigest() + _ext(ct, url)
+    _ensure_dir()
+    path = os.path.join(_dir(), name)
+    # временный файл + rename: параллельная загрузка или чтение не увидят недописанную картинку
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(r.content)
+    os.replace(tmp, path)
+    if entry and entry["file"] != name:
+        try:
+            os.remove(entry["path"])
+        except OSError:
+            pass
+    db.asset_put(url, name, ct, len(r.content), r.headers.get("ETag", ""), r.headers.get("Last-Modified", ""))
+    evict()
+    return path
+
+
+def get(url: str, timeout: float = FETCH_TIMEOUT) -> Optional[str]:
+    # блокирующий вариант: свежий файл из кэша, иначе сеть; без сети — хоть устаревший
+    entry = lookup(url)
+    if entry and not entry["stale"]:
+        touch(url)
+        return entry["path"]
+    try:
+        return fetch(url, timeout)
+    except Exception as e:
+        print(f"asset fetch error: {url}: {e}")
+        return entry["path"] if entry else None
+
+
+def evict(budget: int = None) -> None:
+    # LRU по accessed_at, пока суммарный размер больше бюджета
+    budget = MAX_BYTES if budget is None else budget
+    with _LOCK:
+        total = db.asset_total_size()
+        if total <= budget:
+            return
+        for url, name, size in db.asset_lru():
+            if total <= budget:
+                break
+            try:
+                os.remove(os.path.join(_dir(), name))
+            except OSError:
+                pass
+            db.asset_delete(url)
+            total -= size or 0
@@ -1,41 +1,136 @@
-import os, sqlite3, threading
+import base64, hashlib, json, os, sqlite3, threading, time
 
 _DB_PATH = os.path.join(os.path.dirname(__file__), "app.db")
-_LOCK = threading.Lock()
+_LOCAL = threading.local()
+_SCHEMA_LOCK = threading.Lock()
+_SCHEMA_READY = set()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v TEXT);
+CREATE TABLE IF NOT EXISTS http_cache (
+    k TEXT PRIMARY KEY, body TEXT, fetched_at REAL, etag TEXT, last_modified TEXT
+);
+CREATE TABLE IF NOT EXISTS schedule_months (
+    city TEXT, month TEXT, fetched_at REAL, PRIMARY KEY (city, month)
+);
+CREATE TABLE IF NOT EXISTS schedule_days (
+    city TEXT, day TEXT, month TEXT, lessons TEXT, PRIMARY KEY (city, day)
+);
+CREATE TABLE IF NOT EXISTS fs_hosts (
+    host TEXT PRIMARY KEY, rtt REAL, ok REAL, fail REAL, checked_at REAL
+);
+CREATE TABLE IF NOT EXISTS downloads (
+    path TEXT PRIMARY KEY, url TEXT, size INTEGER, etag TEXT, segments TEXT, updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS assets (
+    url TEXT PRIMARY KEY, file TEXT, content_type TEXT, size INTEGER, etag TEXT, last_modified TEXT,
+    fetched_at REAL, accessed_at REAL, hits INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS assets_lru ON assets(accessed_at);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, sha256 TEXT
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, homework_id INTEGER, path TEXT, link TEXT, answer TEXT,
+    state TEXT, attempts INTEGER DEFAULT 0, create_tried INTEGER DEFAULT 0, next_at REAL, error TEXT,
+    created_at REAL, updated_at REAL, account TEXT DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS fs_uploads (
+    sha256 TEXT, size INTEGER, host TEXT, directory TEXT, link TEXT, uploaded_at REAL, checked_at REAL,
+    PRIMARY KEY (sha256, size, host, directory)
+);
+"""
 
 def _conn():
-    c = sqlite3.connect(_DB_PATH)
-    c.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT PRIMARY KEY, v TEXT)")
+    # одно долгоживущее соединение на поток; WAL позволяет читать параллельно с записью
+    c = getattr(_LOCAL, "conn", None)
+    if c is not None and _LOCAL.path == _DB_PATH:
+        return c
+    c = sqlite3.connect(_DB_PATH, timeout=10)
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    with _SCHEMA_LOCK:
+        if _DB_PATH not in _SCHEMA_READY:
+            c.executescript(_SCHEMA)
+            # базы ранних сборок создавали outbox без колонки account
+            if "account" not in {r[1] for r in c.execute("PRAGMA table_info(outbox)")}:
+                c.execute("ALTER TABLE outbox ADD COLUMN account TEXT DEFAULT ''")
+            _SCHEMA_READY.add(_DB_PATH)
+    _LOCAL.conn, _LOCAL.path = c, _DB_PATH
     return c
 
 def _get(k, default=""):
-    with _LOCK:
-        c = _conn()
-        try:
-            row = c.execute("SELECT v FROM kv WHERE k=?", (k,)).fetchone()
-            return row[0] if row else default
-        finally:
-            c.close()
+    row = _conn().execute("SELECT v FROM kv WHERE k=?", (k,)).fetchone()
+    return row[0] if row else default
 
 def _set(k, v):
-    with _LOCK:
-        c = _conn()
-        try:
-            c.execute(
-                "INSERT INTO kv(k,v) VALUES(?,?) "
-                "ON CONFLICT(k) DO UPDATE SET v=excluded.v",
-                (k, v or "")
-            )
-            c.commit()
-        finally:
-            c.close()
+    set_many({k: v})
+
+def get_many(keys, default=""):
+    keys = list(keys)
+    if not keys:
+        return {}
+    marks = ",".join("?" * len(keys))
+    rows = dict(_conn().execute(f"SELECT k, v FROM kv WHERE k IN ({marks})", keys).fetchall())
+    return {k: rows.get(k, default) for k in keys}
+
+def set_many(items: dict):
+    c = _conn()
+    with c:
+        c.executemany(
+            "INSERT INTO kv(k,v) VALUES(?,?) "
+            "ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+            [(k, v or "") for k, v in items.items()]
+        )
 
 def get_mystat_token() -> str: return _get("mystat_token", "")
-def set_mystat_token(v: str):   _set("mystat_token", v or "")
+
+def set_mystat_token(v: str):
+    # вошёл другой пользователь — данные прошлого не должны ему показываться.
+    # Токен без id пользователя сменой аккаунта не считаем: иначе каждый вход стирал бы кэш
+    new = user_id_of(v) if v else None
+    if new:
+        old = _get("account", "")
+        if old.startswith("u") and old != new:
+            clear_user_data()
+        if old != new:
+            _set("account", new)
+    _set("mystat_token", v or "")
+
+def user_id_of(token: str):
+    # id пользователя из JWT MyStat или None, если токен не разобрать
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        for k in ("id", "user_id", "uid", "sub"):
+            if claims.get(k):
+                return f"u{claims[k]}"
+    except Exception:
+        pass
+    return None
+
+def account_of(token: str) -> str:
+    # id пользователя из JWT MyStat; если токен не разобрать — отпечаток самого токена
+    return user_id_of(token) or "t" + hashlib.sha1((token or "").encode()).hexdigest()[:16]
+
+def clear_user_data():
+    # очередь отправки не трогаем: она разложена по account и вернётся при следующем входе владельца
+    c = _conn()
+    with c:
+        for table in ("http_cache", "schedule_months", "schedule_days", "fs_uploads"):
+            c.execute(f"DELETE FROM {table}")
+        c.execute("DELETE FROM kv WHERE k IN ('fs_bearer','fs_directory','fs_host','fs_bearer_hosts') OR k LIKE 'sync_seen:%'")
 
 def get_city() -> str:          return _get("mystat_city", "aqtobe")
 def set_city(v: str):           _set("mystat_city", (v or "aqtobe").lower())
 
+def get_login_strategy(city: str):
+    v = _get(f"login_strategy:{(city or '').lower()}", "")
+    return tuple(json.loads(v)) if v else None
+
+def set_login_strategy(city: str, url: str, mode: str):
+    _set(f"login_strategy:{(city or '').lower()}", json.dumps([url, mode]))
+
 def get_fs_bearer():   return _get("fs_bearer", "")
 def set_fs_bearer(v):  _set("fs_bearer", v or "")
 
@@ -44,3 +139,225 @@ def set_fs_directory(v): _set("fs_directory", v or "")
 
 def get_fs_host():     return _get("fs_host", "")
 def set_fs_host(v):    _set("fs_host", v or "")
+
+def get_fs_bearer_hosts(bearer: str) -> list:
+    # FS-хосты, которые уже принимали именно этот токен; у нового токена список начинается заново
+    try:
+        v = json.loads(_get("fs_bearer_hosts", "") or "{}")
+    except ValueError:
+        return []
+    return list(v.get("hosts") or []) if v.get("bearer") == _fingerprint(bearer) else []
+
+def add_fs_bearer_host(bearer: str, host: str):
+    hosts = get_fs_bearer_hosts(bearer)
+    if host and host not in hosts:
+        _set("fs_bearer_hosts", json.dumps({"bearer": _fingerprint(bearer), "hosts": hosts + [host]}))
+
+def _fingerprint(secret: str) -> str:
+    return hashlib.sha1((secret or "").encode()).hexdigest()[:16]
+
+def cache_get(k):
+    return _conn().execute(
+        "SELECT body, fetched_at, etag, last_modified FROM http_cache WHERE k=?", (k,)
+    ).fetchone()
+
+def cache_put(k, body, etag="", last_modified=""):
+    c = _conn()
+    with c:
+        c.execute(
+            "INSERT INTO http_cache(k,body,fetched_at,etag,last_modified) VALUES(?,?,?,?,?) "
+            "ON CONFLICT(k) DO UPDATE SET body=excluded.body, fetched_at=excluded.fetched_at, "
+            "etag=excluded.etag, last_modified=excluded.last_modified",
+            (k, body, time.time(), etag or "", last_modified or "")
+        )
+
+def cache_touch(k):
+    c = _conn()
+    with c:
+        c.execute("UPDATE http_cache SET fetched_at=? WHERE k=?", (time.time(), k))
+
+def schedule_put_month(city, month, by_day: dict):
+    c = _conn()
+    with c:
+        c.execute("DELETE FROM schedule_days WHERE city=? AND month=?", (city, month))
+        c.executemany(
+            "INSERT OR REPLACE INTO schedule_days(city,day,month,lessons) VALUES(?,?,?,?)",
+            [(city, day, month, json.dumps(lessons, ensure_ascii=False)) for day, lessons in by_day.items()]
+        )
+        c.execute(
+            "INSERT OR REPLACE INTO schedule_months(city,month,fetched_at) VALUES(?,?,?)",
+            (city, month, time.time())
+        )
+
+def schedule_get_month(city, month):
+    c = _conn()
+    row = c.execute("SELECT fetched_at FROM schedule_months WHERE city=? AND month=?", (city, month)).fetchone()
+    if not row:
+        return None
+    rows = c.execute("SELECT day, lessons FROM schedule_days WHERE city=? AND month=?", (city, month)).fetchall()
+    return {day: json.loads(lessons) for day, lessons in rows}
+
+def download_get(path):
+    row = _conn().execute("SELECT url, size, etag, segments FROM downloads WHERE path=?", (path,)).fetchone()
+    if not row:
+        return None
+    url, size, etag, segments = row
+    return {"url": url, "size": size, "etag": etag, "segments": json.loads(segments)}
+
+def download_put(path, url, size, etag, segments):
+    c = _conn()
+    with c:
+        c.execute(
+            "INSERT OR REPLACE INTO downloads(path,url,size,etag,segments,updated_at) VALUES(?,?,?,?,?,?)",
+            (path, url, size, etag or "", json.dumps(segments), time.time())
+        )
+
+def download_clear(path):
+    c = _conn()
+    with c:
+        c.execute("DELETE FROM downloads WHERE path=?", (path,))
+
+def fs_hosts_get():
+    rows = _conn().execute("SELECT host, rtt, ok, fail, checked_at FROM fs_hosts").fetchall()
+    return {h: {"rtt": rtt, "ok": ok, "fail": fail, "checked_at": at} for h, rtt, ok, fail, at in rows}
+
+def fs_host_record(host, ok: bool, rtt=None, decay=0.8):
+    # успехи/ошибки затухают, поэтому доля успехов отражает последние попытки, а не всю историю
+    c = _conn()
+    with c:
+        row = c.execute("SELECT rtt, ok, fail FROM fs_hosts WHERE host=?", (host,)).fetchone()
+        old_rtt, n_ok, n_fail = row if row else (None, 0.0, 0.0)
+        if rtt is not None and old_rtt is not None:
+            rtt = old_rtt * 0.5 + rtt * 0.5
+        c.execute(
+            "INSERT OR REPLACE INTO fs_hosts(host,rtt,ok,fail,checked_at) VALUES(?,?,?,?,?)",
+            (host, rtt if rtt is not None else old_rtt, n_ok * decay + (1 if ok else 0),
+             n_fail * decay + (0 if ok else 1), time.time())
+        )
+
+def asset_get(url):
+    row = _conn().execute(
+        "SELECT file, content_type, size, etag, last_modified, fetched_at, accessed_at, hits FROM assets WHERE url=?",
+        (url,)
+    ).fetchone()
+    if not row:
+        return None
+    keys = ("file", "content_type", "size", "etag", "last_modified", "fetched_at", "accessed_at", "hits")
+    return dict(zip(keys, row))
+
+def asset_put(url, file, content_type, size, etag="", last_modified=""):
+    now = time.time()
+    c = _conn()
+    with c:
+        c.execute(
+            "INSERT INTO assets(url,file,content_type,size,etag,last_modified,fetched_at,accessed_at,hits) "
+            "VALUES(?,?,?,?,?,?,?,?,0) ON CONFLICT(url) DO UPDATE SET file=excluded.file, "
+            "content_type=excluded.content_type, size=excluded.size, etag=excluded.etag, "
+            "last_modified=excluded.last_modified, fetched_at=excluded.fetched_at, accessed_at=excluded.accessed_at",
+            (url, file, content_type or "", size, etag or "", last_modified or "", now, now)
+        )
+
+def asset_revalidated(url):
+    c = _conn()
+    with c:
+        c.execute("UPDATE assets SET fetched_at=? WHERE url=?", (time.time(), url))
+
+def asset_touch(url):
+    c = _conn()
+    with c:
+        c.execute("UPDATE assets SET accessed_at=?, hits=hits+1 WHERE url=?", (time.time(), url))
+
+def asset_total_size():
+    return _conn().execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+
+def asset_lru():
+    # от давно не использованных к свежим — порядок вытеснения
+    return _conn().execute("SELECT url, file, size FROM assets ORDER BY accessed_at").fetchall()
+
+def asset_delete(url):
+    c = _conn()
+    with c:
+        c.execute("DELETE FROM assets WHERE url=?", (url,))
+
+def file_hash_get(path, mtime, size):
+    row = _conn().execute(
+        "SELECT sha256 FROM file_hashes WHERE path=? AND mtime=? AND size=?", (path, mtime, size)
+    ).fetchone()
+    return row[0] if row else None
+
+def file_hash_put(path, mtime, size, sha256):
+    c = _conn()
+    with c:
+        c.execute("INSERT OR REPLACE INTO file_hashes(path,mtime,size,sha256) VALUES(?,?,?,?)",
+                  (path, mtime, size, sha256))
+
+def fs_upload_find(sha256, size, directory, hosts):
+    # самая свежая загрузка этого содержимого в ту же папку на одном из доступных хостов
+    hosts = list(hosts)
+    if not hosts:
+        return None
+    marks = ",".join("?" * len(hosts))
+    row = _conn().execute(
+        f"SELECT host, link, checked_at FROM fs_uploads WHERE sha256=? AND size=? AND directory=? "
+        f"AND host IN ({marks}) ORDER BY uploaded_at DESC LIMIT 1",
+        [sha256, size, directory or ""] + hosts
+    ).fetchone()
+    return {"host": row[0], "link": row[1], "checked_at": row[2]} if row else None
+
+def fs_upload_put(sha256, size, host, directory, link):
+    now = time.time()
+    c = _conn()
+    with c:
+        c.execute(
+            "INSERT OR REPLACE INTO fs_uploads(sha256,size,host,directory,link,uploaded_at,checked_at) "
+            "VALUES(?,?,?,?,?,?,?)", (sha256, size, host, directory or "", link, now, now)
+        )
+
+def fs_upload_checked(link):
+    c = _conn()
+    with c:
+        c.execute("UPDATE fs_uploads SET checked_at=? WHERE link=?", (time.time(), link))
+
+def fs_upload_forget(link):
+    c = _conn()
+    with c:
+        c.execute("DELETE FROM fs_uploads WHERE link=?", (link,))
+
+_OUTBOX_COLS = ("id", "homework_id", "path", "link", "answer", "state", "attempts", "create_tried", "next_at",
+                "error", "created_at", "updated_at")
+
+def outbox_add(homework_id, path, answer):
+    now = time.time()
+    c = _conn()
+    with c:
+        cur = c.execute(
+            "INSERT INTO outbox(homework_id,path,link,answer,state,attempts,create_tried,next_at,error,created_at,updated_at,account) "
+            "VALUES(?,?,'',?,'queued',0,0,?,'',?,?,?)", (homework_id, path, answer or "", now, now, now, _get("account", ""))
+        )
+    return cur.lastrowid
+
+def outbox_list(states=None):
+    # только задания текущего аккаунта
+    sql = f"SELECT {','.join(_OUTBOX_COLS)} FROM outbox WHERE account=?"
+    args = [_get("account", "")]
+    if states:
+        sql += f" AND state IN ({','.join('?' * len(states))})"
+        args += list(states)
+    rows = _conn().execute(sql + " ORDER BY id", args).fetchall()
+    return [dict(zip(_OUTBOX_COLS, r)) for r in rows]
+
+def outbox_get(item_id):
+    row = _conn().execute(f"SELECT {','.join(_OUTBOX_COLS)} FROM outbox WHERE id=?", (item_id,)).fetchone()
+    return dict(zip(_OUTBOX_COLS, row)) if row else None
+
+def outbox_update(item_id, **fields):
+    fields["updated_at"] = time.time()
+    c = _conn()
+    with c:
+        c.execute(f"UPDATE outbox SET {','.join(k + '=?' for k in fields)} WHERE id=?",
+                  list(fields.values()) + [item_id])
+
+def outbox_delete(item_id):
+    c = _conn()
+    with c:
+        c.execute("DELETE FROM outbox WHERE id=?", (item_id,))
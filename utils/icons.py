@@ -1,28 +1,129 @@
-import hashlib, os, threading, requests
-from PyQt5.QtGui import QIcon, QPixmap
+import threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from PyQt5.QtCore import QObject, Qt, QRectF, pyqtSignal
+from PyQt5.QtGui import QColor, QIcon, QPainter, QPixmap
+
+from utils import assets
 
-_CACHE_DIR = os.path.join(os.path.dirname(__file__), "_iconcache")
 _LOCK = threading.Lock()
+FETCH_WORKERS = 4
+LRU_SIZE = 64  # декодированных иконок в памяти
+RETRY_AFTER = 60  # сек: неудачную загрузку не повторяем чаще
+
+_pixmaps: "OrderedDict[str, QPixmap]" = OrderedDict()
+_waiting: dict = {}   # url -> [on_ready, ...]; url в словаре = загрузка уже идёт
+_failed: dict = {}    # url -> время неудачи
+_pool: Optional[ThreadPoolExecutor] = None
+_notifier = None
+_placeholder: Optional[QIcon] = None
+
+
+# сигналы из потоков загрузки приходят в GUI-поток: QPixmap можно создавать только там
+class _Notifier(QObject):
+    done = pyqtSignal(str, bool)
+
+    def __init__(self):
+        super().__init__()
+        self.done.connect(self._on_done, Qt.QueuedConnection)
+
+    def _on_done(self, url: str, ok: bool) -> None:
+        with _LOCK:
+            callbacks = _waiting.pop(url, [])
+            if not ok:
+                _failed[url] = time.monotonic()
+        if ok:
+            _pixmaps.pop(url, None)  # файл мог обновиться после перепроверки
+        pm = _pixmap(url) if ok else None
+        if pm is None:
+            return
+        for cb in callbacks:
+            try:
+                cb(QIcon(pm))
+            except RuntimeError:
+                pass  # виджет уже удалён
+
+
+def _fetch(url: str) -> None:
+    ok = False
+    try:
+        assets.fetch(url)
+        ok = True
+    except Exception as e:
+        print(f"icon fetch error: {url}: {e}")
+    _notifier.done.emit(url, ok)
+
+
+def _pixmap(url: str) -> Optional[QPixmap]:
+    pm = _pixmaps.get(url)
+    if pm is not None:
+        _pixmaps.move_to_end(url)
+        return pm
+    entry = assets.lookup(url)
+    if entry is None:
+        return None
+    pm = QPixmap(entry["path"])
+    if pm.isNull():
+        return None
+    # обращения считаются при чтении с диска; попадания в память индекс не трогают
+    assets.touch(url)
+    if entry["stale"]:
+        _start_fetch(url)  # пока показываем старую, в фоне условный запрос
+    _pixmaps[url] = pm
+    while len(_pixmaps) > LRU_SIZE:
+        _pixmaps.popitem(last=False)
+    return pm
+
+
+def _start_fetch(url: str, on_ready: Callable[[QIcon], None] = None) -> None:
+    global _pool, _notifier
+    if _notifier is None:
+        _notifier = _Notifier()
+        _pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="icons")
+    with _LOCK:
+        if time.monotonic() - _failed.get(url, -RETRY_AFTER) < RETRY_AFTER:
+            return
+        pending = url in _waiting
+        _waiting.setdefault(url, [])
+        if on_ready is not None:
+            _waiting[url].append(on_ready)
+    if not pending:
+        _pool.submit(_fetch, url)
+
+
+def placeholder_icon() -> QIcon:
+    global _placeholder
+    if _placeholder is None:
+        pm = QPixmap(32, 32)
+        pm.fill(Qt.transparent)
+        p = QPainter(pm)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.setPen(Qt.NoPen)
+        p.setBrush(QColor("#d6d6e2"))
+        p.drawRoundedRect(QRectF(4, 4, 24, 24), 6, 6)
+        p.end()
+        _placeholder = QIcon(pm)
+    return _placeholder
+
 
-def _cache_path(url: str) -> str:
-    h = hashlib.sha1(url.encode("utf-8")).hexdigest()
-    return os.path.join(_CACHE_DIR, f"{h}.ico")
+def qicon_from_url(url: str, fallback_path: str = "", on_ready: Callable[[QIcon], None] = None) -> QIcon:
+    # никогда не ждёт сеть: промах -> заглушка сразу, настоящая иконка придёт в on_ready
+    pm = _pixmap(url)
+    if pm is not None:
+        return QIcon(pm)
+    _start_fetch(url, on_ready)
+    return QIcon(fallback_path) if fallback_path else placeholder_icon()
 
-def qicon_from_url(url: str, fallback_path: str = "") -> QIcon:
-    os.makedirs(_CACHE_DIR, exist_ok=True)
-    path = _cache_path(url)
 
-    if not os.path.isfile(path):
-        try:
-            r = requests.get(url, timeout=6)
-            r.raise_for_status()
-            with open(path, "wb") as f:
-                f.write(r.content)
-        except Exception:
-            return QIcon(fallback_path) if fallback_path else QIcon()
+def prefetch_icons(urls: Iterable[str] = None) -> None:
+    # одной пачкой при старте: к моменту построения окна иконки обычно уже на диске
+    for url in (ICON_URLS.values() if urls is None else urls):
+        entry = assets.lookup(url)
+        if entry is None or entry["stale"]:
+            _start_fetch(url)
 
-    pm = QPixmap(path)
-    return QIcon(pm)
 
 ICON_URLS = {
     "home":   "https://cdn-icons-png.flaticon.com/512/25/25694.png",
@@ -31,5 +132,7 @@ ICON_URLS = {
     "key":    "https://cdn-icons-png.flaticon.com/512/10812/10812271.png",
     "cloud":  "https://cdn-icons-png.flaticon.com/512/907/907237.png",
     "reviews":"https://cdn-icons-png.flaticon.com/512/8013/8013078.png",
+    "eye":    "https://cdn-icons-png.flaticon.com/512/565/565655.png",
+    "eye_off":"https://cdn-icons-png.flaticon.com/512/709/709612.png",
     "favicon":"https://mystat.itstep.org/favicon.ico"
 }
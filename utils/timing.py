@@ -0,0 +1,35 @@
+import sys
+import time
+
+# отметки времени старта: python main.py --timing печатает отчёт после первого кадра
+T0 = time.perf_counter()
+ENABLED = False
+HEAVY_MODULES = ("matplotlib", "PyQt5.QtWebEngineWidgets")
+
+_marks = []
+_reported = False
+
+
+def _line(name: str, t: float, prev: float) -> str:
+    return f"  {name:<22} +{(t - prev) * 1000:8.1f} мс  (с запуска {(t - T0) * 1000:8.1f} мс)"
+
+
+def mark(name: str, since: float = None) -> None:
+    # since: начало замера, если считать надо не от предыдущей отметки (ленивые страницы)
+    t = time.perf_counter()
+    prev = since if since is not None else (_marks[-1][1] if _marks else T0)
+    _marks.append((name, t, since))
+    if ENABLED and _reported:
+        print(_line(name, t, prev))
+
+
+def report() -> str:
+    global _reported
+    _reported = True
+    lines, prev = ["Время старта:"], T0
+    for name, t, since in _marks:
+        lines.append(_line(name, t, since if since is not None else prev))
+        prev = t
+    heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+    lines.append("  тяжёлые модули: " + (", ".join(heavy) if heavy else "не загружены"))
+    return "\n".join(lines)